@@ -1,23 +1,51 @@
 # -*- coding: utf-8 -*-
-from gym.envs.registration import register
-
-from .env import TexasHoldemEnv
-from .utils import card_to_str, hand_to_str, safe_actions, action_table
-
-register(
- 	id='TexasHoldem-v0',
- 	entry_point='holdem.env:TexasHoldemEnv',
-  kwargs={'n_seats': 2, 'debug': False},
-)
-
-register(
- 	id='TexasHoldem-v1',
- 	entry_point='holdem.env:TexasHoldemEnv',
-  kwargs={'n_seats': 4, 'debug': False},
-)
-
-register(
- 	id='TexasHoldem-v2',
- 	entry_point='holdem.env:TexasHoldemEnv',
-  kwargs={'n_seats': 8, 'debug': False},
-)
+import importlib
+import sys
+
+from .core import Table
+from .instrument import Instrumentation
+from .utils import card_to_str, hand_to_str, safe_actions, action_table, legal_actions
+
+# gym ids of the table configs, by number of seats
+ENV_IDS = {'TexasHoldem-v0': 2, 'TexasHoldem-v1': 4, 'TexasHoldem-v2': 8}
+
+# the gym based parts are only imported on first use, see `__getattr__`
+_LAZY_ATTRS = {
+  'TexasHoldemEnv': '.env',
+  'VectorTexasHoldemEnv': '.vector',
+  'SubprocVectorHoldemEnv': '.subproc',
+  'Tournament': '.tournament',
+  'BatchRunner': '.runner',
+}
+
+
+def register_envs():
+  """Register the `TexasHoldem-v0/v1/v2` gym ids, once.
+
+  Runs when gym loads its env plugins (see `setup.py`), when `holdem` is imported after gym or
+  when `holdem.env` is imported.
+  """
+  from gym.envs.registration import register, registry
+  for env_id, n_seats in ENV_IDS.items():
+    if env_id not in registry:
+      register(
+        id=env_id,
+        entry_point='holdem.env:TexasHoldemEnv',
+        kwargs={'n_seats': n_seats, 'debug': False},
+      )
+
+
+def __getattr__(name):
+  if name not in _LAZY_ATTRS:
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+  value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+  globals()[name] = value
+  return value
+
+
+def __dir__():
+  return sorted(set(globals()) | set(_LAZY_ATTRS))
+
+
+if 'gym' in sys.modules:
+  register_envs()
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Throughput benchmarks of `TexasHoldemEnv`.
+
+Every workload plays hands of one of the registered table configs with one style of play:
+
++ `passive`: check or call, like `safe_actions`, every hand goes to showdown.
++ `aggressive`: random raises (half of them all-in) and folds with short stacks, so most hands
+  end in all-ins or folds.
++ `showdown`: never fold and make small raises with uneven stacks, so hands go to multiway
+  showdowns with side pots.
+
+Only the time spent in `reset` and `step` is counted. Run `python -m holdem.bench --help` for the
+options; `--json` writes the results, which `--baseline` compares a later run against.
+"""
+import argparse
+import fnmatch
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import numpy as np
+
+from .env import TexasHoldemEnv
+from .utils import action_table
+
+
+FORMAT_VERSION = 1
+
+# the configs registered in `holdem/__init__.py`
+CONFIGS = [('TexasHoldem-v0', 2), ('TexasHoldem-v1', 4), ('TexasHoldem-v2', 8)]
+PERCENTILES = [50, 90, 99]
+# fields of a report that must match for its timings to be comparable to a baseline
+SETUP = ('version', 'obs_mode', 'python', 'numpy', 'machine')
+
+
+def _passive(rng, mask, minraise, maxraise):
+  if mask[action_table.CHECK]:
+    return action_table.CHECK, 0
+  return action_table.CALL, 0
+
+
+def _aggressive(rng, mask, minraise, maxraise):
+  roll = rng.random()
+  if roll < 0.4 and mask[action_table.RAISE]:
+    if rng.random() < 0.5:
+      return action_table.RAISE, maxraise
+    return action_table.RAISE, rng.randint(minraise, maxraise)
+  if roll < 0.55 and mask[action_table.FOLD]:
+    return action_table.FOLD, 0
+  return _passive(rng, mask, minraise, maxraise)
+
+
+def _showdown(rng, mask, minraise, maxraise):
+  if rng.random() < 0.15 and mask[action_table.RAISE]:
+    return action_table.RAISE, minraise
+  return _passive(rng, mask, minraise, maxraise)
+
+
+# name: (policy, starting stacks to pick from)
+STYLES = OrderedDict([
+  ('passive', (_passive, [2000])),
+  ('aggressive', (_aggressive, [100, 250, 500, 2000])),
+  ('showdown', (_showdown, [500, 1000, 2000, 4000])),
+])
+
+WORKLOADS = OrderedDict(
+  ('{}/{}'.format(env_id, style), (n_seats, style)) for env_id, n_seats in CONFIGS
+  for style in STYLES)
+
+
+class _Table(object):
+  """A table playing one workload, topping players up when fewer than 2 have chips."""
+
+  def __init__(self, workload, seed, obs_mode):
+    n_seats, style = WORKLOADS[workload]
+    self.policy, self.stacks = STYLES[style]
+    self.rng = random.Random(seed)
+    self.env = TexasHoldemEnv(n_seats, obs_mode=obs_mode)
+    self.env.seed(seed)
+    for seat in range(n_seats):
+      self.env.add_player(seat, stack=self.rng.choice(self.stacks))
+
+  def rebuy(self):
+    env = self.env
+    if sum(player.stack > 0 for player in env._seats) < 2:
+      for seat in range(env.n_seats):
+        env.remove_player(seat)
+        env.add_player(seat, stack=self.rng.choice(self.stacks))
+
+  def action(self, info):
+    move = self.policy(self.rng, info['legal_actions'], info['minraise'], info['maxraise'])
+    return [move] * self.env.n_seats
+
+
+def _percentiles(seconds):
+  values = np.percentile(np.asarray(seconds) * 1e6, PERCENTILES)
+  result = OrderedDict(('p{}'.format(p), round(float(v), 3)) for p, v in zip(PERCENTILES, values))
+  result['max'] = round(float(np.max(seconds)) * 1e6, 3)
+  return result
+
+
+def run_workload(workload, n_hands=1000, seed=0, obs_mode='tuple'):
+  """Time `n_hands` hands of `workload`, returns throughput and latency percentiles (in us)."""
+  table = _Table(workload, seed, obs_mode)
+  env, clock = table.env, time.perf_counter
+  reset_times, step_times = [], []
+  n_showdowns = 0
+  for _ in range(n_hands):
+    table.rebuy()
+    start = clock()
+    _, info = env.reset(return_info=True)
+    reset_times.append(clock() - start)
+    terminal = False
+    while not terminal:
+      actions = table.action(info)
+      start = clock()
+      _, _, terminal, info = env.step(actions)
+      step_times.append(clock() - start)
+    n_showdowns += len(env.community) == 5
+  seconds = sum(reset_times) + sum(step_times)
+  return OrderedDict([
+    ('hands', n_hands),
+    ('steps', len(step_times)),
+    ('showdowns', n_showdowns),
+    ('seconds', round(seconds, 6)),
+    ('hands_per_sec', round(n_hands / seconds, 1)),
+    ('steps_per_sec', round(len(step_times) / seconds, 1)),
+    ('step_us', _percentiles(step_times)),
+    ('reset_us', _percentiles(reset_times)),
+  ])
+
+
+def measure_allocations(workload, n_hands=200, seed=0, obs_mode='tuple'):
+  """Memory allocated by `reset` and `step` over `n_hands` hands, traced with `tracemalloc`.
+
+  Returns the mean and max of the peak memory allocated within a call (memory that is freed
+  again before the call returns included), and the blocks and bytes still held at the end.
+  """
+  table = _Table(workload, seed, obs_mode)
+  env = table.env
+  # warm up, so lazily built tables and caches are not counted
+  _, info = env.reset(return_info=True)
+  tracemalloc.start()
+  try:
+    before = tracemalloc.take_snapshot()
+    peaks = []
+
+    def traced(call, *args):
+      tracemalloc.reset_peak()
+      current = tracemalloc.get_traced_memory()[0]
+      result = call(*args)
+      peaks.append(tracemalloc.get_traced_memory()[1] - current)
+      return result
+
+    for _ in range(n_hands):
+      table.rebuy()
+      _, info = traced(env.reset, True)
+      terminal = False
+      while not terminal:
+        _, _, terminal, info = traced(env.step, table.action(info))
+    after = tracemalloc.take_snapshot()
+  finally:
+    tracemalloc.stop()
+  retained = after.compare_to(before, 'filename')
+  return OrderedDict([
+    ('calls', len(peaks)),
+    ('peak_bytes_mean', round(float(np.mean(peaks)), 1)),
+    ('peak_bytes_max', int(np.max(peaks))),
+    ('retained_blocks', sum(stat.count_diff for stat in retained)),
+    ('retained_bytes', sum(stat.size_diff for stat in retained)),
+  ])
+
+
+def run(workloads=None, n_hands=1000, n_alloc_hands=200, repeat=3, seed=0, obs_mode='tuple'):
+  """Run `workloads` (all by default), keeping the fastest of `repeat` timing runs of each."""
+  results = OrderedDict()
+  for workload in workloads or WORKLOADS:
+    runs = [run_workload(workload, n_hands, seed + i, obs_mode) for i in range(repeat)]
+    result = max(runs, key=lambda r: r['hands_per_sec'])
+    if n_alloc_hands:
+      result['allocations'] = measure_allocations(workload, n_alloc_hands, seed, obs_mode)
+    results[workload] = result
+  return OrderedDict([
+    ('version', FORMAT_VERSION),
+    ('python', platform.python_version()),
+    ('numpy', np.__version__),
+    ('machine', platform.machine()),
+    ('obs_mode', obs_mode),
+    ('results', results),
+  ])
+
+
+def mismatches(report, baseline):
+  """The `SETUP` fields that differ between `report` and `baseline`, as `(field, baseline,
+  current)` rows."""
+  return [(field, baseline.get(field), report.get(field)) for field in SETUP
+          if baseline.get(field) != report.get(field)]
+
+
+def compare(report, baseline, threshold=0.05, force=False):
+  """Compare `report` against `baseline` (both as returned by `run`).
+
+  Returns `(rows, regressions)`: a `(workload, baseline, current, change)` row of hands per second
+  for every workload in both, and the workloads slower than the baseline by more than `threshold`.
+  Raises `ValueError` when the runs were made with a different setup (see `mismatches`), unless
+  `force` is set.
+  """
+  different = mismatches(report, baseline)
+  if different and not force:
+    raise ValueError('baseline was run with a different setup: {}'.format(', '.join(
+        '{} {} (now {})'.format(field, before, after) for field, before, after in different)))
+  rows, regressions = [], []
+  for workload, result in report['results'].items():
+    if workload not in baseline['results']:
+      continue
+    before = baseline['results'][workload]['hands_per_sec']
+    after = result['hands_per_sec']
+    change = after / before - 1
+    rows.append((workload, before, after, change))
+    if change < -threshold:
+      regressions.append(workload)
+  return rows, regressions
+
+
+def _print_report(report):
+  print('{:<28} {:>10} {:>11} {:>9} {:>9} {:>9} {:>12}'.format(
+      'workload', 'hands/s', 'steps/s', 'p50 us', 'p90 us', 'p99 us', 'peak B/call'))
+  for workload, result in report['results'].items():
+    step_us = result['step_us']
+    peak = result.get('allocations', {}).get('peak_bytes_mean', float('nan'))
+    print('{:<28} {:>10.1f} {:>11.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>12.1f}'.format(
+        workload, result['hands_per_sec'], result['steps_per_sec'], step_us['p50'],
+        step_us['p90'], step_us['p99'], peak))
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark TexasHoldemEnv throughput.')
+  parser.add_argument('workloads', nargs='*', default=['*'],
+                      help='workload names or patterns, e.g. "TexasHoldem-v2/*" (default: all)')
+  parser.add_argument('--hands', type=int, default=1000, help='hands per timing run')
+  parser.add_argument('--alloc-hands', type=int, default=200,
+                      help='hands traced with tracemalloc, 0 to skip')
+  parser.add_argument('--repeat', type=int, default=3, help='timing runs, the fastest is kept')
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--obs-mode', choices=['tuple', 'array', 'lazy', 'events'], default='tuple')
+  parser.add_argument('--json', default=None, help='write the results to this file, - for stdout')
+  parser.add_argument('--baseline', default=None, help='results of an earlier run to compare to')
+  parser.add_argument('--threshold', type=float, default=0.05,
+                      help='slowdown against the baseline counted as a regression')
+  parser.add_argument('--force', action='store_true',
+                      help='compare to a baseline run with a different setup, with a warning')
+  parser.add_argument('--list', action='store_true', help='list the workloads and exit')
+  args = parser.parse_args(argv)
+
+  if args.list:
+    print('\n'.join(WORKLOADS))
+    return 0
+  workloads = [w for w in WORKLOADS if any(fnmatch.fnmatch(w, p) for p in args.workloads)]
+  if not workloads:
+    parser.error('no workload matches {}'.format(' '.join(args.workloads)))
+
+  report = run(workloads, args.hands, args.alloc_hands, args.repeat, args.seed, args.obs_mode)
+  if args.json == '-':
+    json.dump(report, sys.stdout, indent=2)
+    print()
+  else:
+    _print_report(report)
+    if args.json:
+      with open(args.json, 'w') as f:
+        json.dump(report, f, indent=2)
+
+  if args.baseline:
+    with open(args.baseline) as f:
+      baseline = json.load(f)
+    out = sys.stderr if args.json == '-' else sys.stdout
+    try:
+      rows, regressions = compare(report, baseline, args.threshold, args.force)
+    except ValueError as e:
+      print('{}, not comparing (--force to compare anyway)'.format(e), file=sys.stderr)
+      return 2
+    for field, before, after in mismatches(report, baseline):
+      print('warning: baseline {} {} differs from {}'.format(field, before, after), file=sys.stderr)
+    for workload, before, after, change in rows:
+      print('{:<28} {:>10.1f} -> {:>10.1f} hands/s ({:+.1%})'.format(
+          workload, before, after, change), file=out)
+    if regressions:
+      print('regressions: {}'.format(', '.join(regressions)), file=out)
+      return 1
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
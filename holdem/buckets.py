@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Equity distribution buckets of every suit isomorphic situation, for card abstraction.
+
+For every `holdem.indexer` class of a street, the equity against a random hand is sampled over
+`n_runouts` random completions of the board (each against `n_opponents` random hands), and the
+number of completions landing in each of `n_bins` equity bins is kept as the class' histogram.
+On the river there is nothing left to deal, so all the samples go to a single equity. The
+histograms are clustered with k-means over their cumulative distributions (the L2 distance of
+which is the Cramer distance of the equity distributions), and buckets are numbered from the
+weakest to the strongest mean equity.
+
+Histograms and buckets are saved as `.npy` files in the holdem data directory, buckets are
+memory-mapped and looked up by index: `bucket(pocket, community)`. They have to be built ahead of
+time with `python -m holdem.buckets build --streets 0 1`, which spreads the work over every core
+and takes long for the later streets (there are 123,156,254 river classes).
+"""
+import argparse
+import multiprocessing
+import os
+
+import numpy as np
+
+from . import indexer
+from .deck import FULL_DECK
+from .eval import evaluate_batch, load_table
+from .utils import data_path
+
+
+HISTOGRAM_FILE = 'equity-hist-v1-{}.npy'
+BUCKET_FILE = 'buckets-v1-{}.npy'
+N_BINS = 16
+N_RUNOUTS = 32
+N_OPPONENTS = 8
+N_BUCKETS = (169, 256, 256, 256)
+_BLOCK_SIZE = 2048
+_SAMPLE_SIZE = 200000
+
+_DECK_ORDER = np.argsort(FULL_DECK)
+_SORTED_DECK = FULL_DECK[_DECK_ORDER]
+
+
+def _deck_indices(cards):
+  return _DECK_ORDER[np.searchsorted(_SORTED_DECK, cards)]
+
+
+def _deal(rng, used, n_cards):
+  # `n_cards` random deck indices per row, avoiding the `used` ones
+  keys = rng.random((len(used), 52))
+  keys[np.arange(len(used))[:, None], used] = np.inf
+  return np.argpartition(keys, n_cards, axis=1)[:, :n_cards]
+
+
+def _histogram_block(job):
+  """Equity histograms of the classes `start` to `stop` of `street`."""
+  street, start, stop, n_bins, n_runouts, n_opponents, seed = job
+  rng = np.random.default_rng(seed)
+  cards = indexer.get_indexer(street).unindex_batch(np.arange(start, stop))
+  n_rows, n_board = len(cards), cards.shape[1] - 2
+  n_dealt = 5 - n_board
+
+  used = np.repeat(_deck_indices(cards), n_runouts, axis=0)
+  dealt = _deal(rng, used, n_dealt + 2 * n_opponents)
+  boards = np.concatenate([FULL_DECK[used[:, 2:]], FULL_DECK[dealt[:, :n_dealt]]], axis=1)
+  ranks = evaluate_batch(FULL_DECK[used[:, :2]], boards)
+  share = np.zeros(len(used))
+  for o in range(n_opponents):
+    other = evaluate_batch(FULL_DECK[dealt[:, n_dealt + 2 * o:n_dealt + 2 * o + 2]], boards)
+    share += (ranks < other) + 0.5 * (ranks == other)
+  equity = share.reshape(n_rows, n_runouts) / n_opponents
+  if not n_dealt:
+    equity[:] = equity.mean(axis=1, keepdims=True)
+
+  bins = np.minimum((equity * n_bins).astype(np.int64), n_bins - 1)
+  histograms = np.zeros((n_rows, n_bins), dtype=np.uint8)
+  np.add.at(histograms, (np.repeat(np.arange(n_rows), n_runouts), bins.ravel()), 1)
+  return histograms
+
+
+def build_histograms(street, path=None, n_bins=N_BINS, n_runouts=N_RUNOUTS,
+                     n_opponents=N_OPPONENTS, seed=0, processes=None):
+  """Sample the equity histogram of every class of `street` and write them to `path`.
+
+  The file holds a `(size(street), n_bins)` `uint8` array of how many of the `n_runouts`
+  completions of the board ended up in each equity bin.
+  """
+  if not 1 <= n_runouts <= 255:
+    raise ValueError('n_runouts must be between 1 and 255.')
+  if not 1 <= n_opponents <= 22:
+    raise ValueError('n_opponents must be between 1 and 22.')
+  load_table()
+  processes = processes or os.cpu_count()
+  n_classes = indexer.size(street)
+  starts = range(0, n_classes, _BLOCK_SIZE)
+  seeds = np.random.SeedSequence([seed, street]).spawn(len(starts))
+  jobs = [(street, start, min(start + _BLOCK_SIZE, n_classes), n_bins, n_runouts, n_opponents,
+           block_seed) for start, block_seed in zip(starts, seeds)]
+
+  path = path or data_path(HISTOGRAM_FILE.format(street))
+  tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+  out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8, shape=(n_classes, n_bins))
+  if processes == 1:
+    blocks = map(_histogram_block, jobs)
+  else:
+    pool = multiprocessing.Pool(processes)
+    blocks = pool.imap(_histogram_block, jobs)
+  try:
+    for (_, start, stop, _, _, _, _), histograms in zip(jobs, blocks):
+      out[start:stop] = histograms
+  finally:
+    if processes != 1:
+      pool.close()
+      pool.join()
+  out.flush()
+  del out
+  os.replace(tmp_path, path)
+  return path
+
+
+def _distributions(histograms):
+  # cumulative equity distributions, the features k-means works on
+  histograms = np.asarray(histograms, dtype=np.float32)
+  return np.cumsum(histograms, axis=1) / histograms.sum(axis=1, keepdims=True)
+
+
+def _nearest(points, centroids, chunk=65536):
+  labels = np.empty(len(points), dtype=np.int64)
+  squared = (centroids ** 2).sum(axis=1)
+  for start in range(0, len(points), chunk):
+    block = points[start:start + chunk]
+    labels[start:start + chunk] = (squared - 2 * block.dot(centroids.T)).argmin(axis=1)
+  return labels
+
+
+def kmeans(points, k, n_iter=30, sample_size=_SAMPLE_SIZE, seed=0):
+  """Centroids of `k` clusters of `points`, by Lloyd's algorithm with k-means++ seeding.
+
+  The centroids are fitted on a random sample of `sample_size` points.
+  """
+  rng = np.random.default_rng(seed)
+  points = np.asarray(points, dtype=np.float32)
+  if len(points) > sample_size:
+    points = points[np.sort(rng.choice(len(points), sample_size, replace=False))]
+  k = min(k, len(points))
+
+  centroids = np.empty((k, points.shape[1]), dtype=np.float32)
+  centroids[0] = points[rng.integers(len(points))]
+  distance = ((points - centroids[0]) ** 2).sum(axis=1, dtype=np.float64)
+  for c in range(1, k):
+    total = distance.sum()
+    pick = rng.choice(len(points), p=distance / total) if total > 0 else rng.integers(len(points))
+    centroids[c] = points[pick]
+    distance = np.minimum(distance, ((points - centroids[c]) ** 2).sum(axis=1, dtype=np.float64))
+
+  for _ in range(n_iter):
+    labels = _nearest(points, centroids)
+    counts = np.bincount(labels, minlength=k)
+    sums = np.zeros_like(centroids)
+    np.add.at(sums, labels, points)
+    moved = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centroids)
+    # empty clusters take the points furthest from their centroid
+    empty = np.flatnonzero(counts == 0)
+    if empty.size:
+      far = ((points - moved[labels]) ** 2).sum(axis=1).argsort()[::-1][:empty.size]
+      moved[empty] = points[far]
+    if np.allclose(moved, centroids):
+      break
+    centroids = moved.astype(np.float32)
+  # number the buckets from the lowest mean equity up
+  return centroids[np.argsort(-centroids.sum(axis=1))]
+
+
+def build_buckets(street, n_buckets=None, path=None, histogram_path=None, seed=0, **kwargs):
+  """Cluster the equity histograms of `street` (building them with `kwargs` if missing) and
+  write the bucket of every class to `path`."""
+  n_buckets = n_buckets or N_BUCKETS[street]
+  histogram_path = histogram_path or data_path(HISTOGRAM_FILE.format(street))
+  if not os.path.exists(histogram_path):
+    build_histograms(street, histogram_path, seed=seed, **kwargs)
+  histograms = np.load(histogram_path, mmap_mode='r')
+
+  sample = histograms
+  if len(histograms) > _SAMPLE_SIZE:
+    rng = np.random.default_rng(seed)
+    sample = histograms[np.sort(rng.choice(len(histograms), _SAMPLE_SIZE, replace=False))]
+  centroids = kmeans(_distributions(sample), n_buckets, seed=seed)
+  dtype = np.uint8 if len(centroids) <= 256 else np.uint16
+
+  path = path or data_path(BUCKET_FILE.format(street))
+  tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+  out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(len(histograms),))
+  for start in range(0, len(histograms), 1 << 20):
+    block = _distributions(histograms[start:start + (1 << 20)])
+    out[start:start + len(block)] = _nearest(block, centroids)
+  out.flush()
+  del out
+  os.replace(tmp_path, path)
+  return path
+
+
+_buckets = {}
+
+
+def load_buckets(street, path=None, build=False):
+  """Memory-map the buckets of `street`, with `build` building them first if they are missing.
+
+  Raises `FileNotFoundError` when they are missing and `build` is not set.
+  """
+  if path is None and street in _buckets:
+    return _buckets[street]
+  bucket_path = path or data_path(BUCKET_FILE.format(street))
+  if not os.path.exists(bucket_path):
+    if not build:
+      raise FileNotFoundError(
+          'no buckets of street {} at {}, build them with `python -m holdem.buckets build '
+          '--streets {}` (or load_buckets(street, build=True)).'.format(
+              street, bucket_path, street))
+    build_buckets(street, path=bucket_path)
+  buckets = np.load(bucket_path, mmap_mode='r')
+  if buckets.shape != (indexer.size(street),):
+    raise ValueError('{} does not hold the buckets of street {}.'.format(bucket_path, street))
+  if path is None:
+    _buckets[street] = buckets
+  return buckets
+
+
+def bucket(pocket, community=()):
+  """Bucket of `pocket` with `community` (`-1` padded) within their street."""
+  street = indexer.street_of(community)
+  buckets = _buckets[street] if street in _buckets else load_buckets(street)
+  return int(buckets[indexer.index(pocket, community)])
+
+
+def bucket_batch(pockets, communities):
+  """Buckets of `(N, 2)` pockets with `(N, 5)` (`-1` padded) community cards.
+
+  Rows may be on different streets, returns `(streets, buckets)`.
+  """
+  streets, indices = indexer.index_batch(pockets, communities)
+  buckets = np.zeros(len(indices), dtype=np.int64)
+  for street in np.unique(streets).tolist():
+    rows = streets == street
+    buckets[rows] = load_buckets(street)[indices[rows]]
+  return streets, buckets
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Build the equity buckets of every street.')
+  parser.add_argument('command', choices=['build'])
+  parser.add_argument('--streets', type=int, nargs='+', default=[0, 1, 2, 3],
+                      help='0 preflop, 1 flop, 2 turn, 3 river')
+  parser.add_argument('--buckets', type=int, default=None, help='buckets per street')
+  parser.add_argument('--bins', type=int, default=N_BINS)
+  parser.add_argument('--runouts', type=int, default=N_RUNOUTS)
+  parser.add_argument('--opponents', type=int, default=N_OPPONENTS)
+  parser.add_argument('--processes', type=int, default=None)
+  parser.add_argument('--seed', type=int, default=0)
+  args = parser.parse_args()
+
+  for street in args.streets:
+    print(build_histograms(street, n_bins=args.bins, n_runouts=args.runouts,
+                           n_opponents=args.opponents, seed=args.seed, processes=args.processes))
+    print(build_buckets(street, args.buckets, seed=args.seed))
+
+
+if __name__ == '__main__':
+  main()
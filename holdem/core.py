@@ -0,0 +1,992 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Aleksander Beloi (beloi.alex@gmail.com)
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Rules of a No-Limit Texas Hold'em table: dealing, betting, side pots and showdown.
+
+`Table` plays the game without importing gym, so processes that only need the rules start
+fast. `holdem.env.TexasHoldemEnv` is the gym `Env` on top of it.
+"""
+import bisect
+import copy
+import math
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from . import events, history
+from .deck import Deck
+from .eval import Evaluator
+from .player import Player
+from .utils import Error, action_table
+
+
+N_PLAYER_FEATURES = 9
+N_COMMUNITY_FEATURES = 8
+
+# immutable record of a table, see `Table.snapshot`. Players are referred to by seat.
+TableSnapshot = namedtuple('TableSnapshot', [
+  'seats', 'deck', 'deck_seed', 'hand_index', 'community', 'discard', 'contributions', 'pots',
+  'totalpot', 'tocall', 'lastraise', 'round', 'button', 'blind_index', 'smallblind', 'bigblind', 'number_of_hands',
+  'emptyseats', 'current_player', 'folded_players', 'last_player', 'last_actions',
+])
+
+# a pot awarded at the end of a hand, `eligible` and `winners` are seats
+Pot = namedtuple('Pot', ['amount', 'eligible', 'winners'])
+
+
+def observation_layout(n_seats):
+  """Field offsets of the flat `np.int32` observation used by `obs_mode='array'`.
+
+  Maps each field name to `(offset, shape)`; the fields hold the same values, in the same
+  order, as the nested tuple observation.
+  """
+  layout = OrderedDict()
+  offset = 0
+  for name, shape in [('player_infos', (n_seats, N_PLAYER_FEATURES)),
+                      ('player_hands', (n_seats, 2)),
+                      ('community_infos', (N_COMMUNITY_FEATURES,)),
+                      ('community_cards', (5,))]:
+    layout[name] = (offset, shape)
+    offset += math.prod(shape)
+  return layout
+
+
+class Table(object):
+  """A No-Limit Texas Hold'em table, see `holdem.TexasHoldemEnv` for the arguments.
+
+  Invalid use of the table raises `Table.Error`.
+  """
+  Error = Error
+  BLIND_INCREMENTS = [[10,25], [25,50], [50,100], [75,150], [100,200],
+                      [150,300], [200,400], [300,600], [400,800], [500,10000],
+                      [600,1200], [800,1600], [1000,2000]]
+
+  def __init__(self, n_seats, debug=False, obs_mode='tuple', recorder=None,
+               invalid_action='raise', instrumentation=None, hands_per_level=None,
+               auto_advance=False):
+    self.n_seats = n_seats
+
+    self._blind_index = 0
+    [self._smallblind, self._bigblind] = Table.BLIND_INCREMENTS[0]
+    self._deck = Deck()
+    self._evaluator = Evaluator()
+
+    self.community = []
+    self._round = 0
+    self._button = 0
+    self._discard = []
+
+    self._contributions = [0] * n_seats # chips put in this hand, by seat
+    self._pots = []
+    self._totalpot = 0
+    self._tocall = 0
+    self._lastraise = 0
+    self._number_of_hands = 0
+    self._hands_per_level = hands_per_level
+
+    # fill seats with dummy players
+    self._seats = [Player(i, stack=0, emptyplayer=True) for i in range(n_seats)]
+    self.emptyseats = n_seats
+    self._player_dict = {}
+    self._current_player = None
+    self._debug = debug
+    self._recorder = recorder
+    self.instrumentation = instrumentation
+    self._last_player = None
+    self._last_actions = None
+    self._folded_players = []
+    # players still in the hand, ordered by seat
+    self._playing = []
+
+    if obs_mode not in ('tuple', 'array', 'lazy', 'events'):
+      raise self.Error(
+          'obs_mode must be one of tuple, array, lazy or events, got {}'.format(obs_mode))
+    self.obs_mode = obs_mode
+    # events since the last observation with `obs_mode='events'`, see `holdem.events`
+    self._events = [] if obs_mode == 'events' else None
+    # the latest `Observation` handed out with `obs_mode='lazy'`
+    self._observation = None
+    if invalid_action not in ('raise', 'clamp'):
+      raise self.Error(
+          'invalid_action must be one of raise or clamp, got {}'.format(invalid_action))
+    self.invalid_action = invalid_action
+    self.auto_advance = auto_advance
+    self.observation_layout = observation_layout(n_seats)
+
+    if obs_mode == 'array':
+      self._init_obs_buffer()
+
+  def _init_obs_buffer(self):
+    # a single buffer reused across steps, fields are laid out by `observation_layout`.
+    size = sum(int(np.prod(shape)) for _, shape in self.observation_layout.values())
+    self._obs_buffer = np.zeros(size, dtype=np.int32)
+    self._obs_view = self._obs_buffer.view()
+    self._obs_view.flags.writeable = False
+    self._obs_fields = {
+      name: self._obs_buffer[offset:offset + int(np.prod(shape))].reshape(shape)
+      for name, (offset, shape) in self.observation_layout.items()
+    }
+
+  def seed(self, seed=None):
+    """Seed the deck, hands are then dealt in the same order for the same seed."""
+    return [self._deck.seed(seed)]
+
+  @property
+  def hand_index(self):
+    """Index of the current hand since the deck was seeded, see `replay`."""
+    return self._deck.hand_index
+
+  def replay(self, seed, hand_index, actions, snapshot=None):
+    """Play hand `hand_index` of `seed` again with the recorded `actions`.
+
+    The table is first restored to `snapshot`, when given, which should be taken before the
+    `reset` that dealt the hand. Returns the observation of the reset followed by the
+    `(obs, rew, terminal, info)` of every step.
+    """
+    if snapshot is not None:
+      self.restore(snapshot)
+    self._deck.seed(seed, hand_index - 1)
+    results = [self.reset()]
+    for action in actions:
+      results.append(self.step(action))
+    return results
+
+  def add_player(self, seat_id, stack=2000):
+    """Add a player to the environment seat with the given stack (chipcount)"""
+    player_id = seat_id
+    if player_id not in self._player_dict:
+      new_player = Player(player_id, stack=stack, emptyplayer=False)
+      if self._seats[player_id].emptyplayer:
+        self._seats[player_id] = new_player
+        new_player.set_seat(player_id)
+      else:
+        raise self.Error('Seat already taken.')
+      self._player_dict[player_id] = new_player
+      self.emptyseats -= 1
+
+  def remove_player(self, seat_id):
+    """Remove a player from the environment seat."""
+    player_id = seat_id
+    try:
+      idx = self._seats.index(self._player_dict[player_id])
+      if self._seats[idx] in self._playing:
+        self._playing.remove(self._seats[idx])
+      self._seats[idx] = Player(0, stack=0, emptyplayer=True)
+      del self._player_dict[player_id]
+      self.emptyseats += 1
+    except ValueError:
+      pass
+
+  def reset(self, return_info=False):
+    """Deal a new hand, with `return_info` returns `(obs, info)` like `step`."""
+    instr = self.instrumentation
+    if instr is not None:
+      instr.enter('deal')
+    if self._events is not None:
+      del self._events[:]
+    self._reset_game()
+    self._ready_players()
+    if self._hands_per_level is None:
+      self._number_of_hands = 1
+      [self._smallblind, self._bigblind] = Table.BLIND_INCREMENTS[0]
+    else:
+      # move up a level of `BLIND_INCREMENTS` every `hands_per_level` hands
+      self._number_of_hands += 1
+      if self._number_of_hands > 1 and (self._number_of_hands - 1) % self._hands_per_level == 0:
+        self._increment_blinds()
+    self._playing = [p for p in self._seats if p.playing_hand]
+    if (self.emptyseats < len(self._seats) - 1):
+      players = self._playing
+      if self._recorder is not None:
+        self._recorder.begin_hand(self._button, self.n_seats, self._deck.cards,
+                                  [(p.get_seat(), p.stack) for p in players])
+      if self._events is not None:
+        self._events.append(events.event(events.HAND, self._button, amount=self.hand_index))
+      self._new_round()
+      self._round = 0
+      self._current_player = self._first_to_act(players)
+      self._post_smallblind(self._current_player)
+      self._current_player = self._next(players, self._current_player)
+      self._post_bigblind(self._current_player)
+      self._current_player = self._next(players, self._current_player)
+      self._tocall = self._bigblind
+      self._round = 0
+      self._deal_next_round()
+      self._folded_players = []
+      if instr is not None:
+        instr.count('hands')
+      if self.auto_advance:
+        self._advance(False)
+    if instr is not None:
+      instr.enter('observation')
+    obs = self._get_current_reset_returns()
+    info = self._get_info() if return_info else None
+    if instr is not None:
+      instr.enter(None)
+    if return_info:
+      return obs, info
+    return obs
+
+  def step(self, actions):
+    """
+    CHECK = 0
+    CALL = 1
+    RAISE = 2
+    FOLD = 3
+
+    RAISE_AMT = [0, minraise]
+    """
+    if len(actions) != len(self._seats):
+      raise self.Error('actions must be same shape as number of seats.')
+
+    if self._current_player is None:
+      raise self.Error('Round cannot be played without 2 or more players.')
+
+    if self._round == 4:
+      raise self.Error('Rounds already finished, needs to be reset.')
+
+    players = self._playing
+    if len(players) == 1:
+      raise self.Error('Round cannot be played with one player.')
+
+    self._last_player = self._current_player
+    self._last_actions = actions
+    instr = self.instrumentation
+    if instr is not None:
+      instr.enter('betting')
+      instr.count('steps')
+    terminal = self._play(actions)
+    if self.auto_advance:
+      terminal = self._advance(terminal)
+    return self._get_current_step_returns(terminal)
+
+  def _advance(self, terminal):
+    # play the turns of all-in players, which have nothing to decide, until someone does or
+    # the hand is over
+    instr = self.instrumentation
+    while not terminal and self._current_player.isallin:
+      if instr is not None:
+        instr.enter('betting')
+        instr.count('skipped_turns')
+      terminal = self._play(None)
+    return terminal
+
+  def _play(self, actions):
+    """Play the turn of the current player, returns whether the hand is over.
+
+    All-in players skip their turn, without looking at `actions`.
+    """
+    players = self._playing
+    instr = self.instrumentation
+    if not self._current_player.playedthisround and not all(p.isallin for p in players):
+      if self._current_player.isallin:
+        self._current_player = self._next(players, self._current_player)
+        return False
+
+      action = actions[self._current_player.player_id]
+      if self.invalid_action == 'clamp':
+        action = self._clamp_action(action)
+      move = self._current_player.player_move(
+          self._output_state(self._current_player), action, self.Error)
+      if self._recorder is not None or self._events is not None:
+        stack = self._current_player.stack
+        acting_player = self._current_player
+        betting_round = self._round
+
+      if move[0] == 'call':
+        self._player_bet(self._current_player, self._tocall)
+        if self._debug:
+          print('Player', self._current_player.player_id, move)
+        self._current_player = self._next(players, self._current_player)
+      elif move[0] == 'check':
+        self._player_bet(self._current_player, self._current_player.currentbet)
+        if self._debug:
+          print('Player', self._current_player.player_id, move)
+        self._current_player = self._next(players, self._current_player)
+      elif move[0] == 'raise':
+        self._player_bet(self._current_player, move[1]+self._current_player.currentbet)
+        if self._debug:
+          print('Player', self._current_player.player_id, move)
+        for p in players:
+          if p != self._current_player:
+            p.playedthisround = False
+        self._current_player = self._next(players, self._current_player)
+      elif move[0] == 'fold':
+        self._current_player.playing_hand = False
+        folded_player = self._current_player
+        if self._debug:
+          print('Player', self._current_player.player_id, move)
+        self._current_player = self._next(players, self._current_player)
+        players.remove(folded_player)
+        self._folded_players.append(folded_player)
+        # break if a single player left
+        if len(players) == 1:
+          self._resolve(players)
+      if self._recorder is not None:
+        self._recorder.record(history.ACTION, acting_player.get_seat(), betting_round,
+                              Player.MOVES[move[0]], stack - acting_player.stack)
+      if self._events is not None:
+        self._events.append(events.event(
+            events.ACTION, acting_player.get_seat(), betting_round, Player.MOVES[move[0]],
+            stack - acting_player.stack))
+    # players all-in from an earlier round have nothing left to play
+    closed = all(player.playedthisround or player.isallin for player in players)
+    if closed:
+      self._resolve(players)
+
+    terminal = False
+    # once the bets are matched and at most one player can still bet, nobody has a decision
+    # left, deal out the board
+    if closed and len(players) > 1 and sum(not player.isallin for player in players) <= 1:
+      if instr is not None and self._round < 4:
+        instr.enter('deal')
+        instr.count('allin_runouts')
+      while self._round < 4:
+        self._round += 1
+        self._deal_next_round()
+    if self._round == 4 or len(players) == 1:
+      terminal = True
+      if instr is not None:
+        instr.enter('showdown')
+        if len(players) > 1:
+          instr.count('showdowns')
+      self._resolve_round(players)
+      if self._recorder is not None:
+        self._recorder.end_hand(self._totalpot)
+      if self._events is not None:
+        self._events.append(events.event(events.END, amount=self._totalpot))
+    return terminal
+
+  def legal_actions(self):
+    """Legal actions of the current player.
+
+    Returns `(mask, minraise, maxraise)`, where `mask[action]` is set for every legal
+    `action_table` action and a raise amount must be within `[minraise, maxraise]`. Nothing is
+    legal once the hand is over.
+    """
+    player = self._current_player
+    if player is None or self._round == 4 or len(self._playing) < 2:
+      return np.zeros(4, dtype=bool), 0, 0
+    stack = player.stack
+    tocall = min(self._tocall - player.currentbet, stack)
+    minraise = max(self._bigblind, self._lastraise + self._tocall)
+    return np.array([tocall == 0, tocall != 0, minraise <= stack, tocall != 0]), minraise, stack
+
+  def _clamp_action(self, action):
+    # a check facing a bet becomes a call, a call or fold with nothing to call a check, and
+    # raises are clamped to [minraise, maxraise] (or become a call or check when out of reach)
+    (check, call, can_raise, fold), minraise, maxraise = self.legal_actions()
+    action_idx = int(action[0])
+    if action_idx == action_table.RAISE and can_raise:
+      return action_table.RAISE, min(max(int(action[1]), minraise), maxraise)
+    if action_idx == action_table.FOLD and fold:
+      return action_table.FOLD, 0
+    return (action_table.CALL if call else action_table.CHECK), 0
+
+  def _get_info(self):
+    mask, minraise, maxraise = self.legal_actions()
+    return {'legal_actions': mask, 'minraise': minraise, 'maxraise': maxraise,
+            'pots': self._pots, 'to_act': self.to_act}
+
+  @property
+  def to_act(self):
+    """Seat of the player who has to act next, `None` once the hand is over."""
+    player = self._current_player
+    if player is None or self._round == 4 or len(self._playing) < 2:
+      return None
+    return player.get_seat()
+
+  def snapshot(self):
+    """Immutable record of the full table state, which `restore` brings back."""
+    current, last = self._current_player, self._last_player
+    return TableSnapshot(
+      seats=tuple(player.snapshot() for player in self._seats),
+      deck=tuple(self._deck.cards),
+      deck_seed=self._deck.seed_value,
+      hand_index=self._deck.hand_index,
+      community=tuple(self.community),
+      discard=tuple(self._discard),
+      contributions=tuple(self._contributions),
+      pots=tuple(self._pots),
+      totalpot=self._totalpot,
+      tocall=self._tocall,
+      lastraise=self._lastraise,
+      round=self._round,
+      button=self._button,
+      blind_index=self._blind_index,
+      smallblind=self._smallblind,
+      bigblind=self._bigblind,
+      number_of_hands=self._number_of_hands,
+      emptyseats=self.emptyseats,
+      current_player=None if current is None else current.get_seat(),
+      folded_players=tuple(player.get_seat() for player in self._folded_players),
+      last_player=None if last is None else last.get_seat(),
+      last_actions=None if self._last_actions is None else
+          tuple(tuple(action) for action in self._last_actions),
+    )
+
+  def restore(self, snapshot):
+    """Bring the table back to the state recorded by `snapshot`."""
+    self._observation = None
+    if self._events is not None:
+      # not shared with the table a clone was copied from
+      self._events = []
+    seats = self._seats
+    for player, state in zip(seats, snapshot.seats):
+      player.restore(state)
+    self._player_dict = {player.player_id: player for player in seats if not player.emptyplayer}
+    self._playing = [player for player in seats if player.playing_hand]
+    self._deck.restore(snapshot.deck_seed, snapshot.hand_index, snapshot.deck)
+    self.community = list(snapshot.community)
+    self._discard = list(snapshot.discard)
+    self._contributions = list(snapshot.contributions)
+    self._pots = list(snapshot.pots)
+    self._totalpot = snapshot.totalpot
+    self._tocall = snapshot.tocall
+    self._lastraise = snapshot.lastraise
+    self._round = snapshot.round
+    self._button = snapshot.button
+    self._blind_index = snapshot.blind_index
+    self._smallblind = snapshot.smallblind
+    self._bigblind = snapshot.bigblind
+    self._number_of_hands = snapshot.number_of_hands
+    self.emptyseats = snapshot.emptyseats
+    self._current_player = None if snapshot.current_player is None else \
+        seats[snapshot.current_player]
+    self._folded_players = [seats[seat] for seat in snapshot.folded_players]
+    self._last_player = None if snapshot.last_player is None else seats[snapshot.last_player]
+    self._last_actions = None if snapshot.last_actions is None else \
+        [list(action) for action in snapshot.last_actions]
+
+  def clone(self):
+    """Independent copy of the table, sharing only the immutable parts (spaces, evaluator).
+
+    The clone has no recorder or instrumentation, hands played on it are not recorded.
+    """
+    other = object.__new__(type(self))
+    other.__dict__.update(self.__dict__)
+    other._recorder = None
+    other.instrumentation = None
+    other._deck = copy.copy(self._deck)
+    other._seats = [Player(i, stack=0, emptyplayer=True) for i in range(self.n_seats)]
+    if self.obs_mode == 'array':
+      other._init_obs_buffer()
+    other.restore(self.snapshot())
+    return other
+
+  def to_bytes(self):
+    """Compact versioned binary encoding of the game state, see `holdem.serialize`.
+
+    Table options are kept, a recorder or instrumentation is not.
+    """
+    from . import serialize
+    return serialize.dumps(self)
+
+  @classmethod
+  def from_bytes(cls, data, **kwargs):
+    """New table in the state encoded by `to_bytes`, `kwargs` are passed on to the constructor."""
+    from . import serialize
+    return serialize.loads(data, cls, **kwargs)
+
+  def _constructor_kwargs(self):
+    # arguments besides the table options needed to build the table again when unpickling
+    return {}
+
+  def __reduce__(self):
+    return _from_bytes, (type(self), self.to_bytes(), self._constructor_kwargs())
+
+  def _resolve(self, players):
+    instr = self.instrumentation
+    if instr is not None:
+      phase = instr.enter('sidepots')
+    self._current_player = self._first_to_act(players)
+    self._resolve_sidepots(players + self._folded_players)
+    self._new_round()
+    if instr is not None:
+      instr.enter('deal')
+    self._deal_next_round()
+    if instr is not None:
+      instr.enter(phase)
+    if self._debug:
+      print('totalpot', self._totalpot)
+
+  def _deal_next_round(self):
+    if self._round == 0:
+      self._deal()
+    elif self._round == 1:
+      self._flop()
+    elif self._round == 2:
+      self._turn()
+    elif self._round == 3:
+      self._river()
+    if self._events is not None:
+      self._log_deal()
+
+  def _log_deal(self):
+    log = self._events
+    if self._round == 0:
+      for player in self._playing:
+        log.append(events.event(events.POCKET, player.get_seat(), cards=player.hand))
+    elif self._round < 4 and len(self._playing) > 1:
+      # the board is also dealt when a fold ends the hand, but no betting round starts
+      cards = self.community if self._round == 1 else self.community[-1:]
+      log.append(events.event(events.STREET, round=self._round, cards=cards))
+
+  def _increment_blinds(self):
+    self._blind_index = min(self._blind_index + 1, len(Table.BLIND_INCREMENTS) - 1)
+    [self._smallblind, self._bigblind] = Table.BLIND_INCREMENTS[self._blind_index]
+
+  def _post_smallblind(self, player):
+    if self._debug:
+      print('player ', player.player_id, 'small blind', self._smallblind)
+    self._player_bet(player, self._smallblind)
+    player.playedthisround = False
+    if self._recorder is not None:
+      self._recorder.record(history.SMALLBLIND, player.get_seat(), amount=player.currentbet)
+    if self._events is not None:
+      self._events.append(
+          events.event(events.SMALLBLIND, player.get_seat(), amount=player.currentbet))
+
+  def _post_bigblind(self, player):
+    if self._debug:
+      print('player ', player.player_id, 'big blind', self._bigblind)
+    self._player_bet(player, self._bigblind)
+    player.playedthisround = False
+    if self._recorder is not None:
+      self._recorder.record(history.BIGBLIND, player.get_seat(), amount=player.currentbet)
+    if self._events is not None:
+      self._events.append(
+          events.event(events.BIGBLIND, player.get_seat(), amount=player.currentbet))
+    self._lastraise = self._bigblind
+
+  def _player_bet(self, player, total_bet):
+    # relative_bet is how much _additional_ money is the player betting this turn,
+    # on top of what they have already contributed
+    # total_bet is the total contribution by player to pot in this round
+    relative_bet = min(player.stack, total_bet - player.currentbet)
+    player.bet(relative_bet + player.currentbet)
+
+    self._totalpot += relative_bet
+    self._contributions[player.get_seat()] += relative_bet
+    self._tocall = max(self._tocall, total_bet)
+    if self._tocall > 0:
+      self._tocall = max(self._tocall, self._bigblind)
+    self._lastraise = max(self._lastraise, relative_bet  - self._lastraise)
+
+  def _first_to_act(self, players):
+    if self._round == 0 and len(players) == 2:
+      # heads up, the button acts first
+      button = self._seats[self._button]
+      if button in players:
+        return button
+      return self._next(players, button)
+    for player in players:
+      if player.get_seat() > self._button:
+        return player
+    return players[0]
+
+  def _next(self, players, current_player):
+    # players are ordered by seat
+    seat = current_player.get_seat()
+    for player in players:
+      if player.get_seat() > seat:
+        return player
+    return players[0]
+
+  def _deal(self):
+    for player in self._seats:
+      if player.playing_hand:
+        player.hand = self._deck.draw(2)
+
+  def _flop(self):
+    self._discard.append(self._deck.draw(1)) #burn
+    self.community = self._deck.draw(3)
+
+  def _turn(self):
+    self._discard.append(self._deck.draw(1)) #burn
+    self.community.append(self._deck.draw(1))
+
+  def _river(self):
+    self._discard.append(self._deck.draw(1)) #burn
+    self.community.append(self._deck.draw(1))
+
+  def _ready_players(self):
+    for p in self._seats:
+      if not p.emptyplayer and p.sitting_out:
+        p.sitting_out = False
+        p.playing_hand = True
+
+  def _resolve_sidepots(self, players):
+    # pots are only built at showdown (see `_build_pots`), between rounds this just tracks the
+    # side pot each player last put chips in: the number of all-in levels below them
+    contributions = self._contributions
+    levels = sorted(set(contributions[p.get_seat()] for p in players if p.isallin))
+    for p in players:
+      p.lastsidepot = bisect.bisect_left(levels, contributions[p.get_seat()])
+    if self._debug:
+      print('contributions: ', contributions)
+
+  def _new_round(self):
+    for player in self._player_dict.values():
+      player.currentbet = 0
+      player.playedthisround = False
+    self._round += 1
+    self._tocall = 0
+    self._lastraise = 0
+
+  def _build_pots(self):
+    """Split the chips put in this hand into pots, in one pass over the sorted contributions.
+
+    Returns `(amount, eligible)` pairs from the main pot up, where `eligible` are the seats still
+    in the hand that put in enough to win the pot. Chips that nobody still in the hand matched
+    go back to whoever put them in, as a pot of their own.
+    """
+    contributions = self._contributions
+    seats = self._seats
+    order = sorted((seat for seat, amount in enumerate(contributions) if amount),
+                   key=contributions.__getitem__)
+    live = [seat for seat in order if seats[seat].playing_hand]
+    pots = []
+    amount = previous = n_live = 0
+    remaining = len(order)
+    for seat in order:
+      # every seat that put in at least `level` pays into the layer up to it
+      level = contributions[seat]
+      amount += (level - previous) * remaining
+      remaining -= 1
+      previous = level
+      if seats[seat].playing_hand:
+        # the pot closes at each contribution level of a player still in the hand
+        if amount:
+          pots.append((amount, tuple(sorted(live[n_live:]))))
+          amount = 0
+        n_live += 1
+    if amount:
+      top = contributions[live[-1]] if live else 0
+      pots.extend((contributions[seat] - top, (seat,)) for seat in order
+                  if contributions[seat] > top)
+    return pots
+
+  def _resolve_round(self, players):
+    if len(players) > 1:
+      ranks = self._evaluator.evaluate_batch(
+          [player.hand for player in players], [self.community] * len(players))
+      for player, rank in zip(players, ranks.tolist()):
+        player.handrank = rank
+
+    seats = self._seats
+    recorder = self._recorder
+    log = self._events
+    pots = []
+    for pot_idx, (amount, eligible) in enumerate(self._build_pots()):
+      winners = eligible
+      if len(eligible) > 1:
+        winning_rank = min(seats[seat].handrank for seat in eligible)
+        winners = tuple(seat for seat in eligible if seats[seat].handrank == winning_rank)
+
+      split_amount = amount // len(winners)
+      for seat in winners:
+        if self._debug:
+          print('Player', seats[seat].player_id, 'wins pot', pot_idx, '(', split_amount, ')')
+        seats[seat].refund(split_amount)
+        if recorder is not None:
+          recorder.record(history.AWARD, seat, pot_idx, amount=split_amount)
+        if log is not None:
+          log.append(events.event(events.AWARD, seat, pot_idx, amount=split_amount))
+
+      # any remaining chips after splitting go to the winner in the earliest position
+      remaining = amount - split_amount * len(winners)
+      if remaining:
+        earliest = self._first_to_act([seats[seat] for seat in winners])
+        earliest.refund(remaining)
+        if recorder is not None:
+          recorder.record(history.AWARD, earliest.get_seat(), pot_idx, amount=remaining)
+        if log is not None:
+          log.append(events.event(events.AWARD, earliest.get_seat(), pot_idx, amount=remaining))
+      pots.append(Pot(amount, eligible, winners))
+
+    self._pots = pots
+    if self.instrumentation is not None:
+      contested = sum(len(pot.eligible) > 1 for pot in pots)
+      if contested > 1:
+        self.instrumentation.count('side_pots', contested - 1)
+    if len(players) == 1:
+      self._totalpot = 0
+
+  def _reset_game(self):
+    playing = 0
+    for player in self._seats:
+      if not player.emptyplayer and not player.sitting_out:
+        player.reset_hand()
+        playing += 1
+    self.community = []
+    self._totalpot = 0
+    self._contributions = [0] * len(self._seats)
+    self._pots = []
+    self._deck.shuffle()
+
+    if playing:
+      self._button = (self._button + 1) % len(self._seats)
+      while not self._seats[self._button].playing_hand:
+        self._button = (self._button + 1) % len(self._seats)
+
+  def _output_state(self, current_player):
+    # what `Player.player_move` needs to check a move, nothing per seat
+    return {
+      'community': self.community,
+      'my_seat': current_player.get_seat(),
+      'pocket_cards': current_player.hand,
+      'pot': self._totalpot,
+      'button': self._button,
+      'tocall': (self._tocall - current_player.currentbet),
+      'stack': current_player.stack,
+      'bigblind': self._bigblind,
+      'player_id': current_player.player_id,
+      'lastraise': self._lastraise,
+      'minraise': max(self._bigblind, self._lastraise + self._tocall),
+    }
+
+  def _pad(self, l, n, v):
+    if (not l) or (l is None):
+      l = []
+    return l + [v] * (n - len(l))
+
+  def _player_infos(self):
+    return tuple([
+      int(player.emptyplayer),
+      int(player.get_seat()),
+      int(player.stack),
+      int(player.playing_hand),
+      int(player.handrank),
+      int(player.playedthisround),
+      int(player.betting),
+      int(player.isallin),
+      int(player.lastsidepot),
+    ] for player in self._seats)
+
+  def _player_hands(self):
+    return tuple(self._pad(player.hand, 2, -1) for player in self._seats)
+
+  def _community_infos(self):
+    return [
+      int(self._button),
+      int(self._smallblind),
+      int(self._bigblind),
+      int(self._totalpot),
+      int(self._lastraise),
+      int(max(self._bigblind, self._lastraise + self._tocall)),
+      int(self._tocall - self._current_player.currentbet),
+      int(self._current_player.player_id),
+    ]
+
+  def _community_cards(self):
+    return self._pad(self.community, 5, -1)
+
+  def _get_current_state(self):
+    player_states = tuple(zip(self._player_infos(), self._player_hands()))
+    return (player_states, (self._community_infos(), self._community_cards()))
+
+  def _get_current_array_state(self):
+    player_infos = self._obs_fields['player_infos']
+    player_hands = self._obs_fields['player_hands']
+    for idx, player in enumerate(self._seats):
+      player_infos[idx] = (
+        player.emptyplayer,
+        player.get_seat(),
+        player.stack,
+        player.playing_hand,
+        player.handrank,
+        player.playedthisround,
+        player.betting,
+        player.isallin,
+        player.lastsidepot,
+      )
+      n_cards = len(player.hand)
+      player_hands[idx, :n_cards] = player.hand
+      player_hands[idx, n_cards:] = -1
+
+    self._obs_fields['community_infos'][:] = (
+      self._button,
+      self._smallblind,
+      self._bigblind,
+      self._totalpot,
+      self._lastraise,
+      max(self._bigblind, self._lastraise + self._tocall),
+      self._tocall - self._current_player.currentbet,
+      self._current_player.player_id,
+    )
+    community_cards = self._obs_fields['community_cards']
+    n_cards = len(self.community)
+    community_cards[:n_cards] = self.community
+    community_cards[n_cards:] = -1
+    return self._obs_view
+
+  def _get_observation(self):
+    if self.obs_mode == 'array':
+      return self._get_current_array_state()
+    if self.obs_mode == 'lazy':
+      self._observation = Observation(self)
+      return self._observation
+    if self.obs_mode == 'events':
+      obs = events.to_array(self._events)
+      del self._events[:]
+      return obs
+    return self._get_current_state()
+
+  def _get_current_reset_returns(self):
+    return self._get_observation()
+
+  def _get_current_step_returns(self, terminal):
+    instr = self.instrumentation
+    if instr is not None:
+      instr.enter('observation')
+    obs = self._get_observation()
+    # TODO, make this something else?
+    rew = [player.stack for player in self._seats]
+    info = self._get_info()
+    if instr is not None:
+      instr.enter(None)
+    return obs, rew, terminal, info
+
+
+class Observation(object):
+  """Lazy observation of a table, returned by `step` and `reset` with `obs_mode='lazy'`.
+
+  Unpacks, indexes and compares like the `(player_states, community_states)` tuple, and has
+  every field of it as an attribute, along with the scalars of `community_infos` by name and the
+  `pocket_cards` of the current player. Fields are computed from the live table on first
+  access, so the view is only valid until the next `step`, `reset` or `restore` of its table;
+  reading it later raises the table's `Error`.
+  """
+  __slots__ = ('_table', '_player_infos', '_player_hands', '_community_infos',
+               '_community_cards')
+
+  def __init__(self, table):
+    self._table = table
+    self._player_infos = None
+    self._player_hands = None
+    self._community_infos = None
+    self._community_cards = None
+
+  def _live(self):
+    table = self._table
+    if table._observation is not self:
+      raise table.Error('observation is stale, it is only valid until the next step or reset.')
+    return table
+
+  @property
+  def player_infos(self):
+    if self._player_infos is None:
+      self._player_infos = self._live()._player_infos()
+    return self._player_infos
+
+  @property
+  def player_hands(self):
+    if self._player_hands is None:
+      self._player_hands = self._live()._player_hands()
+    return self._player_hands
+
+  @property
+  def community_infos(self):
+    if self._community_infos is None:
+      self._community_infos = self._live()._community_infos()
+    return self._community_infos
+
+  @property
+  def community_cards(self):
+    if self._community_cards is None:
+      self._community_cards = self._live()._community_cards()
+    return self._community_cards
+
+  @property
+  def player_states(self):
+    return tuple(zip(self.player_infos, self.player_hands))
+
+  @property
+  def community_states(self):
+    return (self.community_infos, self.community_cards)
+
+  @property
+  def button(self):
+    return int(self._live()._button)
+
+  @property
+  def smallblind(self):
+    return int(self._live()._smallblind)
+
+  @property
+  def bigblind(self):
+    return int(self._live()._bigblind)
+
+  @property
+  def pot(self):
+    return int(self._live()._totalpot)
+
+  @property
+  def lastraise(self):
+    return int(self._live()._lastraise)
+
+  @property
+  def minraise(self):
+    table = self._live()
+    return int(max(table._bigblind, table._lastraise + table._tocall))
+
+  @property
+  def tocall(self):
+    table = self._live()
+    return int(table._tocall - table._current_player.currentbet)
+
+  @property
+  def current_player(self):
+    return int(self._live()._current_player.player_id)
+
+  @property
+  def pocket_cards(self):
+    table = self._live()
+    return table._pad(table._current_player.hand, 2, -1)
+
+  def __len__(self):
+    return 2
+
+  def __iter__(self):
+    yield self.player_states
+    yield self.community_states
+
+  def __getitem__(self, idx):
+    if idx in (0, -2):
+      return self.player_states
+    if idx in (1, -1):
+      return self.community_states
+    # slices, and the IndexError of anything else
+    return tuple(self)[idx]
+
+  def __eq__(self, other):
+    if isinstance(other, Observation):
+      other = tuple(other)
+    return tuple(self) == other
+
+  def __ne__(self, other):
+    return not self == other
+
+
+def _from_bytes(cls, data, kwargs):
+  return cls.from_bytes(data, **kwargs)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import secrets
+
+import numpy as np
+
+from treys import Deck as _TreysDeck
+
+
+FULL_DECK = np.array(_TreysDeck.GetFullDeck(), dtype=np.int64)
+CARD_INDEX = {card: idx for idx, card in enumerate(FULL_DECK.tolist())}
+
+
+def shuffled_decks(seed, batch, batch_size):
+  """Deck orders of hands `batch * batch_size` to `(batch + 1) * batch_size - 1` of `seed`.
+
+  Every batch comes from its own generator, so any hand can be dealt again from its seed and
+  index without replaying the hands before it.
+  """
+  rng = np.random.default_rng([seed, batch])
+  return FULL_DECK[np.argsort(rng.random((batch_size, 52)), axis=1)]
+
+
+class Deck(object):
+  """Seeded deck, a drop in replacement for `treys.Deck`.
+
+  Shuffled deck orders are generated `batch_size` hands at a time from `np.random.Generator`s
+  derived from the seed, and cards are dealt by moving a cursor over the current order. The
+  order of every hand is determined by `(seed, hand_index)`.
+  """
+
+  def __init__(self, seed=None, batch_size=256):
+    self.batch_size = batch_size
+    self.seed(seed)
+
+  def seed(self, seed=None, hand_index=-1):
+    """Seed the deck, the next `shuffle` deals hand `hand_index + 1` of `seed`."""
+    if seed is None:
+      # fresh entropy, as `np.random.SeedSequence()` draws it
+      seed = secrets.randbits(128)
+    self._seed = int(seed)
+    self.hand_index = hand_index
+    self._batch = None
+    self._batches = None
+    self._order = list(FULL_DECK.tolist())
+    self._cursor = 0
+    return self._seed
+
+  def shuffle(self):
+    self.hand_index += 1
+    batch, row = divmod(self.hand_index, self.batch_size)
+    if batch != self._batch:
+      self._batches = shuffled_decks(self._seed, batch, self.batch_size)
+      self._batch = batch
+    self._order = self._batches[row].tolist()
+    self._cursor = 0
+
+  def draw(self, n=1):
+    start = self._cursor
+    self._cursor += n
+    if n == 1:
+      return self._order[start]
+    return self._order[start:self._cursor]
+
+  def restore(self, seed, hand_index, cards):
+    """Put the deck back at hand `hand_index` of `seed` with `cards` left to deal."""
+    if seed != self._seed:
+      self._seed = seed
+      self._batch = None
+    self.hand_index = hand_index
+    self.cards = cards
+
+  @property
+  def seed_value(self):
+    return self._seed
+
+  @property
+  def cards(self):
+    """Cards left in the deck, in dealing order."""
+    return self._order[self._cursor:]
+
+  @cards.setter
+  def cards(self, cards):
+    self._order = list(cards)
+    self._cursor = 0
+
+  def __str__(self):
+    return str(self.cards)
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Showdown equity of pocket cards against other hands or ranges.
+
+Cards use the env's encoding (`treys.Card` ints, `-1` for a card that is not known), so the
+`player_hands` and `community_cards` of an observation can be passed straight in. When few
+enough runouts remain they are enumerated exactly, otherwise boards (and hands from ranges)
+are sampled with a seeded generator. Work is split into fixed size chunks, each with its own
+seed, which can be spread across a process pool without changing the result.
+"""
+import itertools
+from collections import namedtuple
+
+import numpy as np
+
+from .deck import CARD_INDEX, FULL_DECK
+from .eval import evaluate_batch, load_table
+
+
+CHUNK_SIZE = 20000
+
+EquityResult = namedtuple('EquityResult', ['win', 'tie', 'lose', 'trials', 'equity', 'stderr'])
+
+
+def _is_range(entry):
+  return len(entry) and not np.isscalar(entry[0])
+
+
+def _card_indices(cards):
+  return [CARD_INDEX[int(card)] for card in cards if int(card) >= 0]
+
+
+def _parse_players(pockets):
+  """Split `pockets` into a `(P, K, 2)` array of candidate hands per player (`K` padded)."""
+  players = []
+  for entry in pockets:
+    if _is_range(entry):
+      combos = [_card_indices(combo) for combo in entry]
+      if not combos or any(len(combo) != 2 for combo in combos):
+        raise ValueError('ranges must be lists of two known cards.')
+    else:
+      known = _card_indices(entry)
+      if len(known) == 2:
+        combos = [known]
+      else:
+        # unknown cards, any hand (holding the known card, if there is one)
+        combos = [list(c) for c in itertools.combinations(range(52), 2)
+                  if len(known) == 0 or known[0] in c]
+    players.append(combos)
+  return players
+
+
+def _drop_dead(players, used):
+  """Leave out the candidate hands holding any of the `used` cards, raising `ValueError` when no
+  hands can be dealt to every player together."""
+  used = set(used)
+  players = [[combo for combo in combos if not used.intersection(combo)] for combos in players]
+
+  # narrowest ranges first, so the search fails fast
+  ranges = sorted(players, key=len)
+
+  def possible(p, held):
+    # depth first search for one hand per player from `p` on, without sharing a card
+    if p == len(ranges):
+      return True
+    return any(possible(p + 1, held | set(combo)) for combo in ranges[p]
+               if not held.intersection(combo))
+
+  if not possible(0, set()):
+    raise ValueError('no hand combination is possible with these cards.')
+  return players
+
+
+def _conflicts(cards):
+  # rows of `cards` (indices into the deck) that hold the same card twice
+  ordered = np.sort(cards, axis=1)
+  return (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+
+
+def _score(hands, boards):
+  """Win, tie and equity-share totals for `hands` `(T, P, 2)` on `boards` `(T, 5)`."""
+  n_trials, n_players = hands.shape[:2]
+  ranks = evaluate_batch(
+      FULL_DECK[hands.reshape(-1, 2)], np.repeat(FULL_DECK[boards], n_players, axis=0))
+  ranks = ranks.reshape(n_trials, n_players)
+  winners = ranks == ranks.min(axis=1)[:, None]
+  n_winners = winners.sum(axis=1)[:, None]
+  share = winners / n_winners
+  win = (winners & (n_winners == 1)).sum(axis=0)
+  tie = (winners & (n_winners > 1)).sum(axis=0)
+  return win, tie, share.sum(axis=0), (share ** 2).sum(axis=0)
+
+
+def _sample_chunk(job):
+  """Monte Carlo chunk, `job` is `(players, community, dead, n_trials, seed)`."""
+  players, community, dead, n_trials, seed = job
+  rng = np.random.default_rng(seed)
+  n_players = len(players)
+  fixed = np.array(community + dead, dtype=np.int64)
+
+  hands = np.empty((n_trials, n_players, 2), dtype=np.int64)
+  todo = np.arange(n_trials)
+  # draw a hand for every player, redrawing the trials where two hands share a card
+  while todo.size:
+    for p, combos in enumerate(players):
+      combos = np.asarray(combos, dtype=np.int64)
+      hands[todo, p] = combos[rng.integers(len(combos), size=todo.size)]
+    used = np.concatenate(
+        [hands[todo].reshape(todo.size, -1), np.broadcast_to(fixed, (todo.size, fixed.size))],
+        axis=1)
+    todo = todo[_conflicts(used)]
+
+  # complete the board from the cards nobody holds
+  keys = rng.random((n_trials, 52))
+  trials = np.arange(n_trials)[:, None]
+  keys[trials, hands.reshape(n_trials, -1)] = np.inf
+  keys[:, fixed] = np.inf
+  n_missing = 5 - len(community)
+  runout = np.argpartition(keys, n_missing, axis=1)[:, :n_missing] if n_missing else \
+      np.empty((n_trials, 0), dtype=np.int64)
+  boards = np.concatenate(
+      [np.broadcast_to(np.array(community, dtype=np.int64), (n_trials, len(community))), runout],
+      axis=1)
+  return _score(hands, boards)
+
+
+def _exact_chunk(job):
+  """Exhaustive chunk, `job` is `(hands, boards)` of every combination to score."""
+  hands, boards = job
+  return _score(hands, boards)
+
+
+def _enumerate(players, community, dead):
+  """Every (hands, runout) combination, as `(T, P, 2)` hands and `(T, 5)` boards."""
+  hands, boards = [], []
+  for combo in itertools.product(*players):
+    used = set(community) | set(dead)
+    cards = [card for hand in combo for card in hand]
+    if len(set(cards)) != len(cards) or used.intersection(cards):
+      continue
+    used.update(cards)
+    deck = [card for card in range(52) if card not in used]
+    runouts = np.array(list(itertools.combinations(deck, 5 - len(community))), dtype=np.int64)
+    runouts = runouts.reshape(-1, 5 - len(community))
+    hands.append(np.broadcast_to(np.array(combo, dtype=np.int64), (len(runouts),) + (len(combo), 2)))
+    boards.append(np.concatenate(
+        [np.broadcast_to(np.array(community, dtype=np.int64), (len(runouts), len(community))),
+         runouts], axis=1))
+  if not hands:
+    raise ValueError('no hand combination is possible with these cards.')
+  return np.concatenate(hands), np.concatenate(boards)
+
+
+def _n_combinations(n, k):
+  result = 1
+  for i in range(k):
+    result = result * (n - i) // (i + 1)
+  return result
+
+
+def calculate(pockets, community=(), dead=(), n_samples=100000, exact_limit=50000, seed=None,
+              processes=None):
+  """Equity of every player in `pockets`.
+
+  pockets: one entry per player, either a pair of pocket cards (`-1` for unknown cards, a
+    random hand is dealt), or a range, a list of pairs of pocket cards.
+  community: up to 5 community cards, `-1` padding is ignored.
+  dead: cards known to be out of play (burnt or folded).
+  n_samples: number of Monte Carlo trials, when sampling.
+  exact_limit: enumerate every outcome when there are at most this many of them.
+  seed: seeds the sampler, results only depend on the seed, not on `processes`.
+  processes: size of the process pool to spread the work on, `None` runs in this process.
+
+  Returns a list of `EquityResult(win, tie, lose, trials, equity, stderr)`, one per player,
+  where `equity` counts ties as a share of the pot and `stderr` is its standard error (0 for
+  an exact enumeration).
+  """
+  players = _parse_players(pockets)
+  community = _card_indices(community)
+  dead = _card_indices(dead)
+  if len(players) < 2:
+    raise ValueError('equity needs at least 2 players.')
+  if len(community) > 5:
+    raise ValueError('there are at most 5 community cards.')
+  players = _drop_dead(players, community + dead)
+
+  n_outcomes = 1
+  for combos in players:
+    n_outcomes *= len(combos)
+  n_held = 2 * len(players)
+  n_outcomes *= _n_combinations(52 - n_held - len(community) - len(dead), 5 - len(community))
+  exact = n_outcomes <= exact_limit
+
+  if exact:
+    hands, boards = _enumerate(players, community, dead)
+    bounds = range(0, len(hands), CHUNK_SIZE)
+    jobs = [(hands[start:start + CHUNK_SIZE], boards[start:start + CHUNK_SIZE]) for start in bounds]
+    worker = _exact_chunk
+  else:
+    n_chunks = -(-n_samples // CHUNK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    jobs = [(players, community, dead, min(CHUNK_SIZE, n_samples - i * CHUNK_SIZE), seeds[i])
+            for i in range(n_chunks)]
+    worker = _sample_chunk
+
+  if processes:
+    import multiprocessing
+    # build the evaluator table before forking so the workers do not race to build it
+    load_table()
+    pool = multiprocessing.Pool(processes)
+    try:
+      results = pool.map(worker, jobs)
+    finally:
+      pool.close()
+      pool.join()
+  else:
+    results = [worker(job) for job in jobs]
+
+  win, tie, share, share_sq = [np.sum(values, axis=0) for values in zip(*results)]
+  trials = len(hands) if exact else n_samples
+  equity = share / trials
+  if exact:
+    stderr = np.zeros(len(players))
+  else:
+    variance = np.maximum(share_sq / trials - equity ** 2, 0)
+    stderr = np.sqrt(variance / trials)
+  return [EquityResult(int(w), int(t), int(trials - w - t), trials, float(e), float(s))
+          for w, t, e, s in zip(win, tie, equity, stderr)]
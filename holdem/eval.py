@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Table driven 5, 6 and 7 card hand evaluator.
+
+Hands are scored with two lookups instead of evaluating every five card subset:
+
++ the best flush (or straight flush) is looked up by the 13 bit rank mask of a suit holding
+  five or more cards.
++ every other hand is looked up by the rank counts of the cards, which are perfectly hashed
+  into a dense index (each count is between 0 and 4, so 7 cards only have 49205 rank
+  multisets).
+
+Ranks are the same as `treys.Evaluator.evaluate`: 1 is a royal flush and 7462 is the worst
+high card. The tables are generated once (from the `treys` lookup tables), stored in the
+holdem data directory and memory-mapped, so every process on a host shares the same pages.
+"""
+import itertools
+import os
+
+import numpy as np
+
+from .utils import data_path
+
+
+TABLE_FILE = 'eval-v1.npy'
+N_RANKS = 13
+MAX_RANK = 7462
+NO_FLUSH = MAX_RANK + 1
+HAND_SIZES = (5, 6, 7)
+_PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41]
+
+
+def _count_table():
+  # _COUNTS[n][k] is the number of ways n ranks can hold k cards, at most 4 of each rank.
+  counts = [[0] * 8 for _ in range(N_RANKS + 1)]
+  counts[0][0] = 1
+  for n in range(1, N_RANKS + 1):
+    for k in range(8):
+      counts[n][k] = sum(counts[n - 1][k - c] for c in range(min(k, 4) + 1))
+  return counts
+
+
+_COUNTS = _count_table()
+
+# _HASH_STEP[rank][remaining][count] is added to the index when `rank` holds `count` of the
+# `remaining` cards not yet hashed (ranks are hashed in increasing order).
+_HASH_STEP = [[[sum(_COUNTS[N_RANKS - 1 - rank][remaining - c] for c in range(count))
+                if count <= remaining else 0
+                for count in range(5)]
+               for remaining in range(8)]
+              for rank in range(N_RANKS)]
+
+_FLUSH_OFFSET = 0
+_FLUSH_SIZE = 1 << N_RANKS
+_NOFLUSH_OFFSET = {}
+_offset = _FLUSH_SIZE
+for _size in HAND_SIZES:
+  _NOFLUSH_OFFSET[_size] = _offset
+  _offset += _COUNTS[N_RANKS][_size]
+TABLE_SIZE = _offset
+del _offset, _size
+
+
+def rank_hash(counts):
+  """Dense index of a rank count vector among all vectors holding the same number of cards."""
+  remaining = sum(counts)
+  index = 0
+  for rank, count in enumerate(counts):
+    if count:
+      index += _HASH_STEP[rank][remaining][count]
+      remaining -= count
+  return index
+
+
+def _rank_count_vectors(n_cards):
+  def fill(rank, remaining):
+    if rank == N_RANKS - 1:
+      if remaining <= 4:
+        yield (remaining,)
+      return
+    for count in range(min(remaining, 4) + 1):
+      for rest in fill(rank + 1, remaining - count):
+        yield (count,) + rest
+  return fill(0, n_cards)
+
+
+def build_table(path=None):
+  """Generate the lookup tables from `treys` and write them to `path`."""
+  from treys.lookup import LookupTable
+
+  lookup = LookupTable()
+  table = np.zeros(TABLE_SIZE, dtype=np.uint16)
+
+  for mask in range(_FLUSH_SIZE):
+    ranks = [r for r in range(N_RANKS) if mask >> r & 1]
+    if len(ranks) < 5:
+      table[_FLUSH_OFFSET + mask] = NO_FLUSH
+      continue
+    table[_FLUSH_OFFSET + mask] = min(
+        lookup.flush_lookup[_PRIMES[a] * _PRIMES[b] * _PRIMES[c] * _PRIMES[d] * _PRIMES[e]]
+        for a, b, c, d, e in itertools.combinations(ranks, 5))
+
+  for n_cards in HAND_SIZES:
+    offset = _NOFLUSH_OFFSET[n_cards]
+    for counts in _rank_count_vectors(n_cards):
+      cards = [rank for rank, count in enumerate(counts) for _ in range(count)]
+      best = MAX_RANK
+      for combo in set(itertools.combinations(cards, 5)):
+        product = 1
+        for rank in combo:
+          product *= _PRIMES[rank]
+        best = min(best, lookup.unsuited_lookup[product])
+      table[offset + rank_hash(counts)] = best
+
+  path = path or data_path(TABLE_FILE)
+  # write next to the destination then rename, so concurrent builders never see a partial file
+  tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+  with open(tmp_path, 'wb') as f:
+    np.save(f, table)
+  os.replace(tmp_path, path)
+  return path
+
+
+_HASH_STEP_ARRAY = np.array(_HASH_STEP, dtype=np.int64)
+_NOFLUSH_OFFSET_ARRAY = np.array(
+    [_NOFLUSH_OFFSET.get(n_cards, -1) for n_cards in range(8)], dtype=np.int64)
+_POPCOUNT = np.array([bin(mask).count('1') for mask in range(_FLUSH_SIZE)], dtype=np.int64)
+_SUIT_BITS = (1, 2, 4, 8)
+
+_table = None
+
+
+def load_table(path=None):
+  """Memory-map the lookup tables, building them first if they are missing."""
+  global _table
+  if path is None and _table is not None:
+    return _table
+  table_path = path or data_path(TABLE_FILE)
+  if not os.path.exists(table_path):
+    build_table(table_path)
+  table = np.load(table_path, mmap_mode='r')
+  if table.shape != (TABLE_SIZE,):
+    raise ValueError('{} is not a hand evaluation table.'.format(table_path))
+  if path is None:
+    _table = table
+  return table
+
+
+def evaluate(cards, board=()):
+  """Rank of the best 5 card hand out of `cards` + `board` (5 to 7 `treys.Card` ints)."""
+  table = _table if _table is not None else load_table()
+  counts = [0] * N_RANKS
+  # rank masks indexed by the treys suit bit (1, 2, 4, 8)
+  suits = [0] * 9
+  n_cards = 0
+  for card in itertools.chain(cards, board):
+    counts[(card >> 8) & 0xF] += 1
+    suits[(card >> 12) & 0xF] |= card >> 16
+    n_cards += 1
+
+  rank = int(table[_NOFLUSH_OFFSET[n_cards] + rank_hash(counts)])
+  for mask in (suits[1], suits[2], suits[4], suits[8]):
+    if bin(mask).count('1') >= 5:
+      rank = min(rank, int(table[_FLUSH_OFFSET + mask]))
+  return rank
+
+
+def evaluate_batch(hands, boards):
+  """Vectorized `evaluate` over `(M, 2)` pocket cards and `(M, k)` boards.
+
+  Cards are `treys.Card` ints as emitted by the env, `-1` entries are ignored, so padded
+  boards can be passed as is as long as every row ends up with 5 to 7 cards. Returns an `(M,)`
+  array of ranks.
+  """
+  table = _table if _table is not None else load_table()
+  cards = np.concatenate([np.asarray(hands, dtype=np.int64), np.asarray(boards, dtype=np.int64)],
+                         axis=1)
+  present = cards >= 0
+  n_cards = present.sum(axis=1)
+  if n_cards.size and (n_cards.min() < 5 or n_cards.max() > 7):
+    raise ValueError('every hand needs between 5 and 7 cards.')
+
+  ranks = np.where(present, (cards >> 8) & 0xF, N_RANKS)
+  counts = (ranks[:, :, None] == np.arange(N_RANKS)).sum(axis=1)
+  remaining = n_cards.copy()
+  index = _NOFLUSH_OFFSET_ARRAY[n_cards]
+  for rank in range(N_RANKS):
+    count = counts[:, rank]
+    index += _HASH_STEP_ARRAY[rank, remaining, count]
+    remaining -= count
+  best = table[index].astype(np.int64)
+
+  suits = np.where(present, (cards >> 12) & 0xF, 0)
+  rank_bits = (cards >> 16) & (_FLUSH_SIZE - 1)
+  for suit in _SUIT_BITS:
+    mask = np.bitwise_or.reduce(np.where(suits == suit, rank_bits, 0), axis=1)
+    flush = _POPCOUNT[mask] >= 5
+    if flush.any():
+      best[flush] = np.minimum(best[flush], table[_FLUSH_OFFSET + mask[flush]])
+  return best
+
+
+class Evaluator(object):
+  """Drop in replacement for `treys.Evaluator.evaluate` backed by the shared lookup table."""
+
+  def evaluate(self, cards, board):
+    return evaluate(cards, board)
+
+  def evaluate_batch(self, hands, boards):
+    return evaluate_batch(hands, boards)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Event stream observations.
+
+With `obs_mode='events'`, `reset` and `step` return what happened since the previous call as
+an array of fixed width (24 byte) `EVENT_DTYPE` records, in order. Events, by `kind`:
+
++ `HAND`: a hand starts, `seat` is the button and `amount` the hand index since seeding.
++ `SMALLBLIND`, `BIGBLIND`: `seat` posted `amount`.
++ `POCKET`: `seat` was dealt `cards`.
++ `STREET`: betting round `round` (1 flop, 2 turn, 3 river) starts, dealing `cards` on the board.
++ `ACTION`: `seat` played `action` (`action_table`) in `round`, putting `amount` chips in.
++ `AWARD`: `seat` won `amount` from pot `round`.
++ `END`: the hand is over, `amount` is the total pot.
+
+Cards are `treys.Card` ints, padded with `-1`.
+"""
+import numpy as np
+
+
+HAND, SMALLBLIND, BIGBLIND, POCKET, STREET, ACTION, AWARD, END = range(8)
+KIND_NAMES = ('hand', 'smallblind', 'bigblind', 'pocket', 'street', 'action', 'award', 'end')
+MAX_CARDS = 3
+
+EVENT_DTYPE = np.dtype([
+  ('amount', '<i8'),
+  ('cards', '<i4', (MAX_CARDS,)),
+  ('kind', 'u1'),
+  ('seat', 'u1'),
+  ('round', 'u1'),
+  ('action', 'u1'),
+])
+
+_NO_CARDS = (-1,) * MAX_CARDS
+
+
+def event(kind, seat=0, round=0, action=0, amount=0, cards=()):
+  """One `EVENT_DTYPE` record as a tuple."""
+  return (amount, tuple(cards) + _NO_CARDS[len(cards):], kind, seat, round, action)
+
+
+def to_array(events):
+  """Stack `event` tuples into an `EVENT_DTYPE` array."""
+  return np.array(events, dtype=EVENT_DTYPE)
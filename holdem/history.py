@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Binary hand histories.
+
+Every hand is written as a run of fixed width (32 byte) `RECORD_DTYPE` records, appended to
+chunk files `hands-000000.bin`, `hands-000001.bin`, ... in a directory. A chunk is only closed
+between hands, so a hand never spans two files. Records of a hand, by `kind`:
+
++ `HAND`: starts a hand, `seat` is the button and `amount` the number of seats.
++ `DECK`: the deck order after the shuffle, `DECK_CARDS` cards per record as indices into
+  `treys.Deck.GetFullDeck()`, `round` is the position of the record in the deck.
++ `STACK`: the stack of `seat` when the hand starts, one per seated player.
++ `SMALLBLIND`, `BIGBLIND`: `seat` posted `amount`.
++ `ACTION`: `seat` played `action` (`action_table`) in `round`, putting `amount` chips in.
++ `AWARD`: `seat` won `amount` from side pot `round`.
++ `END`: ends the hand, `amount` is the total pot.
+
+`HandHistoryReader` memory-maps the chunks, so hands and actions are read lazily and a scan
+runs at disk speed.
+"""
+import glob
+import os
+
+import numpy as np
+
+from .deck import CARD_INDEX, FULL_DECK
+
+
+MAGIC = b'HOLDEMHH'
+VERSION = 1
+HEADER_SIZE = 16
+DECK_CARDS = 10
+
+HAND, DECK, STACK, SMALLBLIND, BIGBLIND, ACTION, AWARD, END = range(8)
+
+RECORD_DTYPE = np.dtype([
+  ('hand', '<u8'),
+  ('amount', '<i8'),
+  ('kind', 'u1'),
+  ('seat', 'u1'),
+  ('round', 'u1'),
+  ('action', 'u1'),
+  ('n_cards', 'u1'),
+  ('cards', 'u1', (DECK_CARDS,)),
+  ('pad', 'u1'),
+])
+
+
+_NO_CARDS = (0,) * DECK_CARDS
+
+
+def _header():
+  return MAGIC + np.array([VERSION, RECORD_DTYPE.itemsize], dtype='<u4').tobytes()
+
+
+class HandHistoryWriter(object):
+  """Appends hand histories to chunk files in `path`.
+
+  Records are staged in memory and written out every `buffer_size` records; a new chunk file
+  is started once the current one holds `chunk_size` records. Pass the writer to
+  `TexasHoldemEnv(..., recorder=writer)` to record every hand played.
+  """
+
+  def __init__(self, path, chunk_size=1 << 22, buffer_size=1 << 12):
+    self.path = path
+    self.chunk_size = chunk_size
+    os.makedirs(path, exist_ok=True)
+    chunks = sorted(glob.glob(os.path.join(path, 'hands-*.bin')))
+    self._chunk_index = len(chunks)
+    # keep numbering hands after the ones already in `path`
+    last_hand = HandHistoryReader(path).last_hand() if chunks else None
+    self._next_hand = 0 if last_hand is None else int(last_hand) + 1
+    self._file = None
+    self._chunk_records = 0
+    self.buffer_size = buffer_size
+    self._pending = []
+    self._hand = 0
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def _open_chunk(self):
+    if self._file is not None:
+      self._file.close()
+    name = os.path.join(self.path, 'hands-{:06d}.bin'.format(self._chunk_index))
+    self._chunk_index += 1
+    self._file = open(name, 'wb')
+    self._file.write(_header())
+    self._chunk_records = 0
+
+  def record(self, kind, seat=0, round=0, action=0, amount=0, cards=()):
+    self._pending.append((self._hand, amount, kind, seat, round, action, len(cards),
+                          tuple(cards) + _NO_CARDS[len(cards):] if cards else _NO_CARDS, 0))
+    if len(self._pending) >= self.buffer_size:
+      self.flush()
+
+  def begin_hand(self, button, n_seats, deck, stacks):
+    """Start a hand, `deck` is the shuffled deck and `stacks` maps seat to stack."""
+    self.flush()
+    if self._file is None or self._chunk_records >= self.chunk_size:
+      self._open_chunk()
+    self._hand = self._next_hand
+    self._next_hand += 1
+    self.record(HAND, seat=button, amount=n_seats)
+    cards = [CARD_INDEX[card] for card in deck]
+    for idx, start in enumerate(range(0, len(cards), DECK_CARDS)):
+      self.record(DECK, round=idx, cards=cards[start:start + DECK_CARDS])
+    for seat, stack in stacks:
+      self.record(STACK, seat=seat, amount=stack)
+    return self._hand
+
+  def end_hand(self, totalpot):
+    self.record(END, amount=totalpot)
+
+  def flush(self):
+    if not self._pending:
+      return
+    if self._file is None:
+      self._open_chunk()
+    self._file.write(np.array(self._pending, dtype=RECORD_DTYPE).tobytes())
+    self._chunk_records += len(self._pending)
+    self._pending = []
+
+  def close(self):
+    self.flush()
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+
+
+class HandHistoryReader(object):
+  """Lazily reads the hand histories written by `HandHistoryWriter` to `path`."""
+
+  def __init__(self, path):
+    self.path = path
+    self._chunks = []
+    for name in sorted(glob.glob(os.path.join(path, 'hands-*.bin'))):
+      with open(name, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+      if header[:len(MAGIC)] != MAGIC:
+        raise ValueError('{} is not a hand history chunk.'.format(name))
+      version, record_size = np.frombuffer(header[len(MAGIC):], dtype='<u4')
+      if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError('{} has an unsupported version ({}).'.format(name, version))
+      if os.path.getsize(name) > HEADER_SIZE:
+        self._chunks.append(np.memmap(name, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE))
+
+  def __len__(self):
+    return sum(len(chunk) for chunk in self._chunks)
+
+  @property
+  def n_hands(self):
+    return sum(int(np.count_nonzero(chunk['kind'] == HAND)) for chunk in self._chunks)
+
+  def last_hand(self):
+    return self._chunks[-1]['hand'][-1] if self._chunks else None
+
+  def records(self):
+    """Iterate over the memory-mapped record arrays, one per chunk."""
+    return iter(self._chunks)
+
+  def hands(self):
+    """Iterate over hands, each one the array of its records."""
+    for chunk in self._chunks:
+      starts = np.flatnonzero(chunk['kind'] == HAND)
+      ends = np.append(starts[1:], len(chunk))
+      for start, end in zip(starts, ends):
+        yield chunk[start:end]
+
+  def actions(self):
+    """Iterate over the `ACTION` records of every chunk, one array per chunk."""
+    for chunk in self._chunks:
+      yield chunk[chunk['kind'] == ACTION]
+
+
+def deck_order(hand):
+  """Deck order (`treys.Card` ints) recorded for `hand`, an array of records."""
+  decks = hand[hand['kind'] == DECK]
+  decks = decks[np.argsort(decks['round'])]
+  return [int(FULL_DECK[card]) for row in decks for card in row['cards'][:row['n_cards']]]
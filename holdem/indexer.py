@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Suit isomorphic indices of pocket and community cards.
+
+Hands that only differ by a permutation of the suits play the same, so every street maps them
+onto a dense index in `[0, size(street))`: 169 preflop, 1,286,792 on the flop, 13,960,050 on the
+turn and 123,156,254 on the river, against 1,326, 25,989,600, 305,377,800 and 2,809,475,760
+deals. The community cards are a set, their order does not matter.
+
+Every suit holds a set of pocket ranks and a set of board ranks, which is ranked on its own. The
+suits are then sorted by how many cards they hold and by that rank, and the index is the rank of
+the resulting configuration: an offset for the card counts per suit, plus the rank of the
+multiset of suit ranks of every group of suits holding the same counts (which are
+interchangeable). `unindex` inverts it, returning the canonical representative of a class.
+"""
+import bisect
+import itertools
+from math import comb
+
+import numpy as np
+
+from .deck import FULL_DECK
+
+
+N_RANKS = 13
+N_SUITS = 4
+# cards dealt in each round of a street: the pocket, then the community cards
+STREETS = [(2,), (2, 3), (2, 4), (2, 5)]
+BOARD_STREET = {0: 0, 3: 1, 4: 2, 5: 3}
+
+_SUIT_OF_BIT = np.array([-1, 0, 1, -1, 2, -1, -1, -1, 3], dtype=np.int64)
+_CARD = {((card >> 8) & 0xF, int(_SUIT_OF_BIT[(card >> 12) & 0xF])): card
+         for card in FULL_DECK.tolist()}
+_COMB = np.array([[comb(n, k) for k in range(8)] for n in range(N_RANKS + 1)], dtype=np.int64)
+_CARD_ARRAY = np.array([[_CARD[rank, suit] for suit in range(N_SUITS)] for rank in range(N_RANKS)],
+                       dtype=np.int64)
+
+
+def _free_ranks():
+  # `[used, i]` is the `i`th rank (ascending) missing from the rank mask `used`
+  masks = np.arange(1 << N_RANKS)
+  free = (masks[:, None] >> np.arange(N_RANKS) & 1) == 0
+  table = np.full((1 << N_RANKS, N_RANKS), -1, dtype=np.int64)
+  rows, ranks = np.nonzero(free)
+  table[rows, (np.cumsum(free, axis=1) - 1)[rows, ranks]] = ranks
+  return table
+
+
+_FREE_RANKS = None
+
+
+def _comb(n, k):
+  # elementwise `comb(n, k)` for `k <= 4`, exact since every partial product is a binomial
+  result = np.ones_like(n)
+  for j in range(4):
+    result = np.where(j < k, result * (n - j) // (j + 1), result)
+  return result
+
+
+def _unrank_set(index, size):
+  # the colex `index` of a `size` subset of `range(N_RANKS)`, ascending
+  elements = []
+  for k in range(size, 0, -1):
+    value = k - 1
+    while comb(value + 1, k) <= index:
+      value += 1
+    elements.append(value)
+    index -= comb(value, k)
+  return elements[::-1]
+
+
+class HandIndexer(object):
+  """Indexer of one street, `rounds` are the number of cards dealt in each of its rounds."""
+
+  def __init__(self, rounds):
+    self.rounds = tuple(rounds)
+    self.n_cards = sum(rounds)
+    self._base = 8 ** len(rounds)
+    self._card_round = np.repeat(np.arange(len(rounds)), rounds)
+
+    # card counts a suit can hold in every round, packed base 8 (first round most significant)
+    counts = [c for c in itertools.product(*(range(n + 1) for n in rounds))]
+    configs = set()
+    for suits in itertools.product(counts, repeat=N_SUITS):
+      if all(sum(s[i] for s in suits) == n for i, n in enumerate(rounds)):
+        configs.add(tuple(sorted(suits, reverse=True)))
+
+    rows = []
+    for config in configs:
+      packed = [self._pack(c) for c in config]
+      code = 0
+      for p in packed:
+        code = code * self._base + p
+      rows.append((code, config))
+    rows.sort()
+
+    self._codes = np.array([code for code, _ in rows], dtype=np.int64)
+    self._configs = [config for _, config in rows]
+    n = len(rows)
+    self._group_pos = np.zeros((n, N_SUITS), dtype=np.int64)
+    self._group_start = np.zeros((n, N_SUITS), dtype=np.int64)
+    self._group_size = np.ones((n, N_SUITS), dtype=np.int64)
+    self._mult = np.zeros((n, N_SUITS), dtype=np.int64)
+    self._config_counts = np.array(self._configs, dtype=np.int64).reshape(n, N_SUITS, -1)
+    self._groups = []
+    self._offsets = []
+    offset = 0
+    for row, config in enumerate(self._configs):
+      groups = []
+      mult = 1
+      for suits in self._group(config):
+        size = comb(self._suit_size(config[suits[0]]) + len(suits) - 1, len(suits))
+        for i, p in enumerate(suits):
+          self._group_pos[row, p] = i + 1
+          self._group_start[row, p] = suits[0]
+          self._group_size[row, p] = size
+          self._mult[row, p] = mult
+        groups.append((suits, size, mult))
+        mult *= size
+      self._groups.append(groups)
+      self._offsets.append(offset)
+      offset += mult
+    self._offset_array = np.array(self._offsets, dtype=np.int64)
+    self.size = offset
+
+    # comb(y, i) for every suit rank y a multiset of suits can hold, to unrank them
+    max_suit = max(self._suit_size(c) for c in counts)
+    self._multiset_comb = np.array(
+        [[comb(y, i) for y in range(max_suit + N_SUITS)] for i in range(N_SUITS + 1)],
+        dtype=np.int64)
+
+  def _pack(self, counts):
+    packed = 0
+    for c in counts:
+      packed = packed * 8 + c
+    return packed
+
+  @staticmethod
+  def _group(config):
+    # positions of the runs of equal counts in a sorted config
+    groups = []
+    for p, counts in enumerate(config):
+      if p and counts == config[p - 1]:
+        groups[-1].append(p)
+      else:
+        groups.append([p])
+    return groups
+
+  @staticmethod
+  def _suit_size(counts):
+    size, left = 1, N_RANKS
+    for c in counts:
+      size *= comb(left, c)
+      left -= c
+    return size
+
+  def index_batch(self, cards):
+    """Indices of an `(N, n_cards)` array of cards, each row listing its rounds in order."""
+    cards = np.asarray(cards, dtype=np.int64).reshape(-1, self.n_cards)
+    if (cards < 0).any():
+      raise ValueError('expected {} cards per row.'.format(self.n_cards))
+    n_rounds = len(self.rounds)
+    rank = (cards >> 8) & 0xF
+    suit = _SUIT_OF_BIT[(cards >> 12) & 0xF]
+    card_round = self._card_round
+
+    same_suit = suit[:, :, None] == suit[:, None, :]
+    lower = rank[:, None, :] < rank[:, :, None]
+    same_round = (card_round[:, None] == card_round[None, :])[None]
+    earlier = (card_round[None, :] < card_round[:, None])[None]
+    if (cards[:, :, None] == cards[:, None, :]).sum() != cards.size:
+      raise ValueError('cards must not repeat.')
+    # colex rank of every suit's set of ranks in a round, skipping ranks it held in earlier
+    # rounds; a card adds comb(its position among the free ranks, its order within the set)
+    order = 1 + (same_suit & same_round & lower).sum(axis=2)
+    position = rank - (same_suit & earlier & lower).sum(axis=2)
+    contrib = _COMB[position, order]
+
+    in_suit = suit[:, :, None] == np.arange(N_SUITS)
+    in_round = card_round[:, None] == np.arange(n_rounds)
+    counts = np.einsum('ncs,cr->nsr', in_suit.astype(np.int64), in_round.astype(np.int64))
+    ranks = np.einsum('nc,ncs,cr->nsr', contrib, in_suit.astype(np.int64),
+                      in_round.astype(np.int64))
+
+    # mixed radix over the rounds, the first round least significant
+    suit_index = np.zeros(counts.shape[:2], dtype=np.int64)
+    packed = np.zeros(counts.shape[:2], dtype=np.int64)
+    left = np.full(counts.shape[:2], N_RANKS, dtype=np.int64)
+    radix = np.ones(counts.shape[:2], dtype=np.int64)
+    for r in range(n_rounds):
+      suit_index += ranks[:, :, r] * radix
+      radix *= _COMB[left, counts[:, :, r]]
+      left -= counts[:, :, r]
+      packed = packed * 8 + counts[:, :, r]
+
+    # suits by decreasing counts, then increasing rank
+    key = np.sort((self._base - 1 - packed) << 32 | suit_index, axis=1)
+    packed = self._base - 1 - (key >> 32)
+    suit_index = key & 0xFFFFFFFF
+    code = np.zeros(len(cards), dtype=np.int64)
+    for p in range(N_SUITS):
+      code = code * self._base + packed[:, p]
+    config = np.searchsorted(self._codes, code)
+
+    # each group of suits with equal counts is a multiset of suit ranks, ranked in colex order
+    group_pos = self._group_pos[config]
+    terms = _comb(suit_index + group_pos - 1, group_pos) * self._mult[config]
+    return self._offset_array[config] + terms.sum(axis=1)
+
+  def unindex(self, index):
+    """Canonical cards of `index`, as a list of the cards of every round."""
+    if not 0 <= index < self.size:
+      raise ValueError('index {} out of range for {} classes.'.format(index, self.size))
+    row = bisect.bisect_right(self._offsets, index) - 1
+    config = self._configs[row]
+    rest = index - self._offsets[row]
+    suit_indices = [0] * N_SUITS
+    for suits, size, _ in self._groups[row]:
+      rest, rank = divmod(rest, size)
+      k = len(suits)
+      for i, value in zip(range(k, 0, -1), reversed(range(k))):
+        y = i - 1
+        while comb(y + 1, i) <= rank:
+          y += 1
+        rank -= comb(y, i)
+        suit_indices[suits[value]] = y - (i - 1)
+
+    rounds = [[] for _ in self.rounds]
+    for suit, (counts, suit_index) in enumerate(zip(config, suit_indices)):
+      free = list(range(N_RANKS))
+      for r, c in enumerate(counts):
+        suit_index, set_index = divmod(suit_index, comb(len(free), c))
+        chosen = [free[i] for i in _unrank_set(set_index, c)]
+        rounds[r].extend(_CARD[rank, suit] for rank in chosen)
+        free = [rank for rank in free if rank not in chosen]
+    return [sorted(cards) for cards in rounds]
+
+  def unindex_batch(self, indices):
+    """Vectorized `unindex`, returns an `(N, n_cards)` array with the rounds in order."""
+    global _FREE_RANKS
+    if _FREE_RANKS is None:
+      _FREE_RANKS = _free_ranks()
+    indices = np.asarray(indices, dtype=np.int64).ravel()
+    if indices.size and (indices.min() < 0 or indices.max() >= self.size):
+      raise ValueError('indices out of range for {} classes.'.format(self.size))
+    n = len(indices)
+    rows = np.arange(n)
+    config = np.searchsorted(self._offset_array, indices, side='right') - 1
+    rest = indices - self._offset_array[config]
+    group_pos, group_start = self._group_pos[config], self._group_start[config]
+
+    # the rank of every group's multiset, then its suit ranks from the largest down
+    remaining = rest[:, None] // self._mult[config] % self._group_size[config]
+    suit_index = np.zeros((n, N_SUITS), dtype=np.int64)
+    for i in range(N_SUITS, 0, -1):
+      for p in range(N_SUITS):
+        sel = np.flatnonzero(group_pos[:, p] == i)
+        if not sel.size:
+          continue
+        start = group_start[sel, p]
+        y = np.searchsorted(self._multiset_comb[i], remaining[sel, start], side='right') - 1
+        remaining[sel, start] -= self._multiset_comb[i, y]
+        suit_index[sel, p] = y - (i - 1)
+
+    cards = np.empty((n, self.n_cards), dtype=np.int64)
+    column = 0
+    counts = self._config_counts[config]
+    used = np.zeros((n, N_SUITS), dtype=np.int64)
+    left = np.full((n, N_SUITS), N_RANKS, dtype=np.int64)
+    for r, n_round in enumerate(self.rounds):
+      fill = np.full(n, column, dtype=np.int64)
+      round_used = np.zeros_like(used)
+      for p in range(N_SUITS):
+        c = counts[:, p, r]
+        radix = _COMB[left[:, p], c]
+        set_index = suit_index[:, p] % radix
+        suit_index[:, p] //= radix
+        for k in range(int(c.max()) if n else 0, 0, -1):
+          sel = np.flatnonzero(c >= k)
+          v = np.searchsorted(_COMB[:, k], set_index[sel], side='right') - 1
+          set_index[sel] -= _COMB[v, k]
+          rank = _FREE_RANKS[used[sel, p], v]
+          round_used[sel, p] |= 1 << rank
+          cards[sel, fill[sel]] = _CARD_ARRAY[rank, p]
+          fill[sel] += 1
+        left[:, p] -= c
+      used |= round_used
+      cards[:, column:column + n_round].sort(axis=1)
+      column += n_round
+    return cards
+
+
+_INDEXERS = {}
+
+
+def get_indexer(street):
+  """The `HandIndexer` of `street` (0 preflop to 3 river), built on first use."""
+  if street not in _INDEXERS:
+    _INDEXERS[street] = HandIndexer(STREETS[street])
+  return _INDEXERS[street]
+
+
+def size(street):
+  """Number of suit isomorphic classes of `street`."""
+  return get_indexer(street).size
+
+
+def street_of(community):
+  """Street of `community` cards as the env emits them, `-1` padded."""
+  n_cards = sum(card >= 0 for card in community)
+  if n_cards not in BOARD_STREET:
+    raise ValueError('no street has {} community cards.'.format(n_cards))
+  return BOARD_STREET[n_cards]
+
+
+def index(pocket, community=()):
+  """Index of `pocket` with `community` (`-1` padded) within their street."""
+  cards = list(pocket) + [card for card in community if card >= 0]
+  return int(get_indexer(street_of(community)).index_batch([cards])[0])
+
+
+def index_batch(pockets, communities):
+  """Indices of `(N, 2)` pockets with `(N, 5)` (`-1` padded) community cards.
+
+  Rows may be on different streets, returns `(streets, indices)`.
+  """
+  pockets = np.asarray(pockets, dtype=np.int64)
+  communities = np.asarray(communities, dtype=np.int64).reshape(len(pockets), -1)
+  n_board = (communities >= 0).sum(axis=1)
+  streets = np.full(len(pockets), -1, dtype=np.int64)
+  indices = np.zeros(len(pockets), dtype=np.int64)
+  for n_cards, street in BOARD_STREET.items():
+    rows = np.flatnonzero(n_board == n_cards)
+    if not rows.size:
+      continue
+    # move the dealt community cards to the front of every row
+    board = np.take_along_axis(
+        communities[rows], np.argsort(communities[rows] < 0, axis=1, kind='stable'), axis=1)
+    cards = np.concatenate([pockets[rows], board[:, :n_cards]], axis=1)
+    streets[rows] = street
+    indices[rows] = get_indexer(street).index_batch(cards)
+  if (streets < 0).any():
+    raise ValueError('no street has {} community cards.'.format(n_board[streets < 0][0]))
+  return streets, indices
+
+
+def unindex(street, index):
+  """Canonical `(pocket, community)` of `index` within `street`."""
+  rounds = get_indexer(street).unindex(index)
+  return rounds[0], [card for cards in rounds[1:] for card in cards]
+
+
+def unindex_batch(street, indices):
+  """Vectorized `unindex`, returns `(N, 2)` pockets and `(N, 5)` (`-1` padded) communities."""
+  cards = get_indexer(street).unindex_batch(indices)
+  communities = np.full((len(cards), 5), -1, dtype=np.int64)
+  communities[:, :cards.shape[1] - 2] = cards[:, 2:]
+  return cards[:, :2], communities
+
+
+def canonical(pocket, community=()):
+  """The canonical representative of `pocket` and `community`, `(pocket, community)`."""
+  return unindex(street_of(community), index(pocket, community))
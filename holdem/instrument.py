@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import time
+from collections import OrderedDict
+
+
+# where the time of `reset` and `step` goes
+PHASES = ('deal', 'betting', 'sidepots', 'showdown', 'observation')
+COUNTERS = ('hands', 'steps', 'showdowns', 'side_pots', 'allin_runouts', 'skipped_turns')
+
+
+class Instrumentation(object):
+  """Per phase timers and counters of a `TexasHoldemEnv(..., instrumentation=...)`.
+
+  The env switches phases as it goes, and the time between two switches is charged to the phase
+  that was running, so the phases never overlap. Every hook is called as `hook(name, value)`,
+  with the phase and its elapsed seconds when a phase ends and with the counter and its
+  increment when a counter goes up.
+  """
+
+  def __init__(self, hooks=(), clock=time.perf_counter):
+    self.hooks = list(hooks)
+    self.clock = clock
+    self.reset()
+
+  def reset(self):
+    self.timers = OrderedDict((phase, 0.0) for phase in PHASES)
+    self.counters = OrderedDict((name, 0) for name in COUNTERS)
+    self._phase = None
+    self._since = 0.0
+
+  def add_hook(self, hook):
+    self.hooks.append(hook)
+
+  def enter(self, phase):
+    """End the running phase and start `phase` (`None` when the env is idle), returns the
+    phase that was running."""
+    now = self.clock()
+    previous = self._phase
+    if previous is not None:
+      elapsed = now - self._since
+      self.timers[previous] += elapsed
+      for hook in self.hooks:
+        hook(previous, elapsed)
+    self._phase = phase
+    self._since = now
+    return previous
+
+  def count(self, name, n=1):
+    self.counters[name] += n
+    for hook in self.hooks:
+      hook(name, n)
+
+  def as_dict(self):
+    """Counters and the cumulative seconds of every phase (as `<phase>_seconds`)."""
+    result = OrderedDict(self.counters)
+    for phase, seconds in self.timers.items():
+      result[phase + '_seconds'] = seconds
+    return result
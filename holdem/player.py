@@ -22,17 +22,20 @@
 # THE SOFTWARE.
 from random import randint
 
-from gym import error
-
-from treys import Card
+from .utils import Error
 
 
 class Player(object):
+  # tables keep many players resident, slots keep them compact
+  __slots__ = ('player_id', 'hand', 'stack', 'currentbet', 'lastsidepot', '_seat', 'handrank',
+               'emptyplayer', 'betting', 'isallin', 'playing_hand', 'playedthisround',
+               'sitting_out')
 
   CHECK = 0
   CALL = 1
   RAISE = 2
   FOLD = 3
+  MOVES = {'check': CHECK, 'call': CALL, 'raise': RAISE, 'fold': FOLD}
 
   def __init__(self, player_id, stack=2000, emptyplayer=False):
     self.player_id = player_id
@@ -52,6 +55,17 @@ class Player(object):
     self.playedthisround = False
     self.sitting_out = True
 
+  def snapshot(self):
+    return (self.player_id, tuple(self.hand), self.stack, self.currentbet, self.lastsidepot,
+            self._seat, self.handrank, self.emptyplayer, self.betting, self.isallin,
+            self.playing_hand, self.playedthisround, self.sitting_out)
+
+  def restore(self, state):
+    (self.player_id, hand, self.stack, self.currentbet, self.lastsidepot, self._seat,
+     self.handrank, self.emptyplayer, self.betting, self.isallin, self.playing_hand,
+     self.playedthisround, self.sitting_out) = state
+    self.hand = list(hand)
+
   def get_seat(self):
     return self._seat
 
@@ -59,7 +73,7 @@ class Player(object):
     self._seat = value
 
   def reset_hand(self):
-    self._hand = []
+    self.hand = []
     self.playedthisround = False
     self.betting = False
     self.isallin = False
@@ -90,7 +104,7 @@ class Player(object):
     self.hand = table_state.get('pocket_cards')
 
   # cleanup
-  def player_move(self, table_state, action):
+  def player_move(self, table_state, action, error=Error):
     self.update_localstate(table_state)
     bigblind = table_state.get('bigblind')
     tocall = min(table_state.get('tocall', 0), self.stack)
@@ -101,30 +115,29 @@ class Player(object):
     action_idx = int(action_idx)
 
     if tocall == 0:
-      assert action_idx in [Player.CHECK, Player.RAISE]
       if action_idx == Player.RAISE:
         if raise_amount < minraise:
-          raise error.Error('raise must be greater than minraise {}'.format(minraise))
+          raise error('raise must be greater than minraise {}'.format(minraise))
         if raise_amount > self.stack:
-          raise error.Error('raise must be less than maxraise {}'.format(self.stack))
+          raise error('raise must be less than maxraise {}'.format(self.stack))
         move_tuple = ('raise', raise_amount)
       elif action_idx == Player.CHECK:
         move_tuple = ('check', 0)
       else:
-        raise error.Error('invalid action ({}) must be check (0) or raise (2)'.format(action_idx))
+        raise error('invalid action ({}) must be check (0) or raise (2)'.format(action_idx))
     else:
       if action_idx not in [Player.RAISE, Player.CALL, Player.FOLD]:
-        raise error.Error('invalid action ({}) must be raise (2), call (1), or fold (3)'.format(action_idx))
+        raise error('invalid action ({}) must be raise (2), call (1), or fold (3)'.format(action_idx))
       if action_idx == Player.RAISE:
         if raise_amount < minraise:
-          raise error.Error('raise must be greater than minraise {}'.format(minraise))
+          raise error('raise must be greater than minraise {}'.format(minraise))
         if raise_amount > self.stack:
-          raise error.Error('raise must be less than maxraise {}'.format(self.stack))
+          raise error('raise must be less than maxraise {}'.format(self.stack))
         move_tuple = ('raise', raise_amount)
       elif action_idx == Player.CALL:
         move_tuple = ('call', tocall)
       elif action_idx == Player.FOLD:
         move_tuple = ('fold', -1)
       else:
-        raise error.Error('invalid action ({}) must be raise (2), call (1), or fold (3)'.format(action_idx))
+        raise error('invalid action ({}) must be raise (2), call (1), or fold (3)'.format(action_idx))
     return move_tuple
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Precomputed preflop equities for the 169 starting hand classes.
+
+Classes are laid out on the usual 13x13 grid, `row * 13 + col` with ranks counted from
+deuce (0) to ace (12): pairs on the diagonal, suited hands with `row > col` and offsuit hands
+with `row < col`. The table holds
+
++ `heads_up[a, b]`, the all-in equity of class `a` against class `b`.
++ `multiway[a, n]`, the all-in equity of class `a` against `n - 1` random hands, for
+  `n` from 2 to 9.
+
+along with the standard error of every entry (`heads_up_stderr`, `multiway_stderr`). It is
+generated by `python -m holdem.preflop build` (or `build_tables`), which takes a few minutes on a
+multicore host, saved in the holdem data directory and loaded on first use.
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+
+import numpy as np
+
+from .equity import FULL_DECK, calculate
+from .eval import evaluate_batch, load_table
+from .utils import data_path
+
+
+TABLE_FILE = 'preflop-v2.npz'
+N_CLASSES = 169
+MAX_PLAYERS = 9
+RANKS = '23456789TJQKA'
+_BLOCK_SIZE = 32
+
+
+def hand_class(first, second):
+  """Starting hand class (0-168) of two pocket cards."""
+  high, low = (first >> 8) & 0xF, (second >> 8) & 0xF
+  if high < low:
+    high, low = low, high
+  if (first >> 12) & 0xF == (second >> 12) & 0xF:
+    return high * 13 + low
+  return low * 13 + high
+
+
+def class_name(index):
+  """Name of a starting hand class, e.g. `'AKs'`, `'T9o'` or `'77'`."""
+  row, col = divmod(index, 13)
+  if row == col:
+    return RANKS[row] * 2
+  if row > col:
+    return RANKS[row] + RANKS[col] + 's'
+  return RANKS[col] + RANKS[row] + 'o'
+
+
+_COMBOS = None
+
+
+def class_combos(index):
+  """Every pair of pocket cards belonging to a starting hand class."""
+  global _COMBOS
+  if _COMBOS is None:
+    _COMBOS = [[] for _ in range(N_CLASSES)]
+    for first, second in itertools.combinations(FULL_DECK.tolist(), 2):
+      _COMBOS[hand_class(first, second)].append([first, second])
+  return _COMBOS[index]
+
+
+def _class_table():
+  # (169, 12, 2) deck indices of the combos of every class, padded, and how many there are
+  table = np.zeros((N_CLASSES, 12, 2), dtype=np.int64)
+  counts = np.zeros(N_CLASSES, dtype=np.int64)
+  for first, second in itertools.combinations(range(52), 2):
+    index = hand_class(int(FULL_DECK[first]), int(FULL_DECK[second]))
+    table[index, counts[index]] = first, second
+    counts[index] += 1
+  return table, counts
+
+
+def _draw(rng, table, counts, classes):
+  return table[classes, (rng.random(len(classes)) * counts[classes]).astype(np.int64)]
+
+
+def _deal(rng, used, n_cards):
+  # `n_cards` random deck indices per row, avoiding the `used` ones
+  keys = rng.random((len(used), 52))
+  keys[np.arange(len(used))[:, None], used] = np.inf
+  return np.argpartition(keys, n_cards, axis=1)[:, :n_cards]
+
+
+def _mean_and_stderr(shares):
+  # equity of every row of `(cells, n_samples)` pot shares, and its standard error
+  mean = shares.mean(axis=1)
+  return mean, shares.std(axis=1) / np.sqrt(shares.shape[1])
+
+
+def _heads_up_block(job):
+  """Equity of the first class of every pair in `pairs` against the second one."""
+  pairs, n_samples, seed = job
+  rng = np.random.default_rng(seed)
+  table, counts = _class_table()
+  first = np.repeat(pairs[:, 0], n_samples)
+  second = np.repeat(pairs[:, 1], n_samples)
+
+  hands = _draw(rng, table, counts, first)
+  others = _draw(rng, table, counts, second)
+  clash = (hands[:, :, None] == others[:, None, :]).any(axis=(1, 2))
+  while clash.any():
+    others[clash] = _draw(rng, table, counts, second[clash])
+    clash = (hands[:, :, None] == others[:, None, :]).any(axis=(1, 2))
+
+  boards = FULL_DECK[_deal(rng, np.concatenate([hands, others], axis=1), 5)]
+  ranks = evaluate_batch(FULL_DECK[hands], boards)
+  other_ranks = evaluate_batch(FULL_DECK[others], boards)
+  share = (ranks < other_ranks) + 0.5 * (ranks == other_ranks)
+  return _mean_and_stderr(share.reshape(len(pairs), n_samples))
+
+
+def _multiway_block(job):
+  """Equity of every class in `classes` against `n_players - 1` random hands."""
+  classes, n_players, n_samples, seed = job
+  rng = np.random.default_rng(seed)
+  table, counts = _class_table()
+  hero = np.repeat(classes, n_samples)
+
+  hands = _draw(rng, table, counts, hero)
+  cards = _deal(rng, hands, 2 * (n_players - 1) + 5)
+  boards = FULL_DECK[cards[:, :5]]
+  ranks = evaluate_batch(FULL_DECK[hands], boards)
+  best_other = np.full(len(hero), np.iinfo(np.int64).max)
+  n_tied = np.zeros(len(hero), dtype=np.int64)
+  for p in range(n_players - 1):
+    other = evaluate_batch(FULL_DECK[cards[:, 5 + 2 * p:7 + 2 * p]], boards)
+    n_tied = np.where(other < best_other, 0, n_tied) + (other <= np.minimum(best_other, other))
+    best_other = np.minimum(best_other, other)
+  share = np.where(ranks < best_other, 1.0, np.where(ranks == best_other, 1.0 / (n_tied + 1), 0))
+  return _mean_and_stderr(share.reshape(len(classes), n_samples))
+
+
+def _run(worker, jobs, processes):
+  if processes == 1:
+    return [worker(job) for job in jobs]
+  pool = multiprocessing.Pool(processes)
+  try:
+    return pool.map(worker, jobs)
+  finally:
+    pool.close()
+    pool.join()
+
+
+def build_tables(path=None, heads_up_samples=10000, multiway_samples=20000, seed=0,
+                 processes=None):
+  """Generate the preflop tables and write them to `path`.
+
+  The default sample counts give standard errors of at most 0.5% (heads up) and 0.35%
+  (multiway).
+  """
+  load_table()
+  processes = processes or os.cpu_count()
+  seeds = iter(np.random.SeedSequence(seed).spawn(N_CLASSES ** 2 + N_CLASSES * MAX_PLAYERS))
+
+  # equities are symmetric, only the upper triangle is simulated
+  cells = np.array([(a, b) for a in range(N_CLASSES) for b in range(a + 1, N_CLASSES)])
+  blocks = np.array_split(cells, -(-len(cells) // _BLOCK_SIZE))
+  jobs = [(block, heads_up_samples, next(seeds)) for block in blocks]
+  equities, stderrs = [np.concatenate(values)
+                       for values in zip(*_run(_heads_up_block, jobs, processes))]
+  # a class against itself is an even split
+  heads_up = np.full((N_CLASSES, N_CLASSES), 0.5, dtype=np.float32)
+  heads_up[cells[:, 0], cells[:, 1]] = equities
+  heads_up[cells[:, 1], cells[:, 0]] = 1 - equities
+  heads_up_stderr = np.zeros((N_CLASSES, N_CLASSES), dtype=np.float32)
+  heads_up_stderr[cells[:, 0], cells[:, 1]] = stderrs
+  heads_up_stderr[cells[:, 1], cells[:, 0]] = stderrs
+
+  classes = np.arange(N_CLASSES)
+  jobs = [(block, n_players, multiway_samples, next(seeds))
+          for n_players in range(2, MAX_PLAYERS + 1)
+          for block in np.array_split(classes, -(-N_CLASSES // _BLOCK_SIZE))]
+  multiway = np.zeros((N_CLASSES, MAX_PLAYERS + 1), dtype=np.float32)
+  multiway_stderr = np.zeros((N_CLASSES, MAX_PLAYERS + 1), dtype=np.float32)
+  for (block, n_players, _, _), (equities, stderrs) in zip(
+      jobs, _run(_multiway_block, jobs, processes)):
+    multiway[block, n_players] = equities
+    multiway_stderr[block, n_players] = stderrs
+
+  path = path or data_path(TABLE_FILE)
+  tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+  with open(tmp_path, 'wb') as f:
+    np.savez(f, heads_up=heads_up, multiway=multiway, heads_up_stderr=heads_up_stderr,
+             multiway_stderr=multiway_stderr,
+             samples=np.array([heads_up_samples, multiway_samples]))
+  os.replace(tmp_path, path)
+  return path
+
+
+_tables = None
+
+
+def load_tables(path=None, build=False):
+  """Load the preflop tables, with `build` building them first if they are missing.
+
+  Raises `FileNotFoundError` when they are missing and `build` is not set.
+  """
+  global _tables
+  if path is None and _tables is not None:
+    return _tables
+  table_path = path or data_path(TABLE_FILE)
+  if not os.path.exists(table_path):
+    if not build:
+      raise FileNotFoundError(
+          'no preflop tables at {}, build them with `python -m holdem.preflop build` (or '
+          'load_tables(build=True)).'.format(table_path))
+    build_tables(table_path)
+  with np.load(table_path) as data:
+    tables = {name: data[name] for name in data.files}
+  if path is None:
+    _tables = tables
+  return tables
+
+
+def heads_up_equity(hand, other):
+  """All-in preflop equity of pocket cards `hand` against pocket cards `other`.
+
+  The equity is that of the starting hand classes, averaged over their suit combinations.
+  """
+  tables = _tables if _tables is not None else load_tables()
+  return float(tables['heads_up'][hand_class(*hand), hand_class(*other)])
+
+
+def multiway_equity(hand, n_players):
+  """All-in preflop equity of pocket cards `hand` against `n_players - 1` random hands."""
+  if not 2 <= n_players <= MAX_PLAYERS:
+    raise ValueError('n_players must be between 2 and {}.'.format(MAX_PLAYERS))
+  tables = _tables if _tables is not None else load_tables()
+  return float(tables['multiway'][hand_class(*hand), n_players])
+
+
+def verify(path=None, n_checks=50, n_samples=20000, tolerance=4.0, seed=1):
+  """Re-simulate random cells of the tables and return the ones that are off.
+
+  A cell is off when it is more than `tolerance` standard errors away from a fresh simulation
+  with `n_samples` trials (counting the error of both the table and the check).
+  """
+  tables = load_tables(path)
+  rng = np.random.default_rng(seed)
+  failures = []
+  for _ in range(n_checks):
+    a = int(rng.integers(N_CLASSES))
+    if rng.random() < 0.5:
+      b = int(rng.integers(N_CLASSES))
+      if a == b:
+        continue
+      expected = float(tables['heads_up'][a, b])
+      table_stderr = float(tables['heads_up_stderr'][a, b])
+      result = calculate([class_combos(a), class_combos(b)], n_samples=n_samples,
+                         exact_limit=0, seed=int(rng.integers(1 << 31)))[0]
+      name = '{} vs {}'.format(class_name(a), class_name(b))
+    else:
+      n_players = int(rng.integers(2, MAX_PLAYERS + 1))
+      expected = float(tables['multiway'][a, n_players])
+      table_stderr = float(tables['multiway_stderr'][a, n_players])
+      result = calculate([class_combos(a)] + [[-1, -1]] * (n_players - 1), n_samples=n_samples,
+                         exact_limit=0, seed=int(rng.integers(1 << 31)))[0]
+      name = '{} in {} way pot'.format(class_name(a), n_players)
+    if abs(expected - result.equity) > tolerance * np.hypot(result.stderr, table_stderr):
+      failures.append((name, expected, result.equity))
+  return failures
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Build or verify the preflop equity tables.')
+  parser.add_argument('command', choices=['build', 'verify'])
+  parser.add_argument('--path', default=None)
+  parser.add_argument('--heads-up-samples', type=int, default=10000)
+  parser.add_argument('--multiway-samples', type=int, default=20000)
+  parser.add_argument('--processes', type=int, default=None)
+  parser.add_argument('--seed', type=int, default=0)
+  args = parser.parse_args()
+
+  if args.command == 'build':
+    print(build_tables(args.path, args.heads_up_samples, args.multiway_samples, args.seed,
+                       args.processes))
+  else:
+    failures = verify(args.path)
+    for name, expected, actual in failures:
+      print('{}: table {:.4f}, simulated {:.4f}'.format(name, expected, actual))
+    print('{} cells off'.format(len(failures)))
+    if failures:
+      raise SystemExit(1)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from gym import error
+
+from .utils import action_table
+
+
+class BatchRunner(object):
+  """Plays hands at many `TexasHoldemEnv(..., obs_mode='array')` tables with one batched policy.
+
+  Tables waiting on a decision are queued, and the policy is called as
+  `policy(obs, legal_actions, minraise, maxraise)` with their observations stacked into an
+  `(B, obs_size)` array, `(B, 4)` legal action masks and `(B,)` raise bounds. It returns an
+  `(B, 2)` array of `[action_id, raise_amount]`, one row per queued table, which are applied to the
+  current player of each table.
+
+  The queue is handed to the policy once it holds `batch_size` decisions, once every table is
+  waiting on it, or, with `max_wait` set, once its oldest decision has waited `max_wait` seconds
+  while other tables were being stepped. All-in players are stepped past without asking.
+
+  `on_hand_end(index, env, rews)` is called whenever the hand of table `index` is over, before it
+  is dealt the next one, e.g. to rebuy players. Tables with fewer than 2 players with chips are
+  not dealt again.
+  """
+
+  def __init__(self, envs, policy, batch_size=1024, max_wait=None, on_hand_end=None,
+               clock=time.perf_counter):
+    envs = list(envs)
+    if any(env.obs_mode != 'array' for env in envs):
+      raise error.Error("BatchRunner needs tables created with obs_mode='array'.")
+    if len(set(env.n_seats for env in envs)) > 1:
+      raise error.Error('all tables must have the same number of seats.')
+    self.envs = envs
+    self.policy = policy
+    self.batch_size = batch_size
+    self.max_wait = max_wait
+    self.on_hand_end = on_hand_end
+    self.clock = clock
+
+    obs_size = envs[0]._obs_buffer.size
+    self._obs = np.empty((batch_size, obs_size), dtype=np.int32)
+    self._mask = np.empty((batch_size, 4), dtype=bool)
+    self._minraise = np.empty(batch_size, dtype=np.int64)
+    self._maxraise = np.empty(batch_size, dtype=np.int64)
+    self._noop = [[action_table.CHECK, 0]] * envs[0].n_seats
+
+  def run(self, n_hands):
+    """Play `n_hands` hands over all tables, returns counts of what was played."""
+    ready = deque()     # (table, action) to step
+    pending = []        # tables waiting on the policy, oldest first
+    queued = []         # with max_wait set, when each pending decision was queued
+    stats = OrderedDict([('hands', 0), ('steps', 0), ('policy_calls', 0), ('decisions', 0)])
+    dealt = 0
+
+    def deal(index):
+      # deal table `index` a hand that needs a decision, returns False once no more can be dealt
+      nonlocal dealt
+      env = self.envs[index]
+      while dealt < n_hands and sum(p.stack > 0 for p in env._seats if not p.emptyplayer) >= 2:
+        env.reset()
+        dealt += 1
+        if env.to_act is not None:
+          return True
+        # with auto_advance a hand between all-in players is played out by reset
+        stats['hands'] += 1
+        if self.on_hand_end is not None:
+          self.on_hand_end(index, env, [player.stack for player in env._seats])
+      return False
+
+    def queue(index):
+      if self.envs[index]._current_player.isallin:
+        ready.append((index, None))
+      else:
+        pending.append(index)
+        if self.max_wait is not None:
+          queued.append(self.clock())
+
+    for index in range(len(self.envs)):
+      if deal(index):
+        queue(index)
+
+    while ready or pending:
+      if pending:
+        if (len(pending) >= self.batch_size or not ready or
+            (self.max_wait is not None and self.clock() - queued[0] >= self.max_wait)):
+          batch, pending = pending[:self.batch_size], pending[self.batch_size:]
+          del queued[:self.batch_size]
+          n = len(batch)
+          # tables are not stepped while they wait, so their buffers still hold the observation
+          for row, index in enumerate(batch):
+            env = self.envs[index]
+            self._obs[row] = env._obs_buffer
+            self._mask[row], self._minraise[row], self._maxraise[row] = env.legal_actions()
+          actions = np.asarray(self.policy(
+              self._obs[:n], self._mask[:n], self._minraise[:n], self._maxraise[:n]))
+          ready.extend(zip(batch, actions.tolist()))
+          stats['policy_calls'] += 1
+          stats['decisions'] += n
+          continue
+
+      index, action = ready.popleft()
+      env = self.envs[index]
+      actions = self._noop
+      if action is not None:
+        actions = list(actions)
+        actions[env._current_player.player_id] = action
+      _, rews, terminal, _ = env.step(actions)
+      stats['steps'] += 1
+      if terminal:
+        stats['hands'] += 1
+        if self.on_hand_end is not None:
+          self.on_hand_end(index, env, rews)
+        if not deal(index):
+          continue
+      queue(index)
+    return stats
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Versioned binary encoding of the game state of a `holdem.core.Table`.
+
+A table is encoded as a little-endian header (magic, version, table options and the lengths of
+the variable parts), the deck seed, then one `struct` record of the counters, the seats, the
+last actions, the folded seats, the pots and the cards, as bytes indexing
+`treys.Deck.GetFullDeck()`. Chip amounts take 4 bytes, or 8 when a table outgrows them.
+Only the game state is kept: the evaluator lookup tables are shared by every table in a process,
+gym spaces are rebuilt by the constructor, and a recorder or instrumentation has to be passed
+again when decoding.
+
+Checkpoints hold many encoded tables in one file: a header with the number of tables, their
+`uint64` end offsets, then the tables back to back.
+"""
+import os
+import struct
+
+import numpy as np
+
+from .core import Pot, Table, TableSnapshot
+from .deck import FULL_DECK
+from .utils import Error
+
+
+MAGIC = b'HTBL'
+VERSION = 1
+CHECKPOINT_MAGIC = b'HOLDEMCK'
+CHECKPOINT_VERSION = 1
+
+# magic, version, obs_mode, invalid_action, flags, n_seats, hands_per_level (-1 for None),
+# bytes of the deck seed, then the lengths of the variable parts: deck, community, discard,
+# folded seats, pots and seats eligible for or winning a pot
+_HEADER = struct.Struct('<4sBBBBHiHBBBHHH')
+_CHECKPOINT_HEADER = struct.Struct('<8sIQ')
+
+_DEBUG = 1
+_WIDE = 2             # chip amounts don't fit in an int32
+_LAST_ACTIONS = 4
+_AUTO_ADVANCE = 8
+
+_OBS_MODES = ('tuple', 'array', 'lazy', 'events')
+_INVALID_ACTIONS = ('raise', 'clamp')
+
+_CARDS = FULL_DECK.tolist()
+_CARD_INDEX = {card: idx for idx, card in enumerate(_CARDS)}
+_NO_CARD = 255
+_CARDS_OR_NONE = _CARDS + [-1] * (_NO_CARD + 1 - len(_CARDS))
+
+_bodies = {}
+
+
+def _body(n_seats, lengths, flags):
+  """`struct.Struct` of everything after the header and the deck seed."""
+  key = (n_seats, lengths, flags & (_WIDE | _LAST_ACTIONS))
+  body = _bodies.get(key)
+  if body is None:
+    n_deck, n_community, n_discard, n_folded, n_pots, n_pot_seats = lengths
+    chips = 'q' if flags & _WIDE else 'i'
+    # hand_index, totalpot, tocall, lastraise, round, button, blind_index, smallblind, bigblind,
+    # number_of_hands, emptyseats, current_player, last_player (-1 for None)
+    fmt = ['<q', chips * 3, 'bHH', chips * 2, 'qHhh']
+    # player_id, stack, currentbet, lastsidepot, seat, handrank, flags, contribution, pocket cards
+    fmt.append(('H' + chips * 2 + 'HhhB' + chips + 'BB') * n_seats)
+    if flags & _LAST_ACTIONS:
+      fmt.append(('b' + chips) * n_seats)
+    fmt.append('H' * n_folded)
+    # amount, number of eligible seats and of winners, then the seats
+    fmt.append((chips + 'HH') * n_pots + 'H' * n_pot_seats)
+    fmt.append('B' * (n_deck + n_community + n_discard))
+    body = _bodies[key] = struct.Struct(''.join(fmt))
+  return body
+
+
+def dumps(table):
+  """Encode the game state of `table`, see `Table.to_bytes`."""
+  snapshot = table.snapshot()
+  n_seats = table.n_seats
+  seed = snapshot.deck_seed
+  seed_bytes = seed.to_bytes(seed.bit_length() // 8 + 1, 'little', signed=True)
+
+  values = [snapshot.hand_index, snapshot.totalpot, snapshot.tocall, snapshot.lastraise,
+            snapshot.round, snapshot.button, snapshot.blind_index, snapshot.smallblind,
+            snapshot.bigblind, snapshot.number_of_hands, snapshot.emptyseats,
+            -1 if snapshot.current_player is None else snapshot.current_player,
+            -1 if snapshot.last_player is None else snapshot.last_player]
+  for state, contribution in zip(snapshot.seats, snapshot.contributions):
+    (player_id, hand, stack, currentbet, lastsidepot, seat, handrank, emptyplayer, betting,
+     isallin, playing_hand, playedthisround, sitting_out) = state
+    player_flags = (emptyplayer | betting << 1 | isallin << 2 | playing_hand << 3 |
+                    playedthisround << 4 | sitting_out << 5)
+    values += [player_id, stack, currentbet, lastsidepot, seat, handrank, player_flags,
+               contribution]
+    values += [_CARD_INDEX[card] for card in hand]
+    values += [_NO_CARD] * (2 - len(hand))
+
+  flags = (_DEBUG if table._debug else 0) | (_AUTO_ADVANCE if table.auto_advance else 0)
+  if snapshot.last_actions is not None:
+    flags |= _LAST_ACTIONS
+    for action_idx, amount in snapshot.last_actions:
+      values += [int(action_idx), int(amount)]
+  values += snapshot.folded_players
+  n_pot_seats = 0
+  for amount, eligible, winners in snapshot.pots:
+    values += [amount, len(eligible), len(winners)]
+    n_pot_seats += len(eligible) + len(winners)
+  for _, eligible, winners in snapshot.pots:
+    values += eligible
+    values += winners
+  for cards in (snapshot.deck, snapshot.community, snapshot.discard):
+    values += [_CARD_INDEX[card] for card in cards]
+  hands_per_level = table._hands_per_level
+  lengths = (len(snapshot.deck), len(snapshot.community), len(snapshot.discard),
+             len(snapshot.folded_players), len(snapshot.pots), n_pot_seats)
+  try:
+    body = _body(n_seats, lengths, flags).pack(*values)
+  except struct.error:
+    flags |= _WIDE
+    body = _body(n_seats, lengths, flags).pack(*values)
+  header = _HEADER.pack(
+      MAGIC, VERSION, _OBS_MODES.index(table.obs_mode),
+      _INVALID_ACTIONS.index(table.invalid_action), flags, n_seats,
+      -1 if hands_per_level is None else hands_per_level, len(seed_bytes), *lengths)
+  return b''.join([header, seed_bytes, body])
+
+
+def _header(data):
+  if len(data) < _HEADER.size:
+    raise Error('not an encoded table.')
+  fields = _HEADER.unpack_from(data)
+  if fields[0] != MAGIC:
+    raise Error('not an encoded table.')
+  if fields[1] != VERSION:
+    raise Error('unsupported table encoding version {}, expected {}'.format(fields[1], VERSION))
+  return fields
+
+
+def options(data):
+  """Table options encoded in `data`, the arguments of `Table(**options(data))`."""
+  _, _, obs_mode, invalid_action, flags, n_seats, hands_per_level = _header(data)[:7]
+  return {
+    'n_seats': n_seats,
+    'debug': bool(flags & _DEBUG),
+    'obs_mode': _OBS_MODES[obs_mode],
+    'invalid_action': _INVALID_ACTIONS[invalid_action],
+    'hands_per_level': None if hands_per_level < 0 else hands_per_level,
+    'auto_advance': bool(flags & _AUTO_ADVANCE),
+  }
+
+
+def decode(data):
+  """The `TableSnapshot` encoded in `data`, which a table with the same options can `restore`."""
+  fields = _header(data)
+  flags, n_seats, seed_size = fields[4], fields[5], fields[7]
+  lengths = fields[8:]
+  n_deck, n_community, n_discard, n_folded, n_pots, _ = lengths
+  offset = _HEADER.size
+  seed = int.from_bytes(data[offset:offset + seed_size], 'little', signed=True)
+  values = _body(n_seats, lengths, flags).unpack_from(data, offset + seed_size)
+
+  (hand_index, totalpot, tocall, lastraise, round_, button, blind_index, smallblind, bigblind,
+   number_of_hands, emptyseats, current_player, last_player) = values[:13]
+  pos = 13
+  cards = _CARDS_OR_NONE
+  seats = []
+  contributions = []
+  for _ in range(n_seats):
+    (player_id, stack, currentbet, lastsidepot, seat, handrank, player_flags, contribution,
+     card0, card1) = values[pos:pos + 10]
+    pos += 10
+    hand = () if card0 == _NO_CARD else (cards[card0], cards[card1])
+    seats.append((player_id, hand, stack, currentbet, lastsidepot, seat, handrank,
+                  bool(player_flags & 1), bool(player_flags & 2), bool(player_flags & 4),
+                  bool(player_flags & 8), bool(player_flags & 16), bool(player_flags & 32)))
+    contributions.append(contribution)
+
+  last_actions = None
+  if flags & _LAST_ACTIONS:
+    last_actions = tuple(zip(values[pos:pos + n_seats * 2:2], values[pos + 1:pos + n_seats * 2:2]))
+    pos += n_seats * 2
+  folded_players = values[pos:pos + n_folded]
+  pos += n_folded
+
+  pot_sizes = values[pos:pos + n_pots * 3]
+  pos += n_pots * 3
+  pots = []
+  for idx in range(0, n_pots * 3, 3):
+    amount, n_eligible, n_winners = pot_sizes[idx:idx + 3]
+    eligible = values[pos:pos + n_eligible]
+    pos += n_eligible
+    pots.append(Pot(amount, eligible, values[pos:pos + n_winners]))
+    pos += n_winners
+
+  deck = tuple([cards[card] for card in values[pos:pos + n_deck]])
+  pos += n_deck
+  community = tuple([cards[card] for card in values[pos:pos + n_community]])
+  pos += n_community
+  discard = tuple([cards[card] for card in values[pos:pos + n_discard]])
+
+  return TableSnapshot(
+    seats=tuple(seats),
+    deck=deck,
+    deck_seed=seed,
+    hand_index=hand_index,
+    community=community,
+    discard=discard,
+    contributions=tuple(contributions),
+    pots=tuple(pots),
+    totalpot=totalpot,
+    tocall=tocall,
+    lastraise=lastraise,
+    round=round_,
+    button=button,
+    blind_index=blind_index,
+    smallblind=smallblind,
+    bigblind=bigblind,
+    number_of_hands=number_of_hands,
+    emptyseats=emptyseats,
+    current_player=None if current_player < 0 else current_player,
+    folded_players=folded_players,
+    last_player=None if last_player < 0 else last_player,
+    last_actions=last_actions,
+  )
+
+
+def loads(data, cls=Table, **kwargs):
+  """New `cls` table in the state encoded in `data`, see `Table.from_bytes`."""
+  table_options = options(data)
+  table_options.update(kwargs)
+  table = cls(**table_options)
+  table.restore(decode(data))
+  return table
+
+
+def save_tables(path, tables):
+  """Write the game state of every table in `tables` to a single checkpoint file at `path`."""
+  blobs = [dumps(table) for table in tables]
+  ends = np.cumsum([len(blob) for blob in blobs], dtype='<u8')
+  # write next to the destination then rename, so a crash never leaves a partial checkpoint
+  tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+  with open(tmp_path, 'wb') as f:
+    f.write(_CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, len(blobs)))
+    f.write(ends.tobytes())
+    f.writelines(blobs)
+  os.replace(tmp_path, path)
+  return path
+
+
+def load_tables(path, cls=Table, **kwargs):
+  """Tables saved by `save_tables`, as `cls` instances created with `kwargs`."""
+  with open(path, 'rb') as f:
+    data = f.read()
+  magic, version, count = _CHECKPOINT_HEADER.unpack_from(data)
+  if magic != CHECKPOINT_MAGIC:
+    raise Error('{} is not a table checkpoint.'.format(path))
+  if version != CHECKPOINT_VERSION:
+    raise Error('unsupported checkpoint version {}, expected {}'.format(
+        version, CHECKPOINT_VERSION))
+  offset = _CHECKPOINT_HEADER.size
+  ends = np.frombuffer(data, dtype='<u8', count=count, offset=offset).tolist()
+  data = memoryview(data)[offset + count * 8:]
+  tables = []
+  start = 0
+  for end in ends:
+    tables.append(loads(data[start:end], cls, **kwargs))
+    start = end
+  return tables
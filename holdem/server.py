@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""Hosts `TexasHoldemEnv` tables in one asyncio event loop for agents in other processes.
+
+Every message is a little endian frame: a `uint32` payload length, a `uint8` message type and
+the payload. Clients send
+
++ `JOIN` `(uint32 table, int32 seat, int64 stack)`, seat `-1` takes any empty seat.
++ `ACT` `(uint32 turn, uint8 action, int64 amount)`, an `action_table` action answering the
+  observation of `turn`.
++ `LEAVE` `()`, give up the seat once the hand is over (folding when asked to act meanwhile).
+
+and the server answers with
+
++ `SEATED` `(uint32 table, uint8 seat, uint8 n_seats)`, the player is dealt in from the next hand.
++ `OBSERVATION` `(uint32 turn, uint32 timeout_ms, uint8 legal_actions, int64 minraise,
+  int64 maxraise)` followed by the `int32` observation of `obs_mode='array'` (see
+  `holdem.env.observation_layout`), with the pocket cards of the other seats hidden as `-1`.
+  It is only sent to the seat that has to act, `legal_actions` has bit `i` set for every legal
+  action `i`.
++ `HAND_OVER` `(uint32 hand)` followed by the `int64` stacks of every seat and the 5 `int32`
+  community cards, sent to every seated player.
++ `LEFT` `(uint32 table, uint8 seat)`, the seat was given up or the player busted.
++ `ERROR` `(utf-8 message)`.
+
+A seat that does not answer within `action_timeout` seconds, or whose connection is gone, plays
+`default_action` (check if possible, fold otherwise). Actions are clamped onto legal ones.
+"""
+import argparse
+import asyncio
+import socket
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from gym import error
+
+from .env import TexasHoldemEnv, observation_layout
+from .utils import action_table
+
+
+JOIN, ACT, LEAVE = 1, 2, 3
+SEATED, OBSERVATION, HAND_OVER, LEFT, ERROR = 16, 17, 18, 19, 20
+
+_HEADER = struct.Struct('<IB')
+_JOIN = struct.Struct('<Iiq')
+_ACT = struct.Struct('<IBq')
+_SEATED = struct.Struct('<IBB')
+_OBSERVATION = struct.Struct('<IIBqq')
+_HAND_OVER = struct.Struct('<I')
+_LEFT = struct.Struct('<IB')
+
+MAX_MESSAGE = 1 << 20
+
+Seated = namedtuple('Seated', ['table', 'seat', 'n_seats'])
+Observation = namedtuple('Observation', [
+  'turn', 'timeout', 'legal_actions', 'minraise', 'maxraise', 'player_infos', 'player_hands',
+  'community_infos', 'community_cards'])
+HandOver = namedtuple('HandOver', ['hand', 'stacks', 'community_cards'])
+Left = namedtuple('Left', ['table', 'seat'])
+
+
+def encode(kind, payload=b''):
+  return _HEADER.pack(len(payload), kind) + payload
+
+
+async def read_message(reader):
+  """Read one frame, returns `(kind, payload)`."""
+  length, kind = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+  if length > MAX_MESSAGE:
+    raise error.Error('message of {} bytes is too long.'.format(length))
+  return kind, await reader.readexactly(length)
+
+
+def default_action(mask, minraise, maxraise):
+  if mask[action_table.CHECK]:
+    return action_table.CHECK, 0
+  return action_table.FOLD, 0
+
+
+class _Connection(object):
+
+  def __init__(self, reader, writer):
+    self.reader = reader
+    self.writer = writer
+    self.table = None
+    self.seat = None
+    self.leaving = False
+    self.task = asyncio.current_task()
+
+  def send(self, kind, payload=b''):
+    if not self.writer.is_closing():
+      self.writer.write(encode(kind, payload))
+
+
+class _Table(object):
+
+  def __init__(self, table_id, n_seats, env_kwargs):
+    self.table_id = table_id
+    self.env = TexasHoldemEnv(n_seats, obs_mode='array', **env_kwargs)
+    self.layout = observation_layout(n_seats)
+    self.conns = {}      # seat: connection, including players waiting for the next hand
+    self.joining = {}    # seat: stack, added to the env between hands
+    self.turn = 0
+    self.waiting = None  # (seat, turn, future) of the pending decision
+    self.in_hand = False
+    self.changed = asyncio.Event()
+
+  def funded(self):
+    return sum(not p.emptyplayer and p.stack > 0 for p in self.env._seats) + len(self.joining)
+
+
+class TableServer(object):
+  """Serves `n_tables` tables of `n_seats`, see the module docstring for the protocol.
+
+  `env_kwargs` are passed on to every `TexasHoldemEnv`. `default_action(mask, minraise, maxraise)`
+  returns the `(action, amount)` played for seats that time out or disconnected.
+  """
+
+  def __init__(self, n_tables=1, n_seats=2, action_timeout=5.0, default_action=default_action,
+               **env_kwargs):
+    env_kwargs.setdefault('invalid_action', 'clamp')
+    self.n_tables = n_tables
+    self.n_seats = n_seats
+    self.action_timeout = action_timeout
+    self.default_action = default_action
+    self.tables = None
+    self._env_kwargs = env_kwargs
+    self._servers = []
+    self._tasks = []
+    self._conns = set()
+
+  async def start(self, host='127.0.0.1', port=0, path=None):
+    """Listen on `host:port` (a free port for `0`) or on the Unix socket `path`.
+
+    Returns the `asyncio.Server`, `server.sockets[0].getsockname()` gives the address.
+    """
+    self._start_tables()
+    if path is not None:
+      server = await asyncio.start_unix_server(self._serve, path)
+    else:
+      server = await asyncio.start_server(self._serve, host, port)
+    self._servers.append(server)
+    return server
+
+  async def connect_local(self):
+    """A `Client` connected to this server through a socket pair, without listening anywhere."""
+    self._start_tables()
+    ours, theirs = socket.socketpair()
+    reader, writer = await asyncio.open_connection(sock=ours)
+    self._tasks.append(asyncio.ensure_future(self._serve(reader, writer)))
+    return await Client.open(sock=theirs)
+
+  async def close(self):
+    """Stop listening, stop the tables and hang up on every client."""
+    for server in self._servers:
+      server.close()
+    for task in self._tasks:
+      task.cancel()
+    await asyncio.gather(*self._tasks, return_exceptions=True)
+    conns = list(self._conns)
+    for conn in conns:
+      conn.writer.close()
+    # let the handlers see the connections go and return
+    await asyncio.gather(*(conn.task for conn in conns), return_exceptions=True)
+    for server in self._servers:
+      await server.wait_closed()
+    self._servers, self._tasks, self.tables = [], [], None
+
+  def _start_tables(self):
+    if self.tables is None:
+      self.tables = [_Table(i, self.n_seats, self._env_kwargs) for i in range(self.n_tables)]
+      self._tasks.extend(asyncio.ensure_future(self._run_table(t)) for t in self.tables)
+
+  async def _serve(self, reader, writer):
+    conn = _Connection(reader, writer)
+    self._conns.add(conn)
+    try:
+      while True:
+        kind, payload = await read_message(reader)
+        if kind == JOIN and len(payload) == _JOIN.size:
+          self._join(conn, *_JOIN.unpack(payload))
+        elif kind == ACT and len(payload) == _ACT.size:
+          self._act(conn, *_ACT.unpack(payload))
+        elif kind == LEAVE:
+          self._leave(conn)
+        else:
+          conn.send(ERROR, 'malformed message of type {}'.format(kind).encode())
+    except (asyncio.IncompleteReadError, ConnectionError, error.Error):
+      pass
+    finally:
+      self._conns.discard(conn)
+      self._leave(conn)
+      writer.close()
+
+  def _join(self, conn, table_id, seat, stack):
+    if conn.table is not None:
+      return conn.send(ERROR, b'already seated')
+    if table_id >= len(self.tables) or stack <= 0:
+      return conn.send(ERROR, b'no such table or no chips')
+    table = self.tables[table_id]
+    env = table.env
+    empty = [s for s in range(self.n_seats) if s not in table.conns and env._seats[s].emptyplayer]
+    if seat < 0 and empty:
+      seat = empty[0]
+    if seat not in empty:
+      return conn.send(ERROR, b'seat is taken')
+    conn.table, conn.seat, conn.leaving = table, seat, False
+    table.conns[seat] = conn
+    table.joining[seat] = stack
+    table.changed.set()
+    conn.send(SEATED, _SEATED.pack(table_id, seat, self.n_seats))
+
+  def _act(self, conn, turn, action, amount):
+    table = conn.table
+    if table is None or table.waiting is None:
+      return conn.send(ERROR, b'not your turn')
+    seat, expected, future = table.waiting
+    if seat != conn.seat or turn != expected:
+      return conn.send(ERROR, b'not your turn')
+    if not future.done():
+      future.set_result((action, amount))
+
+  def _leave(self, conn):
+    table = conn.table
+    if table is None or conn.leaving:
+      return
+    conn.leaving = True
+    if table.joining.pop(conn.seat, None) is not None or not table.in_hand:
+      self._release(table, conn.seat)
+    elif table.waiting is not None and table.waiting[0] == conn.seat:
+      future = table.waiting[2]
+      if not future.done():
+        future.set_result(None)
+
+  def _release(self, table, seat):
+    conn = table.conns.pop(seat)
+    conn.table = conn.seat = None
+    if not table.env._seats[seat].emptyplayer:
+      table.env.remove_player(seat)
+    conn.send(LEFT, _LEFT.pack(table.table_id, seat))
+
+  async def _run_table(self, table):
+    env = table.env
+    while True:
+      for seat, stack in table.joining.items():
+        env.add_player(seat, stack)
+      table.joining.clear()
+      if table.funded() < 2:
+        table.changed.clear()
+        await table.changed.wait()
+        continue
+
+      table.in_hand = True
+      obs, info = env.reset(return_info=True)
+      # with auto_advance a hand between all-in players is played out by reset
+      terminal = info['to_act'] is None
+      while not terminal:
+        player = env._current_player
+        seat = player.get_seat()
+        action = None
+        if not player.isallin:
+          action = await self._ask(table, seat, obs, info)
+        if action is None:
+          action = self.default_action(info['legal_actions'], info['minraise'], info['maxraise'])
+        actions = [[action_table.CHECK, 0]] * self.n_seats
+        actions[seat] = action
+        obs, _, terminal, info = env.step(actions)
+
+      table.in_hand = False
+      stacks = np.array([p.stack for p in env._seats], dtype='<i8')
+      community = np.array(env.community + [-1] * (5 - len(env.community)), dtype='<i4')
+      message = _HAND_OVER.pack(env.hand_index) + stacks.tobytes() + community.tobytes()
+      for seat, conn in list(table.conns.items()):
+        if seat in table.joining:
+          continue
+        conn.send(HAND_OVER, message)
+        if conn.leaving or stacks[seat] == 0:
+          self._release(table, seat)
+      # let joins, leaves and actions of other tables in before the next hand
+      await asyncio.sleep(0)
+
+  async def _ask(self, table, seat, obs, info):
+    conn = table.conns.get(seat)
+    table.turn = (table.turn + 1) & 0xffffffff
+    if conn is None or conn.leaving:
+      return None
+    mask = info['legal_actions']
+    bits = sum(1 << i for i in range(len(mask)) if mask[i])
+    obs = obs.copy()
+    offset, (n_seats, _) = table.layout['player_hands']
+    hands = obs[offset:offset + 2 * n_seats].reshape(n_seats, 2)
+    hands[np.arange(n_seats) != seat] = -1
+    conn.send(OBSERVATION, _OBSERVATION.pack(
+        table.turn, int(self.action_timeout * 1000), bits, info['minraise'],
+        info['maxraise']) + obs.astype('<i4').tobytes())
+
+    future = asyncio.get_running_loop().create_future()
+    table.waiting = (seat, table.turn, future)
+    try:
+      done, _ = await asyncio.wait([future], timeout=self.action_timeout)
+    finally:
+      table.waiting = None
+    return future.result() if done else None
+
+
+class Client(object):
+  """Client side of the protocol, for agents written in Python and for tests.
+
+  `await Client.open(host, port)` (or `path=` for a Unix socket), then `join` a table and
+  `recv` messages as `Seated`, `Observation`, `HandOver` and `Left` tuples; `ERROR` messages
+  raise a `gym.error.Error`. Answer observations with `act`, or hand a policy to `play`.
+  """
+
+  def __init__(self, reader, writer):
+    self.reader = reader
+    self.writer = writer
+    self.layout = None
+
+  @classmethod
+  async def open(cls, host='127.0.0.1', port=None, path=None, sock=None):
+    if sock is not None:
+      reader, writer = await asyncio.open_connection(sock=sock)
+    elif path is not None:
+      reader, writer = await asyncio.open_unix_connection(path)
+    else:
+      reader, writer = await asyncio.open_connection(host, port)
+    return cls(reader, writer)
+
+  async def join(self, table=0, seat=-1, stack=2000):
+    self.writer.write(encode(JOIN, _JOIN.pack(table, seat, stack)))
+    return await self.recv()
+
+  async def act(self, turn, action, amount=0):
+    self.writer.write(encode(ACT, _ACT.pack(turn, action, amount)))
+    await self.writer.drain()
+
+  async def leave(self):
+    self.writer.write(encode(LEAVE))
+    await self.writer.drain()
+
+  async def close(self):
+    self.writer.close()
+    await self.writer.wait_closed()
+
+  async def recv(self):
+    kind, payload = await read_message(self.reader)
+    if kind == SEATED:
+      message = Seated(*_SEATED.unpack(payload))
+      self.layout = observation_layout(message.n_seats)
+      return message
+    if kind == OBSERVATION:
+      turn, timeout, bits, minraise, maxraise = _OBSERVATION.unpack_from(payload)
+      obs = np.frombuffer(payload, dtype='<i4', offset=_OBSERVATION.size)
+      fields = [obs[offset:offset + int(np.prod(shape))].reshape(shape)
+                for offset, shape in self.layout.values()]
+      mask = np.array([bool(bits >> i & 1) for i in range(4)])
+      return Observation(turn, timeout / 1000., mask, minraise, maxraise, *fields)
+    if kind == HAND_OVER:
+      hand, = _HAND_OVER.unpack_from(payload)
+      n_seats = (len(payload) - _HAND_OVER.size - 20) // 8
+      stacks = np.frombuffer(payload, dtype='<i8', count=n_seats, offset=_HAND_OVER.size)
+      community = np.frombuffer(payload, dtype='<i4', offset=_HAND_OVER.size + 8 * n_seats)
+      return HandOver(hand, stacks, community)
+    if kind == LEFT:
+      self.layout = None
+      return Left(*_LEFT.unpack(payload))
+    if kind == ERROR:
+      raise error.Error(payload.decode('utf-8', 'replace'))
+    raise error.Error('unknown message type {}'.format(kind))
+
+  async def play(self, policy, table=0, seat=-1, stack=2000, n_hands=None):
+    """Play with `policy(observation) -> (action, amount)` until `n_hands` hands are over or the
+    seat is lost, returns the `HandOver` messages."""
+    await self.join(table, seat, stack)
+    results = []
+    while n_hands is None or len(results) < n_hands:
+      message = await self.recv()
+      if isinstance(message, Observation):
+        await self.act(message.turn, *policy(message))
+      elif isinstance(message, HandOver):
+        results.append(message)
+      elif isinstance(message, Left):
+        break
+    return results
+
+
+async def _main(args):
+  server = TableServer(args.tables, args.seats, args.timeout)
+  listener = await server.start(args.host, args.port, args.unix)
+  print('serving {} tables of {} seats on {}'.format(
+      args.tables, args.seats, listener.sockets[0].getsockname()))
+  await listener.serve_forever()
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Serve holdem tables over a socket.')
+  parser.add_argument('--host', default='127.0.0.1')
+  parser.add_argument('--port', type=int, default=7070)
+  parser.add_argument('--unix', default=None, help='listen on this Unix socket instead')
+  parser.add_argument('--tables', type=int, default=1)
+  parser.add_argument('--seats', type=int, default=2)
+  parser.add_argument('--timeout', type=float, default=5.0, help='seconds to act')
+  try:
+    asyncio.run(_main(parser.parse_args(argv)))
+  except KeyboardInterrupt:
+    pass
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from gym import error
+
+from .env import N_COMMUNITY_FEATURES, N_PLAYER_FEATURES
+from .eval import load_table
+from .utils import legal_actions
+from .vector import VectorTexasHoldemEnv
+
+
+def _buffer_specs(n_envs, n_seats):
+  return [
+    ('actions', (n_envs, n_seats, 2), np.int64),
+    ('player_infos', (n_envs, n_seats, N_PLAYER_FEATURES), np.int64),
+    ('player_hands', (n_envs, n_seats, 2), np.int64),
+    ('community_infos', (n_envs, N_COMMUNITY_FEATURES), np.int64),
+    ('community_cards', (n_envs, 5), np.int64),
+    ('rews', (n_envs, n_seats), np.int64),
+    ('terminals', (n_envs,), np.bool_),
+    ('in_hand', (n_envs,), np.bool_),
+  ]
+
+
+def _attach(specs, names):
+  memories, arrays = [], {}
+  for (name, shape, dtype), shm_name in zip(specs, names):
+    memory = shared_memory.SharedMemory(name=shm_name)
+    memories.append(memory)
+    arrays[name] = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+  return memories, arrays
+
+
+def _worker(remote, parent_remote, specs, names, start, stop, n_seats, env_kwargs, seed):
+  parent_remote.close()
+  memories, buffers = _attach(specs, names)
+  rows = slice(start, stop)
+  env = VectorTexasHoldemEnv(stop - start, n_seats, **env_kwargs)
+  env.seed(seed)
+
+  def write(obs):
+    ((player_infos, player_hands), (community_infos, community_cards)) = obs
+    buffers['player_infos'][rows] = player_infos
+    buffers['player_hands'][rows] = player_hands
+    buffers['community_infos'][rows] = community_infos
+    buffers['community_cards'][rows] = community_cards
+    buffers['in_hand'][rows] = env._in_hand
+
+  try:
+    while True:
+      cmd = remote.recv()
+      if cmd == 'step':
+        try:
+          obs, rews, terminals, info = env.step(buffers['actions'][rows])
+        except error.Error as e:
+          remote.send(e)
+          continue
+        write(obs)
+        buffers['rews'][rows] = rews
+        buffers['terminals'][rows] = terminals
+        remote.send(info['hands'])
+      elif cmd == 'reset':
+        write(env.reset())
+        remote.send(None)
+      elif cmd == 'close':
+        break
+  except KeyboardInterrupt:
+    pass
+  finally:
+    del buffers
+    for memory in memories:
+      memory.close()
+    remote.close()
+
+
+class SubprocVectorHoldemEnv(object):
+  """`VectorTexasHoldemEnv` sharded across worker processes.
+
+  Each worker steps `n_envs / n_workers` tables. Actions, observations, rewards and terminals
+  are exchanged through `multiprocessing.shared_memory` buffers, only a short command goes
+  through the pipe, so nothing is pickled per step.
+
+  Stepping is split into `step_async` and `step_wait`, either for all shards or for a subset,
+  so a learner can compute the actions of one group of shards while the others are stepping.
+  When all shards are stepped together, the arrays returned by `reset` and `step_wait` are views
+  of the shared buffers and are overwritten by the next step; copy them to keep them around.
+  """
+
+  def __init__(self, n_envs, n_seats, n_workers=None, seed=None, start_method=None, **env_kwargs):
+    n_workers = min(n_workers or multiprocessing.cpu_count(), n_envs)
+    self.n_envs = n_envs
+    self.n_seats = n_seats
+    self.n_workers = n_workers
+    self.closed = False
+
+    # build the evaluator table before starting workers so they do not race to build it
+    load_table()
+
+    self._specs = _buffer_specs(n_envs, n_seats)
+    self._memories = []
+    self._buffers = {}
+    for name, shape, dtype in self._specs:
+      size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+      memory = shared_memory.SharedMemory(create=True, size=size)
+      self._memories.append(memory)
+      self._buffers[name] = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+      self._buffers[name][...] = 0
+
+    bounds = np.linspace(0, n_envs, n_workers + 1).astype(int)
+    self._rows = [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+    seeds = np.random.SeedSequence(seed).generate_state(n_workers).tolist()
+    stack = env_kwargs.pop('stack', 2000)
+    stack = np.broadcast_to(np.asarray(stack, dtype=np.int64), (n_envs, n_seats))
+
+    context = multiprocessing.get_context(start_method)
+    names = [memory.name for memory in self._memories]
+    self._remotes, self._processes = [], []
+    for shard, rows in enumerate(self._rows):
+      remote, work_remote = context.Pipe()
+      kwargs = dict(env_kwargs, stack=stack[rows].copy())
+      process = context.Process(
+          target=_worker,
+          args=(work_remote, remote, self._specs, names, rows.start, rows.stop, n_seats, kwargs,
+                seeds[shard]))
+      process.daemon = True
+      process.start()
+      work_remote.close()
+      self._remotes.append(remote)
+      self._processes.append(process)
+    self._waiting = set()
+
+  def _shards(self, shards):
+    return range(self.n_workers) if shards is None else shards
+
+  def _rows_of(self, shards):
+    if list(shards) == list(range(self.n_workers)):
+      return slice(0, self.n_envs)
+    return np.concatenate([np.arange(self._rows[i].start, self._rows[i].stop) for i in shards])
+
+  def _observation(self, rows):
+    buffers = self._buffers
+    return ((buffers['player_infos'][rows], buffers['player_hands'][rows]),
+            (buffers['community_infos'][rows], buffers['community_cards'][rows]))
+
+  def _legal_actions(self, rows):
+    # the observation holds everything needed: the amount to call, minraise and stacks
+    community_infos = self._buffers['community_infos'][rows]
+    stacks = self._buffers['player_infos'][rows, :, 2]
+    stack = np.take_along_axis(stacks, community_infos[:, 7:8], axis=1)[:, 0]
+    mask, minraise, maxraise = legal_actions(community_infos[:, 6], stack, community_infos[:, 5])
+    # tables that could not be dealt a hand have nothing to play
+    mask[~self._buffers['in_hand'][rows]] = False
+    return mask, minraise, maxraise
+
+  def shard_rows(self, shard):
+    """Slice of the tables stepped by worker `shard`."""
+    return self._rows[shard]
+
+  def reset(self, return_info=False):
+    for remote in self._remotes:
+      remote.send('reset')
+    for remote in self._remotes:
+      remote.recv()
+    rows = slice(0, self.n_envs)
+    if return_info:
+      mask, minraise, maxraise = self._legal_actions(rows)
+      return self._observation(rows), {'legal_actions': mask, 'minraise': minraise,
+                                       'maxraise': maxraise}
+    return self._observation(rows)
+
+  def step_async(self, actions, shards=None):
+    """Start stepping `shards` (all of them by default) with `actions`.
+
+    actions: `(N, n_seats, 2)` actions of every table of the selected shards, in shard order.
+    """
+    shards = list(self._shards(shards))
+    busy = self._waiting.intersection(shards)
+    if busy:
+      raise error.Error('shards {} are already stepping.'.format(sorted(busy)))
+    self._buffers['actions'][self._rows_of(shards)] = actions
+    for shard in shards:
+      self._remotes[shard].send('step')
+      self._waiting.add(shard)
+
+  def step_wait(self, shards=None):
+    """Wait for `shards` (all of them by default) to finish stepping.
+
+    Returns `(obs, rews, terminals, info)` for the tables of `shards`, like
+    `VectorTexasHoldemEnv.step`.
+    """
+    shards = list(self._shards(shards))
+    hands, failure = [], None
+    for shard in shards:
+      if shard not in self._waiting:
+        raise error.Error('shard {} is not stepping.'.format(shard))
+      result = self._remotes[shard].recv()
+      self._waiting.discard(shard)
+      if isinstance(result, Exception):
+        failure = failure or result
+      else:
+        hands.append(result)
+    if failure is not None:
+      raise failure
+    rows = self._rows_of(shards)
+    mask, minraise, maxraise = self._legal_actions(rows)
+    info = {'hands': np.concatenate(hands), 'legal_actions': mask, 'minraise': minraise,
+            'maxraise': maxraise}
+    return (self._observation(rows), self._buffers['rews'][rows],
+            self._buffers['terminals'][rows], info)
+
+  def step(self, actions):
+    self.step_async(actions)
+    return self.step_wait()
+
+  def close(self):
+    if self.closed:
+      return
+    for shard in list(self._waiting):
+      self._remotes[shard].recv()
+    for remote in self._remotes:
+      remote.send('close')
+    for process in self._processes:
+      process.join()
+    for remote in self._remotes:
+      remote.close()
+    self._buffers = {}
+    for memory in self._memories:
+      memory.close()
+      memory.unlink()
+    self.closed = True
+
+  def __del__(self):
+    if not getattr(self, 'closed', True):
+      self.close()
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import time
+
+import numpy as np
+
+from gym import error
+
+from .env import TexasHoldemEnv
+from .vector import VectorTexasHoldemEnv
+
+
+class Tournament(object):
+  """Multi-table freezeout tournament, every table is a row of one `VectorTexasHoldemEnv`.
+
+  Entrants are dealt to tables at random. Whenever hands finish, busted players are given their
+  finishing position (players busting in the same step are ranked by the chips they started their
+  hand with), tables are broken as soon as the others have room for their players, and players
+  are moved from the biggest tables to the smallest ones until they differ by at most one. Only
+  tables between hands give up players, moved players join their new table at its next hand.
+
+  Blinds follow `blinds` (`TexasHoldemEnv.BLIND_INCREMENTS` by default), moving up a level
+  every `hands_per_level` hands (counted at the table that played the most) or, when set, every
+  `seconds_per_level` seconds of `clock`. A table picks the current level up at its next hand.
+
+  `seating[table, seat]` is the entrant sitting there (`-1` for an empty seat) and
+  `positions[entrant]` the finishing position, `0` while still playing.
+  """
+
+  def __init__(self, n_players, n_seats=9, stack=1500, hands_per_level=10, seconds_per_level=None,
+               blinds=None, seed=None, clock=time.monotonic, **env_kwargs):
+    if n_players < 2:
+      raise error.Error('a tournament needs at least 2 players.')
+    self.n_players = n_players
+    self.n_seats = n_seats
+    self.n_tables = -(-n_players // n_seats)
+    self.hands_per_level = hands_per_level
+    self.seconds_per_level = seconds_per_level
+    self.blinds = np.array(blinds if blinds is not None else TexasHoldemEnv.BLIND_INCREMENTS,
+                           dtype=np.int64)
+    self.clock = clock
+    self.stack = stack
+    self._rng = np.random.default_rng(seed)
+    self.seating = np.full((self.n_tables, n_seats), -1, dtype=np.int64)
+    self.positions = np.zeros(n_players, dtype=np.int64)
+    self.n_left = n_players
+    self.level = 0
+
+    self.env = VectorTexasHoldemEnv(
+        self.n_tables, n_seats, rebuy=False, between_hands=self._between_hands, **env_kwargs)
+    self.env.seed(None if seed is None else int(self._rng.integers(1 << 31)))
+
+  @property
+  def done(self):
+    return self.n_left == 1
+
+  def reset(self, return_info=False):
+    """Seat every entrant again, at random, and deal the first hand of every table."""
+    # deal entrants round robin, so tables start with at most one player difference
+    idx = np.arange(self.n_players)
+    self.seating[:] = -1
+    self.seating[idx % self.n_tables, idx // self.n_tables] = self._rng.permutation(self.n_players)
+    self.positions[:] = 0
+    self.n_left = self.n_players
+    self.env._start_stacks[:] = np.where(self.seating >= 0, self.stack, 0)
+    self._start = self.clock()
+    self.level = 0
+    self.env.set_blinds(np.arange(self.n_tables), *self.blinds[0])
+    return self.env.reset(return_info)
+
+  def step(self, actions):
+    """Step every table playing a hand, like `VectorTexasHoldemEnv.step`."""
+    if self.done:
+      raise error.Error('the tournament is over, needs to be reset.')
+    return self.env.step(actions)
+
+  def play(self, policy, max_steps=None):
+    """Play the tournament out, `policy(obs, info)` returns the actions of every table.
+
+    Returns the finishing positions of the entrants.
+    """
+    obs, info = self.reset(return_info=True)
+    steps = 0
+    while not self.done and (max_steps is None or steps < max_steps):
+      obs, _, _, info = self.step(policy(obs, info))
+      steps += 1
+    return self.positions
+
+  def _set_level(self, rows):
+    if self.seconds_per_level:
+      level = int((self.clock() - self._start) // self.seconds_per_level)
+    else:
+      level = int(self.env._number_of_hands.max()) // self.hands_per_level
+    self.level = min(level, len(self.blinds) - 1)
+    smallblind, bigblind = self.blinds[self.level]
+    self.env.set_blinds(rows, smallblind, bigblind)
+
+  def _between_hands(self, env, rows):
+    busted = (self.seating[rows] >= 0) & (env._stacks[rows] == 0)
+    if busted.any():
+      tables, seats = np.nonzero(busted)
+      tables = rows[tables]
+      entrants = self.seating[tables, seats]
+      # the more chips a player started the hand with, the better they finish
+      order = np.argsort(-env._contrib[tables, seats], kind='stable')
+      self.positions[entrants[order]] = self.n_left - np.arange(len(order))[::-1]
+      self.n_left -= len(entrants)
+      env.unseat(tables, seats)
+      self.seating[tables, seats] = -1
+    if self.n_left == 1:
+      self.positions[self.seating[self.seating >= 0]] = 1
+      return
+    self._balance(env)
+    self._set_level(np.flatnonzero(~env._in_hand))
+
+  def _move(self, env, table, to_table):
+    # the player due for the big blind moves, so nobody skips it twice
+    order = (env._button[table] + 2 + np.arange(self.n_seats)) % self.n_seats
+    seat = order[self.seating[table, order] >= 0][0]
+    to_seat = np.flatnonzero(self.seating[to_table] < 0)[0]
+    env.seat(to_table, to_seat, env.unseat(table, seat))
+    self.seating[to_table, to_seat] = self.seating[table, seat]
+    self.seating[table, seat] = -1
+
+  def _balance(self, env):
+    counts = (self.seating >= 0).sum(axis=1)
+    free = ~env._in_hand
+
+    # break the smallest tables between hands while the others can seat their players
+    n_needed = -(-self.n_left // self.n_seats)
+    while np.count_nonzero(counts) > n_needed:
+      candidates = np.flatnonzero(free & (counts > 0))
+      if not candidates.size:
+        break
+      table = candidates[counts[candidates].argmin()]
+      for _ in range(counts[table]):
+        others = np.where((counts > 0) & (counts < self.n_seats), counts, self.n_seats + 1)
+        others[table] = self.n_seats + 1
+        to_table = others.argmin()
+        self._move(env, table, to_table)
+        counts[table] -= 1
+        counts[to_table] += 1
+
+    # then even out the tables, taking players from tables between hands only
+    while True:
+      open_tables = counts > 0
+      sources = np.flatnonzero(free & open_tables)
+      if not sources.size:
+        break
+      table = sources[counts[sources].argmax()]
+      to_table = np.flatnonzero(open_tables)[counts[open_tables].argmin()]
+      if counts[table] - counts[to_table] <= 1:
+        break
+      self._move(env, table, to_table)
+      counts[table] -= 1
+      counts[to_table] += 1
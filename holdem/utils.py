@@ -19,9 +19,17 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
+import os
+
+import numpy as np
+
 from treys import Card
 
 
+class Error(Exception):
+  """Invalid use of a table, e.g. an illegal action."""
+
+
 class action_table:
   CHECK = 0
   CALL = 1
@@ -92,3 +100,37 @@ def safe_actions(community_infos, n_seats):
   if to_call > 0:
     actions[current_player] = [action_table.CALL, action_table.NA]
   return actions
+
+
+def legal_actions(tocall, stack, minraise):
+  """Legal actions of players facing `tocall` with `stack` chips, for batches of tables.
+
+  Returns `(mask, minraise, maxraise)`, where `mask[..., action]` is set for every legal
+  `action_table` action and a raise amount must be within `[minraise, maxraise]`.
+  """
+  tocall = np.minimum(tocall, stack)
+  mask = np.empty(np.shape(tocall) + (4,), dtype=bool)
+  mask[..., action_table.CHECK] = tocall == 0
+  mask[..., action_table.CALL] = tocall != 0
+  mask[..., action_table.RAISE] = minraise <= stack
+  mask[..., action_table.FOLD] = tocall != 0
+  return mask, minraise, stack
+
+
+def clamp_actions(action_idx, raise_amount, mask, minraise, maxraise):
+  """Map batches of actions onto legal ones, see `TexasHoldemEnv(invalid_action='clamp')`."""
+  raises = (action_idx == action_table.RAISE) & mask[..., action_table.RAISE]
+  facing_bet = mask[..., action_table.CALL]
+  passive = np.where(facing_bet, action_table.CALL, action_table.CHECK)
+  action_idx = np.where(raises, action_table.RAISE, np.where(
+      facing_bet & (action_idx == action_table.FOLD), action_table.FOLD, passive))
+  raise_amount = np.where(raises, np.clip(raise_amount, minraise, maxraise), 0)
+  return action_idx, raise_amount
+
+
+def data_path(name):
+  """Path of a generated data file, kept in `$HOLDEM_DATA_DIR` or `~/.cache/holdem`."""
+  directory = os.environ.get('HOLDEM_DATA_DIR') or os.path.join(
+      os.path.expanduser('~'), '.cache', 'holdem')
+  os.makedirs(directory, exist_ok=True)
+  return os.path.join(directory, name)
@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2018 Sam Wenke (samwenke@gmail.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import numpy as np
+
+from gym import error
+from gym.utils import seeding
+
+from treys import Deck
+
+from .env import TexasHoldemEnv
+from .eval import Evaluator
+from .utils import action_table, clamp_actions, legal_actions
+
+
+# number of community cards visible in each round (preflop, flop, turn, river, showdown)
+_VISIBLE_COMMUNITY = np.array([0, 3, 4, 5, 5])
+_NO_RANK = np.iinfo(np.int64).max
+
+
+class VectorTexasHoldemEnv(object):
+  """Steps `n_envs` tables of `n_seats` in lockstep.
+
+  The state of every table is kept in struct-of-arrays form (one row per table), so a
+  single `step` advances all tables with a handful of NumPy operations instead of a
+  Python loop over `TexasHoldemEnv` instances. Tables whose hand finishes are settled
+  and dealt a new hand inside the same `step`, so every table is always waiting on a
+  decision from its current player.
+  """
+
+  def __init__(self, n_envs, n_seats, stack=2000, rebuy=True, max_limit=100000, debug=False,
+               invalid_action='raise', between_hands=None):
+    if n_seats < 2:
+      raise error.Error('a table needs at least 2 seats.')
+    if 2 * n_seats + 8 > 52:
+      raise error.Error('not enough cards for {} seats.'.format(n_seats))
+
+    if invalid_action not in ('raise', 'clamp'):
+      raise error.Error(
+          'invalid_action must be one of raise or clamp, got {}'.format(invalid_action))
+    self.invalid_action = invalid_action
+
+    self.n_envs = n_envs
+    self.n_seats = n_seats
+    self.max_limit = max_limit
+    self._rebuy = rebuy
+    self._debug = debug
+    self._between_hands = between_hands
+
+    shape = (n_envs, n_seats)
+    # seats given 0 chips are treated as empty.
+    self._start_stacks = np.broadcast_to(np.asarray(stack, dtype=np.int64), shape).copy()
+    self._empty = self._start_stacks == 0
+
+    self._rows = np.arange(n_envs)
+    self._seat_ids = np.arange(n_seats)
+    self._offsets = np.arange(1, n_seats + 1)
+    self._full_deck = np.array(Deck.GetFullDeck(), dtype=np.int64)
+    self._evaluator = Evaluator()
+
+    # per seat
+    self._stacks = self._start_stacks.copy()
+    self._bets = np.zeros(shape, dtype=np.int64)      # contribution this round
+    self._contrib = np.zeros(shape, dtype=np.int64)   # contribution this hand
+    self._handrank = np.full(shape, -1, dtype=np.int64)
+    self._playing = np.zeros(shape, dtype=bool)
+    self._allin = np.zeros(shape, dtype=bool)
+    self._played = np.zeros(shape, dtype=bool)
+    self._hands = np.full(shape + (2,), -1, dtype=np.int64)
+
+    # per table
+    self._deck = np.empty((n_envs, 52), dtype=np.int64)
+    self._community = np.full((n_envs, 5), -1, dtype=np.int64)
+    self._blinds = np.empty((n_envs, 2), dtype=np.int64)  # posted from the next hand on
+    self._blinds[:] = TexasHoldemEnv.BLIND_INCREMENTS[0]
+    self._smallblind = self._blinds[:, 0].copy()
+    self._bigblind = self._blinds[:, 1].copy()
+    self._in_hand = np.zeros(n_envs, dtype=bool)
+    self._button = np.full(n_envs, n_seats - 1, dtype=np.int64)
+    self._current_player = np.zeros(n_envs, dtype=np.int64)
+    self._round = np.zeros(n_envs, dtype=np.int64)
+    self._totalpot = np.zeros(n_envs, dtype=np.int64)
+    self._tocall = np.zeros(n_envs, dtype=np.int64)
+    self._lastraise = np.zeros(n_envs, dtype=np.int64)
+    self._number_of_hands = np.zeros(n_envs, dtype=np.int64)
+
+    self.seed()
+
+  def seed(self, seed=None):
+    self.np_random, seed = seeding.np_random(seed)
+    return [seed]
+
+  def reset(self, return_info=False):
+    """Reset every table to its starting stacks and deal a new hand.
+
+    Returns batched observations `((player_infos, player_hands), (community_infos,
+    community_cards))` with shapes `(N, n_seats, 9)`, `(N, n_seats, 2)`, `(N, 8)` and
+    `(N, 5)`; the fields follow `TexasHoldemEnv` index for index. With `return_info`,
+    returns `(obs, info)` like `step`.
+    """
+    self._stacks[:] = self._start_stacks
+    self._empty = self._start_stacks == 0
+    self._button[:] = self.n_seats - 1
+    self._number_of_hands[:] = 0
+    self._in_hand[:] = False
+    self._start_hand(self._rows)
+    if return_info:
+      return self._get_current_state(), self._get_info()
+    return self._get_current_state()
+
+  def legal_actions(self):
+    """Legal actions of the current player of every table.
+
+    Returns `(mask, minraise, maxraise)` with shapes `(N, 4)`, `(N,)` and `(N,)`, see
+    `TexasHoldemEnv.legal_actions`.
+    """
+    mask, minraise, maxraise = self._legal_actions(self._rows, self._current_player)
+    mask[~self._in_hand] = False
+    return mask, minraise, maxraise
+
+  def seat(self, rows, seats, stacks):
+    """Sit players with `stacks` chips at empty `seats` of tables `rows`.
+
+    They are dealt in from the next hand of their table, a hand in progress goes on without them.
+    """
+    rows, seats = np.asarray(rows), np.asarray(seats)
+    if not self._empty[rows, seats].all():
+      raise error.Error('seats are already taken.')
+    self._stacks[rows, seats] = stacks
+    self._empty[rows, seats] = False
+
+  def unseat(self, rows, seats):
+    """Remove the players at `seats` of tables `rows` and return their stacks."""
+    rows, seats = np.asarray(rows), np.asarray(seats)
+    if (self._in_hand[rows] & self._playing[rows, seats]).any():
+      raise error.Error('players cannot leave in the middle of a hand.')
+    stacks = self._stacks[rows, seats].copy()
+    self._stacks[rows, seats] = 0
+    self._empty[rows, seats] = True
+    return stacks
+
+  def set_blinds(self, rows, smallblind, bigblind):
+    """Blinds posted at tables `rows` from their next hand on."""
+    self._blinds[rows, 0] = smallblind
+    self._blinds[rows, 1] = bigblind
+
+  @property
+  def in_hand(self):
+    """Mask of the tables playing a hand, the others wait for players (see `seat`)."""
+    return self._in_hand.copy()
+
+  def step(self, actions):
+    """
+    actions: `(N, n_seats, 2)` array of `[action_id, raise_amount]`, only the row of each
+    table's current player is read.
+
+    Returns `(obs, rews, terminals, info)`, where `rews` are the `(N, n_seats)` stacks at
+    the end of the step (before a finished table is dealt its next hand) and `terminals`
+    marks the tables whose hand finished during the step. `info['hands']` holds the hand
+    count of every table, `info['legal_actions']`, `info['minraise']` and `info['maxraise']`
+    the `legal_actions` of the next decision. Tables waiting for players are not stepped.
+    """
+    actions = np.asarray(actions, dtype=np.int64)
+    if actions.shape != (self.n_envs, self.n_seats, 2):
+      raise error.Error('actions must have shape (n_envs, n_seats, 2).')
+
+    rows = self._rows if self._in_hand.all() else np.flatnonzero(self._in_hand)
+    current = self._current_player[rows]
+    action_idx = actions[rows, current, 0]
+    raise_amount = actions[rows, current, 1]
+    if self.invalid_action == 'clamp':
+      action_idx, raise_amount = clamp_actions(
+          action_idx, raise_amount, *self._legal_actions(rows, current))
+    else:
+      self._validate(rows, current, action_idx, raise_amount)
+
+    if self._debug:
+      print('actions: ', list(zip(current.tolist(), action_idx.tolist(), raise_amount.tolist())))
+
+    folds = action_idx == action_table.FOLD
+    raises = action_idx == action_table.RAISE
+    total_bet = np.where(action_idx == action_table.CALL, self._tocall[rows], self._bets[rows, current])
+    total_bet = np.where(raises, raise_amount + self._bets[rows, current], total_bet)
+
+    betting = ~folds
+    self._player_bet(rows[betting], current[betting], total_bet[betting])
+    self._playing[rows[folds], current[folds]] = False
+    if raises.any():
+      raised = rows[raises]
+      self._played[raised] = False
+      self._played[raised, current[raises]] = True
+
+    finished = rows[self._settle(rows, current)]
+    terminals = np.zeros(self.n_envs, dtype=bool)
+    terminals[finished] = True
+    if finished.size:
+      self._resolve_round(finished)
+    rews = self._stacks.copy()
+    if finished.size:
+      self._next_hands(finished)
+    return self._get_current_state(), rews, terminals, self._get_info()
+
+  def _next_hands(self, rows):
+    # the hands at `rows` are settled, deal the next ones (at any waiting table that can play)
+    self._in_hand[rows] = False
+    if self._between_hands is not None:
+      self._between_hands(self, rows)
+    self._start_hand(np.flatnonzero(~self._in_hand))
+
+  def _get_info(self):
+    mask, minraise, maxraise = self.legal_actions()
+    return {'hands': self._number_of_hands.copy(), 'legal_actions': mask, 'minraise': minraise,
+            'maxraise': maxraise}
+
+  def _legal_actions(self, rows, current):
+    return legal_actions(
+        self._tocall[rows] - self._bets[rows, current], self._stacks[rows, current],
+        np.maximum(self._bigblind[rows], self._lastraise[rows] + self._tocall[rows]))
+
+  def _validate(self, rows, current, action_idx, raise_amount):
+    mask, minraise, maxraise = self._legal_actions(rows, current)
+    in_range = (action_idx >= 0) & (action_idx < mask.shape[1])
+    valid = in_range & mask[np.arange(len(rows)), np.where(in_range, action_idx, 0)]
+    raises = action_idx == action_table.RAISE
+    valid &= ~raises | ((raise_amount >= minraise) & (raise_amount <= maxraise))
+    if not valid.all():
+      raise error.Error('invalid actions at tables {}'.format(rows[~valid].tolist()))
+
+  def _next_seat(self, seats, mask):
+    # first seat strictly after `seats`, going around the table, for which `mask` is set
+    order = (seats[:, None] + self._offsets) % self.n_seats
+    hit = np.take_along_axis(mask, order, axis=1)
+    return order[np.arange(len(seats)), hit.argmax(axis=1)]
+
+  def _player_bet(self, rows, seats, total_bet):
+    # mirrors `TexasHoldemEnv._player_bet`, `total_bet` is the contribution this round
+    relative_bet = np.minimum(self._stacks[rows, seats], total_bet - self._bets[rows, seats])
+    self._stacks[rows, seats] -= relative_bet
+    self._bets[rows, seats] += relative_bet
+    self._contrib[rows, seats] += relative_bet
+    self._played[rows, seats] = True
+    self._allin[rows, seats] |= self._stacks[rows, seats] == 0
+
+    self._totalpot[rows] += relative_bet
+    tocall = np.maximum(self._tocall[rows], total_bet)
+    self._tocall[rows] = np.where(tocall > 0, np.maximum(tocall, self._bigblind[rows]), tocall)
+    self._lastraise[rows] = np.maximum(self._lastraise[rows], relative_bet - self._lastraise[rows])
+
+  def _settle(self, rows, after):
+    """Advance `rows` until each table has a pending decision or its hand finished.
+
+    Returns a mask over `rows` of the tables whose hand finished.
+    """
+    terminals = np.zeros(len(rows), dtype=bool)
+    pending = np.arange(len(rows))
+    while pending.size:
+      r = rows[pending]
+      playing = self._playing[r]
+      active = playing & ~self._allin[r]
+      need = active & ~self._played[r]
+
+      folded_out = playing.sum(axis=1) <= 1
+      waiting = need.any(axis=1) & ~folded_out
+      if waiting.any():
+        self._current_player[r[waiting]] = self._next_seat(after[pending[waiting]], need[waiting])
+
+      # betting round is over, move to the next street
+      over = ~waiting & ~folded_out
+      ended = r[over]
+      self._bets[ended] = 0
+      self._played[ended] = False
+      self._tocall[ended] = 0
+      self._lastraise[ended] = 0
+      self._round[ended] += 1
+      showdown = over & ((self._round[r] >= 4) | (active.sum(axis=1) <= 1))
+      self._round[r[showdown]] = 4
+
+      terminals[pending[folded_out | showdown]] = True
+      pending = pending[over & ~showdown]
+      # the first seat after the button opens a street, as in `TexasHoldemEnv._first_to_act`
+      # the button itself opens the flop when two players are left
+      r = rows[pending]
+      button = self._button[r]
+      heads_up = ((self._round[r] == 1) & (self._playing[r].sum(axis=1) == 2) &
+                  self._playing[r, button])
+      after[pending] = np.where(heads_up, (button - 1) % self.n_seats, button)
+    return terminals
+
+  def _resolve_round(self, rows):
+    playing = self._playing[rows]
+    showdown = playing.sum(axis=1) > 1
+    table, seat = np.nonzero(playing & showdown[:, None])
+    if table.size:
+      self._handrank[rows[table], seat] = self._evaluator.evaluate_batch(
+          self._hands[rows[table], seat], self._community[rows[table]])
+
+    contrib = self._contrib[rows]
+    ranks = np.where(playing, self._handrank[rows], _NO_RANK)
+    # seats ordered from the first to act after the button, for odd chips
+    position = (self._seat_ids - self._button[rows][:, None] - 1) % self.n_seats
+    payout = np.zeros_like(contrib)
+
+    # each distinct contribution level closes a (side) pot
+    levels = np.sort(contrib, axis=1)
+    previous = np.zeros(len(rows), dtype=np.int64)
+    for k in range(self.n_seats):
+      level = levels[:, k]
+      layer = np.clip(contrib, previous[:, None], level[:, None]) - previous[:, None]
+      amount = layer.sum(axis=1)
+      eligible = playing & (contrib >= level[:, None])
+      best = np.where(eligible, ranks, _NO_RANK).min(axis=1)
+      winners = eligible & (ranks == best[:, None])
+      n_winners = winners.sum(axis=1)
+      split_amount = amount // np.maximum(n_winners, 1)
+      payout += winners * split_amount[:, None]
+
+      # any remaining chips after splitting go to the winner in the earliest position
+      remaining = amount - split_amount * n_winners
+      earliest = np.where(winners, position, self.n_seats).argmin(axis=1)
+      payout[np.arange(len(rows)), earliest] += np.where(n_winners > 0, remaining, 0)
+
+      # chips nobody still in the hand can win are returned
+      payout += np.where((n_winners == 0)[:, None], layer, 0)
+      previous = level
+
+    if self._debug:
+      print('payouts: ', payout.tolist())
+    self._stacks[rows] += payout
+
+  def _start_hand(self, rows):
+    if self._rebuy:
+      broke = rows[(self._stacks[rows] > 0).sum(axis=1) < 2]
+      self._stacks[broke] = self._start_stacks[broke]
+
+    playing = (self._stacks[rows] > 0) & ~self._empty[rows]
+    # tables short of players wait until more are seated
+    short = playing.sum(axis=1) < 2
+    if short.any():
+      self._playing[rows[short]] = False
+      self._hands[rows[short]] = -1
+      rows, playing = rows[~short], playing[~short]
+      if not rows.size:
+        return
+    self._in_hand[rows] = True
+    self._smallblind[rows] = self._blinds[rows, 0]
+    self._bigblind[rows] = self._blinds[rows, 1]
+    self._playing[rows] = playing
+    self._allin[rows] = False
+    self._played[rows] = False
+    self._bets[rows] = 0
+    self._contrib[rows] = 0
+    self._handrank[rows] = -1
+    self._round[rows] = 0
+    self._totalpot[rows] = 0
+    self._tocall[rows] = 0
+    self._lastraise[rows] = 0
+    self._number_of_hands[rows] += 1
+
+    self._button[rows] = self._next_seat(self._button[rows], playing)
+    self._shuffle(rows)
+
+    # heads up, the button posts the small blind
+    smallblind = np.where(playing.sum(axis=1) == 2, self._button[rows],
+                          self._next_seat(self._button[rows], playing))
+    bigblind = self._next_seat(smallblind, playing)
+    self._player_bet(rows, smallblind, self._smallblind[rows])
+    self._player_bet(rows, bigblind, self._bigblind[rows])
+    self._played[rows, smallblind] = False
+    self._played[rows, bigblind] = False
+    self._lastraise[rows] = self._bigblind[rows]
+    self._tocall[rows] = self._bigblind[rows]
+
+    terminals = self._settle(rows, bigblind)
+    # blinds can leave nobody with a decision to make, play those hands out right away
+    if terminals.any():
+      finished = rows[terminals]
+      self._resolve_round(finished)
+      self._next_hands(finished)
+
+  def _shuffle(self, rows):
+    n = self.n_seats
+    order = np.argsort(self.np_random.random((len(rows), 52)), axis=1)
+    deck = self._full_deck[order]
+    self._deck[rows] = deck
+    self._hands[rows] = np.where(
+        self._playing[rows][:, :, None], deck[:, :2 * n].reshape(-1, n, 2), -1)
+    # burn a card before the flop, turn and river
+    self._community[rows] = deck[:, [2 * n + 1, 2 * n + 2, 2 * n + 3, 2 * n + 5, 2 * n + 7]]
+
+  def _get_current_state(self):
+    rows = self._rows
+    current = self._current_player
+
+    # side pot a player last contributed to: the number of distinct all-in levels below them
+    allin_levels = np.sort(np.where(self._allin & self._playing, self._contrib, _NO_RANK), axis=1)
+    distinct = np.ones_like(allin_levels, dtype=bool)
+    distinct[:, 1:] = allin_levels[:, 1:] != allin_levels[:, :-1]
+    lastsidepot = ((allin_levels[:, None, :] < self._contrib[:, :, None]) &
+                   distinct[:, None, :]).sum(axis=2)
+
+    player_infos = np.stack([
+      self._empty,
+      np.broadcast_to(self._seat_ids, self._stacks.shape),
+      self._stacks,
+      self._playing,
+      self._handrank,
+      self._played,
+      np.zeros_like(self._played),
+      self._allin,
+      lastsidepot,
+    ], axis=2).astype(np.int64)
+    player_hands = self._hands.copy()
+
+    community_infos = np.stack([
+      self._button,
+      self._smallblind,
+      self._bigblind,
+      self._totalpot,
+      self._lastraise,
+      np.maximum(self._bigblind, self._lastraise + self._tocall),
+      self._tocall - self._bets[rows, current],
+      current,
+    ], axis=1)
+    visible = np.arange(5) < _VISIBLE_COMMUNITY[self._round][:, None]
+    community_cards = np.where(visible, self._community, -1)
+    return (player_infos, player_hands), (community_infos, community_cards)
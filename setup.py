@@ -34,6 +34,7 @@ setup(
   license='MIT',
   description=('OpenAI Gym No-Limit Texas Holdem Environment.'),
   packages=find_packages(exclude=['test', 'examples']),
-  install_requires=['treys', 'gym'],
+  install_requires=['treys', 'gym', 'numpy'],
+  entry_points={'gym.envs': ['__root__ = holdem:register_envs']},
   platforms='any',
 )
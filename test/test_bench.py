@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from holdem import bench
+
+
+def test_bench_run_and_compare():
+  report = bench.run(['TexasHoldem-v0/passive'], n_hands=20, n_alloc_hands=0, repeat=1)
+  result = report['results']['TexasHoldem-v0/passive']
+  assert result['hands_per_sec'] > 0
+  rows, regressions = bench.compare(report, report)
+  assert [row[0] for row in rows] == ['TexasHoldem-v0/passive']
+  assert rows[0][3] == 0 and regressions == []
+
+  baseline = json.loads(json.dumps(report))
+  baseline['results']['TexasHoldem-v0/passive']['hands_per_sec'] *= 2
+  _, regressions = bench.compare(report, baseline)
+  assert regressions == ['TexasHoldem-v0/passive']
+
+
+def test_bench_refuses_other_setups(tmp_path, capsys):
+  path = tmp_path / 'baseline.json'
+  argv = ['TexasHoldem-v0/passive', '--hands', '10', '--alloc-hands', '0', '--repeat', '1']
+  assert bench.main(argv + ['--json', str(path)]) == 0
+  baseline = json.loads(path.read_text())
+
+  report = json.loads(path.read_text())
+  report['obs_mode'] = 'lazy'
+  assert bench.mismatches(report, baseline) == [('obs_mode', 'tuple', 'lazy')]
+  with pytest.raises(ValueError, match='obs_mode'):
+    bench.compare(report, baseline)
+  rows, _ = bench.compare(report, baseline, force=True)
+  assert len(rows) == 1
+
+  assert bench.main(argv + ['--obs-mode', 'lazy', '--baseline', str(path)]) == 2
+  assert 'obs_mode' in capsys.readouterr().err
+  assert bench.main(argv + ['--obs-mode', 'lazy', '--baseline', str(path), '--force',
+                            '--threshold', '100']) == 0
+  assert 'warning' in capsys.readouterr().err
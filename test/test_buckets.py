@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from treys import Card
+
+from holdem import buckets
+
+
+def cards(*names):
+  return [Card.new(name) for name in names]
+
+
+def test_preflop_buckets(tmp_path, monkeypatch):
+  monkeypatch.setenv('HOLDEM_DATA_DIR', str(tmp_path))
+  monkeypatch.setattr(buckets, '_buckets', {})
+  with pytest.raises(FileNotFoundError, match='holdem.buckets build --streets 0'):
+    buckets.bucket(cards('As', 'Ah'))
+
+  buckets.build_histograms(0, n_runouts=16, n_opponents=1, processes=1)
+  buckets.build_buckets(0, n_buckets=8)
+  loaded = buckets.load_buckets(0)
+  assert loaded.shape == (169,) and loaded.max() < 8
+  aces, trash = buckets.bucket(cards('As', 'Ah')), buckets.bucket(cards('7s', '2d'))
+  assert aces > trash
+  streets, batch = buckets.bucket_batch(
+      np.array([cards('As', 'Ah'), cards('7s', '2d')]), np.full((2, 5), -1))
+  assert streets.tolist() == [0, 0] and batch.tolist() == [aces, trash]
@@ -0,0 +1,166 @@
+import random
+
+from holdem import Table
+from holdem.utils import action_table
+
+
+def act(table, action, amount=0):
+  actions = [[action_table.CHECK, 0]] * table.n_seats
+  actions = list(actions)
+  actions[table._current_player.player_id] = [action, amount]
+  return table.step(actions)
+
+
+def test_runout_once_one_player_can_bet():
+  table = Table(2)
+  table.add_player(0, 2000)
+  table.add_player(1, 100)
+  table.seed(1)
+  table.reset()
+  terminal = False
+  while not terminal:
+    player = table._current_player
+    if player.get_seat() == 1 and not player.isallin:
+      _, _, terminal, info = act(table, action_table.RAISE, player.stack)
+    else:
+      assert table.to_act == 0
+      _, _, terminal, info = act(table, action_table.CALL)
+  # the big stack called the all-in, nobody is asked to act on later streets
+  assert len(table.community) == 5
+  assert info['to_act'] is None
+  assert not info['legal_actions'].any()
+  assert sum(p.stack for p in table._seats) == 2100
+
+
+def play_out(table, policy):
+  terminal = False
+  while not terminal:
+    _, rews, terminal, _ = act(table, *policy(table))
+  return rews, list(table.community)
+
+
+def passive(table):
+  mask, _, _ = table.legal_actions()
+  return (action_table.CHECK if mask[action_table.CHECK] else action_table.CALL), 0
+
+
+def test_snapshot_restore_and_clone():
+  table = Table(3)
+  for seat in range(3):
+    table.add_player(seat, 1000)
+  table.seed(4)
+  table.reset()
+  act(table, action_table.CALL)
+  snapshot = table.snapshot()
+  other = table.clone()
+  expected = play_out(table, passive)
+
+  table.restore(snapshot)
+  assert table.snapshot() == snapshot
+  assert play_out(table, passive) == expected
+  # the clone plays the same hand, without touching the table it was copied from
+  after = table.snapshot()
+  assert play_out(other, passive) == expected
+  assert table.snapshot() == after
+  other.reset()
+  assert table.snapshot() == after
+
+
+def test_legal_action_mask():
+  rng = random.Random(0)
+  table = Table(3)
+  clamping = Table(3, invalid_action='clamp')
+  for t in (table, clamping):
+    for seat in range(3):
+      t.add_player(seat, 300 + 100 * seat)
+    t.seed(9)
+  for _ in range(20):
+    if any(p.stack == 0 for p in table._seats):
+      break
+    table.reset()
+    clamping.reset()
+    terminal = False
+    while not terminal:
+      mask, minraise, maxraise = table.legal_actions()
+      assert mask.any()
+      # the turns of all-in players are skipped, whatever the actions
+      for action in range(4) if not table._current_player.isallin else ():
+        for amount in ([minraise - 1, minraise, maxraise, maxraise + 1]
+                       if action == action_table.RAISE else [0]):
+          legal = mask[action] and (
+              action != action_table.RAISE or minraise <= amount <= maxraise)
+          try:
+            act(table.clone(), action, amount)
+          except Table.Error:
+            assert not legal, (action, amount)
+          else:
+            assert legal, (action, amount)
+      # clamping plays any action, like the legal action it is clamped onto
+      action, amount = rng.randrange(4), rng.randrange(2 * maxraise + 1)
+      assert clamping.to_act == table.to_act
+      clamped = table._clamp_action([action, amount])
+      assert mask[clamped[0]]
+      act(clamping, action, amount)
+      _, _, terminal, info = act(table, *clamped)
+      assert clamping.snapshot().seats == table.snapshot().seats
+    assert not info['legal_actions'].any()
+
+
+def test_side_pots():
+  table = Table(3)
+  for seat, stack in enumerate([100, 300, 600]):
+    table.add_player(seat, stack)
+  table.seed(6)
+  table.reset()
+  terminal = False
+  while not terminal:
+    mask, minraise, maxraise = table.legal_actions()
+    if mask[action_table.RAISE]:
+      _, rews, terminal, info = act(table, action_table.RAISE, maxraise)
+    else:
+      _, rews, terminal, info = act(table, action_table.CALL)
+  pots = info['pots']
+  assert [(pot.amount, pot.eligible) for pot in pots] == [
+      (300, (0, 1, 2)), (400, (1, 2)), (300, (2,))]
+  assert set(pots[1].winners) <= {1, 2}
+  assert pots[2].winners == (2,)
+  assert sum(rews) == 1000 and rews[2] >= 300
+
+
+def test_auto_advance_skips_only_allin_turns():
+  rng = random.Random(3)
+  manual, auto = Table(6), Table(6, auto_advance=True)
+  for table in (manual, auto):
+    for seat in range(6):
+      table.add_player(seat, 300 + 50 * seat)
+    table.seed(5)
+  skipped = 0
+  for _ in range(40):
+    for table in (manual, auto):
+      for player in table._seats:
+        player.stack = player.stack or 300
+    manual.reset()
+    _, info = auto.reset(return_info=True)
+    terminal = info['to_act'] is None
+    done = False
+    while not done:
+      player = manual._current_player
+      if player.isallin and not player.playedthisround:
+        _, _, done, _ = act(manual, action_table.CHECK)
+        skipped += 1
+        continue
+      assert auto.to_act == player.get_seat()
+      assert not auto._current_player.isallin
+      mask, minraise, maxraise = manual.legal_actions()
+      if mask[action_table.RAISE] and rng.random() < 0.3:
+        move = action_table.RAISE, rng.choice([minraise, maxraise])
+      elif mask[action_table.FOLD] and rng.random() < 0.1:
+        move = action_table.FOLD, 0
+      else:
+        move = passive(manual)
+      _, _, done, _ = act(manual, *move)
+      _, _, terminal, info = act(auto, *move)
+      assert terminal == done
+    assert terminal and info['to_act'] is None
+    assert [p.stack for p in auto._seats] == [p.stack for p in manual._seats]
+  assert skipped > 0
@@ -0,0 +1,52 @@
+from holdem import Table
+from holdem.deck import Deck
+from holdem.utils import action_table
+
+
+def test_seeded_decks():
+  first, second = Deck(seed=7, batch_size=4), Deck(seed=7, batch_size=4)
+  orders = []
+  for _ in range(10):
+    first.shuffle()
+    second.shuffle()
+    assert first.cards == second.cards
+    assert sorted(first.cards) == sorted(Deck(seed=0).cards)
+    second.draw(1)
+    orders.append(first.draw(5))
+  assert len(set(map(tuple, orders))) == 10
+  # any hand can be dealt again from its seed and index
+  third = Deck(batch_size=4)
+  third.seed(7, 5)
+  third.shuffle()
+  assert third.draw(5) == orders[6]
+
+
+def test_replay_hand():
+  table = Table(3)
+  for seat in range(3):
+    table.add_player(seat, 1000)
+  table.seed(11)
+  for _ in range(3):
+    snapshot = table.snapshot()
+    table.reset()
+    hand_index = table.hand_index
+    actions, results = [], []
+    terminal = False
+    while not terminal:
+      mask, minraise, _ = table.legal_actions()
+      move = [action_table.RAISE, minraise] if mask[action_table.RAISE] and not actions else \
+          [action_table.CHECK if mask[action_table.CHECK] else action_table.CALL, 0]
+      step = [[0, 0]] * 3
+      step = list(step)
+      step[table._current_player.player_id] = move
+      actions.append(step)
+      _, rews, terminal, _ = table.step(step)
+      results.append((list(rews), list(table.community)))
+    after = table.snapshot()
+
+    other = Table(3)
+    replayed = other.replay(11, hand_index, actions, snapshot)
+    assert [list(result[1]) for result in replayed[1:]] == [rews for rews, _ in results]
+    assert other.community == results[-1][1]
+    assert other.snapshot() == after
+    table.restore(after)
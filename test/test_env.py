@@ -0,0 +1,81 @@
+from holdem import TexasHoldemEnv
+from holdem.utils import action_table
+
+
+def act(env, action, amount=0):
+  actions = [[action_table.CHECK, 0]] * env.n_seats
+  actions = list(actions)
+  actions[env._current_player.player_id] = [action, amount]
+  return env.step(actions)
+
+
+def check_or_call(env):
+  mask, _, _ = env.legal_actions()
+  return act(env, action_table.CHECK if mask[action_table.CHECK] else action_table.CALL)
+
+
+def test_round_ends_with_players_allin_from_earlier_rounds():
+  env = TexasHoldemEnv(3)
+  env.add_player(0, 1000)
+  env.add_player(1, 1000)
+  env.add_player(2, 100)
+  env.seed(2)
+  env.reset()
+  while env._round == 0:
+    player = env._current_player
+    if player.get_seat() == 2:
+      act(env, action_table.RAISE, player.stack)
+    else:
+      check_or_call(env)
+  assert env._seats[2].isallin
+  # the two players with chips check down, the all-in player is not waited on
+  terminal = False
+  for _ in range(20):
+    _, rews, terminal, _ = check_or_call(env)
+    if terminal:
+      break
+  assert terminal
+  assert len(env.community) == 5
+  assert sum(rews) == 2100
+
+
+def test_allin_runout_deals_five_cards():
+  for seed in range(20):
+    env = TexasHoldemEnv(3)
+    for seat in range(3):
+      env.add_player(seat, 500 + 100 * seat)
+    env.seed(seed)
+    env.reset()
+    street = seed % 4
+    terminal = False
+    while not terminal:
+      player = env._current_player
+      mask, _, _ = env.legal_actions()
+      if env._round >= street and mask[action_table.RAISE] and not player.isallin:
+        _, rews, terminal, _ = act(env, action_table.RAISE, player.stack)
+      else:
+        _, rews, terminal, _ = check_or_call(env)
+    assert len(env.community) == 5
+    hands = [card for player in env._seats for card in player.hand]
+    assert len(set(env.community + hands)) == 11
+    assert sum(rews) == 1800
+
+
+def test_folded_bets_nobody_matched_are_refunded():
+  env = TexasHoldemEnv(2)
+  env.add_player(0, 1000)
+  env.add_player(1, 1000)
+  env.seed(0)
+  env.reset()
+  button = env._button
+  act(env, action_table.FOLD)
+  # the button of the last hand is the big blind heads up, with only 5 chips
+  env._seats[button].stack = 5
+  env._seats[1 - button].stack = 1000
+  env.reset()
+  assert env._seats[button].isallin
+  _, rews, terminal, _ = act(env, action_table.FOLD)
+  assert terminal
+  # the small blind gets back the 5 chips the big blind could not match
+  assert rews[button] == 10
+  assert rews[1 - button] == 995
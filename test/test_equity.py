@@ -0,0 +1,40 @@
+import pytest
+from treys import Card
+
+from holdem import equity
+
+
+def cards(*names):
+  return [Card.new(name) for name in names]
+
+
+def test_exact_and_sampled_equity():
+  # aces against kings on a flop, enumerated exactly
+  aces, kings = cards('As', 'Ah'), cards('Kd', 'Kc')
+  exact = equity.calculate([aces, kings], community=cards('2c', '7d', '9h'))
+  assert exact[0].trials == 990 and exact[0].stderr == 0
+  assert exact[0].win + exact[0].tie + exact[0].lose == 990
+  assert exact[0].equity + exact[1].equity == pytest.approx(1)
+  assert 0.85 < exact[0].equity < 0.95
+
+  sampled = equity.calculate([aces, kings], n_samples=20000, exact_limit=0, seed=1)
+  assert abs(sampled[0].equity - 0.82) < 5 * sampled[0].stderr + 0.01
+  assert sampled == equity.calculate([aces, kings], n_samples=20000, exact_limit=0, seed=1)
+
+
+def test_ranges_and_unknown_cards():
+  aces = [cards('As', 'Ah'), cards('Ad', 'Ac')]
+  results = equity.calculate([aces, [-1, -1]], n_samples=5000, exact_limit=0, seed=0)
+  assert results[0].equity > 0.8
+
+
+def test_impossible_hands_raise():
+  aces = cards('As', 'Ah')
+  with pytest.raises(ValueError):
+    # the only hand in the range is dead
+    equity.calculate([[aces], [-1, -1]], dead=cards('As'), exact_limit=0)
+  with pytest.raises(ValueError):
+    # both players can only hold the same hand
+    equity.calculate([[aces], [aces]], exact_limit=0)
+  with pytest.raises(ValueError):
+    equity.calculate([[aces], [aces]])
@@ -0,0 +1,55 @@
+import random
+
+import numpy as np
+import pytest
+from treys import Deck, Evaluator as TreysEvaluator
+
+from holdem import eval as holdem_eval
+from holdem.utils import data_path
+
+
+def test_evaluate_matches_treys():
+  rng = random.Random(0)
+  full_deck = Deck.GetFullDeck()
+  reference = TreysEvaluator()
+  hands, boards, expected = [], [], []
+  for n_board in (3, 4, 5):
+    for _ in range(2000):
+      cards = rng.sample(full_deck, 2 + n_board)
+      hand, board = cards[:2], cards[2:]
+      rank = reference.evaluate(hand, board)
+      assert holdem_eval.evaluate(hand, board) == rank
+      hands.append(hand)
+      boards.append(board + [-1] * (5 - n_board))
+      expected.append(rank)
+  assert holdem_eval.evaluate_batch(hands, boards).tolist() == expected
+  assert holdem_eval.evaluate_batch(np.empty((0, 2)), np.empty((0, 5))).shape == (0,)
+  with pytest.raises(ValueError):
+    holdem_eval.evaluate_batch([hands[0]], [[-1] * 5])
+
+
+def test_build_table(tmp_path):
+  path = str(tmp_path / holdem_eval.TABLE_FILE)
+  holdem_eval.build_table(path)
+  assert np.array_equal(holdem_eval.load_table(path), holdem_eval.load_table())
+
+
+def test_data_path(tmp_path, monkeypatch):
+  directory = tmp_path / 'nested' / 'data'
+  monkeypatch.setenv('HOLDEM_DATA_DIR', str(directory))
+  assert data_path('x.npy') == str(directory / 'x.npy')
+  # the directory already exists the second time
+  assert data_path('y.npy') == str(directory / 'y.npy')
+  assert directory.is_dir()
+
+
+def test_evaluate_batch_arrays():
+  rng = np.random.default_rng(1)
+  full_deck = np.array(Deck.GetFullDeck())
+  reference = TreysEvaluator()
+  cards = np.array([rng.choice(full_deck, 7, replace=False) for _ in range(500)], dtype=np.int32)
+  hands, boards = cards[:, :2], cards[:, 2:]
+  expected = [reference.evaluate(h.tolist(), b.tolist()) for h, b in zip(hands, boards)]
+  ranks = holdem_eval.Evaluator().evaluate_batch(hands, boards)
+  assert ranks.shape == (500,) and ranks.tolist() == expected
+  assert holdem_eval.Evaluator().evaluate(hands[0].tolist(), boards[0].tolist()) == expected[0]
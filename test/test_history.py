@@ -0,0 +1,63 @@
+from holdem import Instrumentation, Table
+from holdem.history import HandHistoryReader, HandHistoryWriter, deck_order
+from holdem.utils import action_table
+
+
+def check_or_call(table):
+  mask, _, _ = table.legal_actions()
+  actions = [[action_table.CHECK, 0]] * table.n_seats
+  actions = list(actions)
+  actions[table._current_player.player_id] = [0 if mask[action_table.CHECK] else 1, 0]
+  return actions
+
+
+def play_hand(table):
+  table.reset()
+  terminal = False
+  while not terminal:
+    _, _, terminal, _ = table.step(check_or_call(table))
+
+
+def test_history_round_trip(tmp_path):
+  table = Table(3)
+  table.seed(3)
+  for seat in range(3):
+    table.add_player(seat, 1000)
+  with HandHistoryWriter(str(tmp_path), buffer_size=7) as writer:
+    table._recorder = writer
+    for _ in range(5):
+      play_hand(table)
+  reader = HandHistoryReader(str(tmp_path))
+  assert reader.n_hands == 5
+  hands = list(reader.hands())
+  assert len(hands) == 5
+  for hand in hands:
+    assert len(set(deck_order(hand))) == 52
+  assert sum(len(actions) for actions in reader.actions()) > 0
+
+
+def test_clone_does_not_record(tmp_path):
+  instrumentation = Instrumentation()
+  with HandHistoryWriter(str(tmp_path)) as writer:
+    table = Table(2, recorder=writer, instrumentation=instrumentation)
+    table.seed(0)
+    table.add_player(0, 1000)
+    table.add_player(1, 1000)
+    play_hand(table)
+    table.reset()
+    pending = list(writer._pending)
+    counters = dict(instrumentation.counters)
+
+    other = table.clone()
+    assert other._recorder is None and other.instrumentation is None
+    terminal = False
+    while not terminal:
+      _, _, terminal, _ = other.step(check_or_call(other))
+    play_hand(other)
+    assert writer._pending == pending
+    assert dict(instrumentation.counters) == counters
+    # the parent still records its own hands
+    terminal = False
+    while not terminal:
+      _, _, terminal, _ = table.step(check_or_call(table))
+  assert HandHistoryReader(str(tmp_path)).n_hands == 2
@@ -0,0 +1,43 @@
+import random
+
+import numpy as np
+from treys import Card
+
+from holdem import indexer
+
+
+SIZES = [169, 1286792, 13960050, 123156254]
+
+
+def test_sizes():
+  assert [indexer.size(street) for street in range(4)] == SIZES
+
+
+def test_index_unindex_round_trip():
+  rng = np.random.default_rng(0)
+  for street, size in enumerate(SIZES):
+    indices = np.unique(np.append(rng.integers(size, size=300), [0, size - 1]))
+    pockets, communities = indexer.unindex_batch(street, indices)
+    streets, again = indexer.index_batch(pockets, communities)
+    assert (streets == street).all() and np.array_equal(again, indices)
+    for i in indices[:20].tolist():
+      pocket, community = indexer.unindex(street, i)
+      assert indexer.index(pocket, community + [-1] * (5 - len(community))) == i
+
+
+def test_suit_isomorphism():
+  rng = random.Random(1)
+  names = [rank + suit for rank in '23456789TJQKA' for suit in 'shdc']
+  for n_board in (0, 3, 4, 5):
+    for _ in range(50):
+      hand = rng.sample(names, 2 + n_board)
+      suits = dict(zip('shdc', rng.sample('shdc', 4)))
+      permuted = [name[0] + suits[name[1]] for name in hand]
+      # nor does the order of the pocket or flop cards
+      permuted[:2] = permuted[1::-1]
+      if n_board:
+        permuted[2:5] = rng.sample(permuted[2:5], 3)
+      cards = [Card.new(name) for name in hand]
+      other = [Card.new(name) for name in permuted]
+      assert indexer.index(cards[:2], cards[2:]) == indexer.index(other[:2], other[2:])
+      assert indexer.canonical(cards[:2], cards[2:]) == indexer.canonical(other[:2], other[2:])
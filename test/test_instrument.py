@@ -0,0 +1,34 @@
+from holdem import Instrumentation, Table
+from holdem.instrument import COUNTERS, PHASES
+from holdem.utils import action_table
+
+
+def test_instrumentation_counts():
+  calls = []
+  ticks = iter(range(1 << 20))
+  instrumentation = Instrumentation(hooks=[lambda name, value: calls.append(name)],
+                                    clock=lambda: next(ticks))
+  table = Table(3, instrumentation=instrumentation)
+  for seat in range(3):
+    table.add_player(seat, 1000)
+  table.seed(0)
+  steps = 0
+  for _ in range(5):
+    table.reset()
+    terminal = False
+    while not terminal:
+      mask, _, _ = table.legal_actions()
+      actions = [[action_table.CHECK if mask[action_table.CHECK] else action_table.CALL, 0]] * 3
+      _, _, terminal, _ = table.step(actions)
+      steps += 1
+
+  counters = instrumentation.as_dict()
+  assert list(counters)[:len(COUNTERS)] == list(COUNTERS)
+  assert counters['hands'] == 5 and counters['steps'] == steps
+  assert counters['showdowns'] == 5
+  for phase in PHASES:
+    assert counters[phase + '_seconds'] > 0
+  assert set(calls) == set(PHASES) | {'hands', 'steps', 'showdowns'}
+
+  instrumentation.reset()
+  assert not any(instrumentation.as_dict().values())
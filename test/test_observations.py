@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from holdem import Table
+from holdem import events
+from holdem.core import Observation, observation_layout
+from holdem.utils import action_table
+
+
+def check_or_call(table):
+  mask, _, _ = table.legal_actions()
+  actions = [[action_table.CHECK, 0]] * table.n_seats
+  actions = list(actions)
+  actions[table._current_player.player_id] = [0 if mask[action_table.CHECK] else 1, 0]
+  return actions
+
+
+def tables(obs_modes, n_seats=3, seed=5):
+  result = []
+  for obs_mode in obs_modes:
+    table = Table(n_seats, obs_mode=obs_mode)
+    table.seed(seed)
+    for seat in range(n_seats):
+      table.add_player(seat, 1000)
+    result.append(table)
+  return result
+
+
+def test_lazy_matches_tuple():
+  reference, lazy = tables(['tuple', 'lazy'])
+  expected, obs = reference.reset(), lazy.reset()
+  terminal = False
+  while not terminal:
+    assert isinstance(obs, Observation)
+    assert obs == expected and not obs != expected
+    assert obs == lazy._get_current_state()
+    player_states, community_states = obs
+    assert (player_states, community_states) == expected
+    assert obs[0] == expected[0] and obs[-1] == expected[-1]
+    assert obs.tocall == expected[1][0][6]
+    actions = check_or_call(reference)
+    expected, _, terminal, _ = reference.step(actions)
+    previous = obs
+    obs, _, _, _ = lazy.step(actions)
+    with pytest.raises(Table.Error):
+      previous.button
+  assert obs != ((), ())
+
+
+def test_array_matches_tuple():
+  reference, table = tables(['tuple', 'array'], n_seats=4)
+  layout = observation_layout(4)
+  expected, obs = reference.reset(), table.reset()
+  terminal = False
+  while True:
+    assert obs.dtype == np.int32 and obs.shape == (sum(np.prod(s) for _, s in layout.values()),)
+    player_states, (community_infos, community_cards) = expected
+    fields = {
+      'player_infos': [info for info, _ in player_states],
+      'player_hands': [hand for _, hand in player_states],
+      'community_infos': community_infos,
+      'community_cards': community_cards,
+    }
+    for name, (offset, shape) in layout.items():
+      value = obs[offset:offset + int(np.prod(shape))].reshape(shape)
+      assert np.array_equal(value, np.array(fields[name], dtype=np.int64)), name
+    if terminal:
+      break
+    actions = check_or_call(reference)
+    expected, _, terminal, _ = reference.step(actions)
+    obs, _, _, _ = table.step(actions)
+
+
+def test_events_replay_the_hand():
+  rng = np.random.default_rng(2)
+  (table,) = tables(['events'], n_seats=4)
+  for _ in range(10):
+    start = [p.stack for p in table._seats]
+    log = [table.reset()]
+    terminal = False
+    while not terminal:
+      mask, minraise, maxraise = table.legal_actions()
+      actions = check_or_call(table)
+      if mask[action_table.RAISE] and rng.random() < 0.2:
+        actions[table._current_player.player_id] = [action_table.RAISE, minraise]
+      obs, _, terminal, _ = table.step(actions)
+      log.append(obs)
+    stream = np.concatenate(log)
+    assert stream.dtype == events.EVENT_DTYPE and stream.dtype.itemsize == 24
+    kinds = stream['kind'].tolist()
+    assert kinds[0] == events.HAND and kinds[-1] == events.END
+
+    stacks = list(start)
+    community = []
+    for event in stream:
+      kind, seat, amount = int(event['kind']), int(event['seat']), int(event['amount'])
+      cards = [int(card) for card in event['cards'] if card >= 0]
+      if kind in (events.SMALLBLIND, events.BIGBLIND, events.ACTION):
+        stacks[seat] -= amount
+      elif kind == events.AWARD:
+        stacks[seat] += amount
+      elif kind == events.POCKET:
+        assert cards == table._seats[seat].hand
+      elif kind == events.STREET:
+        community.extend(cards)
+    assert stacks == [p.stack for p in table._seats]
+    assert community == table.community[:len(community)]
+    assert int(stream['amount'][-1]) == sum(start) - sum(stacks) + sum(
+        int(e['amount']) for e in stream if e['kind'] == events.AWARD)
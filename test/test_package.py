@@ -0,0 +1,41 @@
+import subprocess
+import sys
+
+import holdem
+
+
+def run(code):
+  return subprocess.run([sys.executable, '-c', code], check=True, capture_output=True,
+                        text=True).stdout.strip()
+
+
+def test_core_does_not_import_gym():
+  code = '\n'.join([
+    'import sys, holdem',
+    'table = holdem.Table(2)',
+    'table.add_player(0)',
+    'table.add_player(1)',
+    'table.reset()',
+    "print('gym' in sys.modules, 'holdem.env' in sys.modules)",
+  ])
+  assert run(code) == 'False False'
+
+
+def test_lazy_attributes_and_registration():
+  assert 'TexasHoldemEnv' in dir(holdem)
+  assert issubclass(holdem.TexasHoldemEnv, holdem.Table)
+  assert issubclass(holdem.TexasHoldemEnv.Error, holdem.Table.Error)
+  code = '\n'.join([
+    'import gym, holdem',
+    "env = gym.make('TexasHoldem-v1').unwrapped",
+    'print(type(env).__name__, env.n_seats)',
+  ])
+  assert run(code).splitlines()[-1] == 'TexasHoldemEnv 4'
+
+
+def test_history_does_not_import_equity():
+  code = '\n'.join([
+    'import sys, holdem.history',
+    "print('holdem.equity' in sys.modules)",
+  ])
+  assert run(code) == 'False'
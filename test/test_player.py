@@ -0,0 +1,34 @@
+import pytest
+
+from holdem.player import Player
+from holdem.utils import Error
+
+
+def test_player_slots_and_snapshot():
+  player = Player(3, stack=500)
+  assert not hasattr(player, '__dict__')
+  with pytest.raises(AttributeError):
+    player.nickname = 'x'
+  player.set_seat(3)
+  player.reset_hand()
+  player.hand = [1, 2]
+  player.bet(500)
+  assert player.isallin and player.stack == 0 and player.playedthisround
+  state = player.snapshot()
+
+  other = Player(0, emptyplayer=True)
+  other.restore(state)
+  assert other.snapshot() == state and other.get_seat() == 3
+  other.hand.append(3)
+  assert player.hand == [1, 2]
+
+
+def test_player_move_validation():
+  player = Player(0, stack=100)
+  state = {'stack': 100, 'pocket_cards': [], 'bigblind': 25, 'tocall': 25, 'minraise': 50}
+  assert player.player_move(state, [Player.CALL, 0])[0] == 'call'
+  assert player.player_move(state, [Player.RAISE, 60]) == ('raise', 60)
+  with pytest.raises(Error):
+    player.player_move(state, [Player.CHECK, 0])
+  with pytest.raises(Error):
+    player.player_move(state, [Player.RAISE, 10])
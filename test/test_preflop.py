@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from treys import Card
+
+from holdem import preflop
+
+
+def cards(*names):
+  return [Card.new(name) for name in names]
+
+
+def test_hand_classes():
+  assert preflop.class_name(preflop.hand_class(*cards('As', 'Ks'))) == 'AKs'
+  assert preflop.class_name(preflop.hand_class(*cards('Kd', 'As'))) == 'AKo'
+  assert preflop.class_name(preflop.hand_class(*cards('7d', '7s'))) == '77'
+  counts = [len(preflop.class_combos(index)) for index in range(preflop.N_CLASSES)]
+  assert sum(counts) == 1326 and sorted(set(counts)) == [4, 6, 12]
+
+
+def test_build_and_load(tmp_path, monkeypatch):
+  monkeypatch.setenv('HOLDEM_DATA_DIR', str(tmp_path))
+  monkeypatch.setattr(preflop, '_tables', None)
+  with pytest.raises(FileNotFoundError, match='holdem.preflop build'):
+    preflop.heads_up_equity(cards('As', 'Ah'), cards('Kd', 'Kc'))
+
+  path = preflop.build_tables(heads_up_samples=40, multiway_samples=40, processes=1)
+  assert path == str(tmp_path / preflop.TABLE_FILE)
+  tables = preflop.load_tables()
+  heads_up, stderr = tables['heads_up'], tables['heads_up_stderr']
+  assert np.allclose(heads_up + heads_up.T, 1)
+  assert np.allclose(stderr, stderr.T) and 0 < stderr.max() <= 0.5 / np.sqrt(40) + 1e-6
+  assert abs(preflop.heads_up_equity(cards('As', 'Ah'), cards('Kd', 'Kc')) - 0.82) < 0.3
+  assert preflop.multiway_equity(cards('As', 'Ah'), 9) > preflop.multiway_equity(
+      cards('7s', '2d'), 9)
+  assert (tables['multiway_stderr'][:, 2:] > 0).any()
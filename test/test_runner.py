@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from gym import error
+
+from holdem import BatchRunner, TexasHoldemEnv
+
+
+def check_or_call(obs, mask, minraise, maxraise):
+  return np.stack([np.where(mask[:, 0], 0, 1), np.zeros(len(mask), dtype=np.int64)], axis=1)
+
+
+def rebuy(stack):
+  def on_hand_end(index, env, rews):
+    for player in env._seats:
+      player.stack = stack
+  return on_hand_end
+
+
+def test_runner_plays_hands():
+  envs = []
+  for i in range(4):
+    env = TexasHoldemEnv(3, obs_mode='array')
+    env.seed(i)
+    for seat in range(3):
+      env.add_player(seat, 1000)
+    envs.append(env)
+  ended = []
+  def on_hand_end(index, env, rews):
+    ended.append(index)
+    assert sum(rews) == 3000
+  stats = BatchRunner(envs, check_or_call, batch_size=2, on_hand_end=on_hand_end).run(20)
+  assert stats['hands'] == len(ended) == 20
+  assert stats['decisions'] > 0
+
+
+def test_runner_hands_over_in_reset():
+  # 10 chip stacks are all-in with the blinds, auto_advance plays the hand out in reset
+  envs = []
+  for i in range(2):
+    env = TexasHoldemEnv(2, obs_mode='array', auto_advance=True)
+    env.seed(i)
+    env.add_player(0, 10)
+    env.add_player(1, 10)
+    envs.append(env)
+  def policy(*args):
+    raise AssertionError('no decision to make')
+  stats = BatchRunner(envs, policy, on_hand_end=rebuy(10)).run(6)
+  assert stats['hands'] == 6
+  assert stats['steps'] == stats['policy_calls'] == 0
+
+
+def test_runner_batches():
+  envs = []
+  for i in range(6):
+    env = TexasHoldemEnv(2, obs_mode='array')
+    env.seed(i)
+    env.add_player(0, 1000)
+    env.add_player(1, 1000)
+    envs.append(env)
+  sizes = []
+  def policy(obs, mask, minraise, maxraise):
+    assert obs.shape == (len(mask), envs[0]._obs_buffer.size)
+    sizes.append(len(mask))
+    return check_or_call(obs, mask, minraise, maxraise)
+  stats = BatchRunner(envs, policy, batch_size=4, on_hand_end=rebuy(1000)).run(30)
+  assert stats['hands'] == 30
+  assert max(sizes) == 4 and sum(sizes) == stats['decisions']
+  assert stats['policy_calls'] == len(sizes)
+
+  with pytest.raises(error.Error):
+    BatchRunner([TexasHoldemEnv(2)], policy)
+
+
+def test_runner_max_wait_counts_from_when_decisions_were_queued():
+  envs = []
+  for i in range(3):
+    env = TexasHoldemEnv(2, obs_mode='array')
+    env.seed(i)
+    env.add_player(0, 1000)
+    env.add_player(1, 1000)
+    envs.append(env)
+  now = [0.]
+  sizes = []
+  def policy(obs, mask, minraise, maxraise):
+    # every policy call takes 10 seconds
+    now[0] += 10
+    sizes.append(len(mask))
+    return check_or_call(obs, mask, minraise, maxraise)
+  runner = BatchRunner(envs, policy, batch_size=2, max_wait=5, on_hand_end=rebuy(1000),
+                       clock=lambda: now[0])
+  runner.run(3)
+  # the third table was left over by the first call and has waited 10 seconds since, it is
+  # sent on its own rather than after the other two tables are stepped
+  assert sizes[:2] == [2, 1]
@@ -0,0 +1,64 @@
+import pickle
+import random
+
+import pytest
+
+from holdem import Table, TexasHoldemEnv, serialize
+from holdem.utils import action_table
+
+
+def random_step(table, rng):
+  mask, minraise, maxraise = table.legal_actions()
+  if mask[action_table.RAISE] and rng.random() < 0.3:
+    move = [action_table.RAISE, rng.randint(minraise, maxraise)]
+  elif mask[action_table.FOLD] and rng.random() < 0.1:
+    move = [action_table.FOLD, 0]
+  else:
+    move = [action_table.CHECK if mask[action_table.CHECK] else action_table.CALL, 0]
+  actions = [[0, 0]] * table.n_seats
+  actions = list(actions)
+  actions[table._current_player.player_id] = move
+  return actions
+
+
+def test_round_trip_mid_hand():
+  rng = random.Random(0)
+  table = Table(4, obs_mode='array', hands_per_level=3, auto_advance=True)
+  for seat in range(4):
+    table.add_player(seat, 800)
+  table.seed(3)
+  for _ in range(10):
+    if sum(p.stack > 0 for p in table._seats) < 2:
+      break
+    table.reset()
+    terminal = False
+    while not terminal:
+      data = table.to_bytes()
+      other = Table.from_bytes(data)
+      assert other.snapshot() == table.snapshot()
+      assert (other.obs_mode, other.auto_advance) == ('array', True)
+      assert other.to_bytes() == data
+      actions = random_step(table, rng)
+      obs, rews, terminal, _ = table.step(actions)
+      other_obs, other_rews, _, _ = other.step(actions)
+      assert (obs == other_obs).all() and rews == other_rews
+
+
+def test_pickle_and_checkpoints(tmp_path):
+  env = TexasHoldemEnv(3, max_limit=5000)
+  for seat in range(3):
+    env.add_player(seat, 1 << 40)
+  env.seed(1)
+  env.reset()
+  other = pickle.loads(pickle.dumps(env))
+  assert isinstance(other, TexasHoldemEnv) and other.max_limit == 5000
+  assert other.snapshot() == env.snapshot()
+
+  path = str(tmp_path / 'tables.bin')
+  tables = [env, Table(2), other.clone()]
+  serialize.save_tables(path, tables)
+  loaded = serialize.load_tables(path)
+  assert [t.snapshot() for t in loaded] == [t.snapshot() for t in tables]
+
+  with pytest.raises(Table.Error):
+    Table.from_bytes(b'nonsense')
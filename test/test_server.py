@@ -0,0 +1,77 @@
+import asyncio
+
+from holdem.server import HandOver, TableServer
+from holdem.utils import action_table
+
+
+def play(server, stacks, n_hands, policy):
+  async def run():
+    clients = [await server.connect_local() for _ in stacks]
+    try:
+      return await asyncio.wait_for(asyncio.gather(*(
+          client.play(policy, stack=stack, n_hands=n_hands)
+          for client, stack in zip(clients, stacks))), 10)
+    finally:
+      await server.close()
+  return asyncio.run(run())
+
+
+def check_or_call(observation):
+  if observation.legal_actions[action_table.CHECK]:
+    return action_table.CHECK, 0
+  return action_table.CALL, 0
+
+
+def test_server_plays_hands():
+  results = play(TableServer(n_seats=2, action_timeout=1), [1000, 1000], 3, check_or_call)
+  for hands in results:
+    assert len(hands) == 3
+    assert all(isinstance(hand, HandOver) for hand in hands)
+    assert hands[-1].stacks.sum() == 2000
+
+
+def test_server_hand_over_in_reset():
+  # 10 chip stacks are all-in with the blinds, auto_advance plays the hand out in reset
+  def policy(observation):
+    raise AssertionError('no decision to make')
+  results = play(TableServer(n_seats=2, auto_advance=True), [10, 10], 1, policy)
+  for hands in results:
+    assert len(hands) == 1
+    assert hands[0].stacks.sum() == 20
+    assert (hands[0].community_cards >= 0).all()
+
+
+def test_server_hides_cards_and_times_out():
+  seen = []
+
+  async def run():
+    server = TableServer(n_seats=2, action_timeout=0.05)
+    player, idle = await server.connect_local(), await server.connect_local()
+
+    def policy(observation):
+      seen.append(observation)
+      return check_or_call(observation)
+
+    async def sit_out():
+      # joins, then never answers, the server plays the default action for it
+      seated = await idle.join(stack=1000)
+      hands = []
+      while len(hands) < 2:
+        message = await idle.recv()
+        if isinstance(message, HandOver):
+          hands.append(message)
+      return seated, hands
+
+    try:
+      return await asyncio.wait_for(asyncio.gather(
+          player.play(policy, stack=1000, n_hands=2), sit_out()), 10)
+    finally:
+      await server.close()
+
+  hands, (seated, idle_hands) = asyncio.run(run())
+  assert len(hands) == len(idle_hands) == 2
+  assert hands[-1].stacks.sum() == 2000 and seen
+  for observation in seen:
+    seat = 1 - seated.seat
+    assert (observation.player_hands[seat] >= 0).all()
+    assert (observation.player_hands[seated.seat] == -1).all()
@@ -0,0 +1,25 @@
+import numpy as np
+
+from holdem import SubprocVectorHoldemEnv
+
+
+def test_subproc_steps_and_masks_idle_tables():
+  # the last table has a single player and is never dealt a hand
+  stack = np.array([[1000, 1000, 1000]] * 3 + [[1000, 0, 0]])
+  env = SubprocVectorHoldemEnv(4, 3, n_workers=2, seed=0, stack=stack, rebuy=False)
+  try:
+    _, info = env.reset(return_info=True)
+    hands = 0
+    for _ in range(100):
+      assert info['legal_actions'][:3].any(axis=1).all()
+      assert not info['legal_actions'][3].any()
+      actions = np.zeros((4, 3, 2), dtype=np.int64)
+      actions[:, :, 0] = np.where(info['legal_actions'][:, 1], 1, 0)[:, None]
+      (_, (community_infos, _)), rews, terminals, info = env.step(actions)
+      hands += terminals.sum()
+      # rewards are the stacks once a hand is over, before the next one is dealt
+      pot = np.where(terminals, 0, community_infos[:, 3])
+      assert (rews[:3].sum(axis=1) + pot[:3] == 3000).all()
+    assert hands > 0
+  finally:
+    env.close()
@@ -0,0 +1,30 @@
+import numpy as np
+
+from holdem import Tournament
+from holdem.utils import action_table
+
+
+def shove_or_fold(seed):
+  rng = np.random.default_rng(seed)
+  def policy(obs, info):
+    mask, maxraise = info['legal_actions'], info['maxraise']
+    n_envs = len(mask)
+    shove = mask[:, action_table.RAISE] & (rng.random(n_envs) < 0.5)
+    passive = np.where(mask[:, action_table.CHECK], action_table.CHECK, action_table.FOLD)
+    actions = np.zeros((n_envs, obs[0][0].shape[1], 2), dtype=np.int64)
+    actions[:, :, 0] = np.where(shove, action_table.RAISE, passive)[:, None]
+    actions[:, :, 1] = np.where(shove, maxraise, 0)[:, None]
+    return actions
+  return policy
+
+
+def test_tournament_plays_out():
+  tournament = Tournament(30, n_seats=9, stack=1500, hands_per_level=5, seed=0)
+  positions = tournament.play(shove_or_fold(0), max_steps=20000)
+  assert tournament.done
+  assert sorted(positions.tolist()) == list(range(1, 31))
+  winner = int(np.argmin(positions))
+  table, seat = np.argwhere(tournament.seating == winner)[0]
+  assert tournament.env._stacks[table, seat] == 30 * 1500
+  assert (tournament.seating >= 0).sum() == 1
+  assert tournament.level > 0
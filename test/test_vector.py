@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from gym import error
+
+from holdem import Table, VectorTexasHoldemEnv
+from holdem.utils import action_table
+
+
+def random_actions(rng, info, n_seats):
+  mask, minraise, maxraise = info['legal_actions'], info['minraise'], info['maxraise']
+  n_envs = len(mask)
+  choice = rng.random(n_envs)
+  passive = np.where(mask[:, action_table.CHECK], action_table.CHECK, action_table.CALL)
+  action = np.where((choice < 0.2) & mask[:, action_table.RAISE], action_table.RAISE,
+                    np.where((choice > 0.9) & mask[:, action_table.FOLD], action_table.FOLD,
+                             passive))
+  amount = np.where(action == action_table.RAISE,
+                    rng.integers(minraise, np.maximum(maxraise, minraise) + 1), 0)
+  actions = np.zeros((n_envs, n_seats, 2), dtype=np.int64)
+  actions[:, :, 0] = action[:, None]
+  actions[:, :, 1] = amount[:, None]
+  return actions
+
+
+def test_vector_conserves_chips():
+  n_envs, n_seats = 32, 4
+  env = VectorTexasHoldemEnv(n_envs, n_seats, stack=500, rebuy=False)
+  env.seed(0)
+  rng = np.random.default_rng(0)
+  _, info = env.reset(return_info=True)
+  hands = 0
+  for _ in range(300):
+    (_, (community_infos, _)), rews, terminals, info = env.step(
+        random_actions(rng, info, n_seats))
+    hands += terminals.sum()
+    # rewards are the stacks once a hand is over, before the next one is dealt, tables left
+    # with a single funded player are not dealt again
+    pot = np.where(terminals | ~env.in_hand, 0, community_infos[:, 3])
+    assert (rews.sum(axis=1) + pot == n_seats * 500).all()
+    assert (rews >= 0).all()
+  assert hands > n_envs
+  assert info['hands'].sum() >= hands
+
+
+def test_vector_rejects_invalid_actions():
+  env = VectorTexasHoldemEnv(2, 2)
+  _, info = env.reset(return_info=True)
+  actions = np.zeros((2, 2, 2), dtype=np.int64)
+  # raising less than the minimum raise
+  actions[:, :, 0] = action_table.RAISE
+  with pytest.raises(error.Error):
+    env.step(actions)
+
+  env = VectorTexasHoldemEnv(2, 2, invalid_action='clamp')
+  _, info = env.reset(return_info=True)
+  _, _, _, info = env.step(actions)
+  assert info['legal_actions'].any(axis=1).all()
+
+
+def acting_seats(n_seats, folder):
+  # the (round, seat) of every decision of the first hand, everyone checks or calls except
+  # `folder`, who folds preflop unless they are the big blind
+  table = Table(n_seats, auto_advance=True)
+  for seat in range(n_seats):
+    table.add_player(seat, 1000)
+  table.seed(0)
+  table.reset()
+  core_seats = []
+  terminal = False
+  while not terminal:
+    seat = table.to_act
+    core_seats.append((table._round, seat))
+    mask, _, _ = table.legal_actions()
+    action = action_table.FOLD if seat == folder and mask[action_table.FOLD] else int(not mask[0])
+    actions = [[action_table.CHECK, 0]] * n_seats
+    actions[seat] = [action, 0]
+    _, _, terminal, _ = table.step(actions)
+
+  env = VectorTexasHoldemEnv(1, n_seats, stack=1000)
+  env.seed(0)
+  _, info = env.reset(return_info=True)
+  vector_seats = []
+  terminals = [False]
+  while not terminals[0]:
+    seat, betting_round = int(env._current_player[0]), int(env._round[0])
+    vector_seats.append((betting_round, seat))
+    mask = info['legal_actions'][0]
+    action = action_table.FOLD if seat == folder and mask[action_table.FOLD] else int(not mask[0])
+    actions = np.zeros((1, n_seats, 2), dtype=np.int64)
+    actions[0, seat, 0] = action
+    _, _, terminals, info = env.step(actions)
+  return core_seats, vector_seats
+
+
+def test_vector_acting_order_matches_core():
+  for n_seats, folder in ((2, None), (3, None), (3, 0), (3, 1), (3, 2), (4, 1)):
+    core_seats, vector_seats = acting_seats(n_seats, folder)
+    assert vector_seats == core_seats
+    assert max(betting_round for betting_round, _ in core_seats) == 3